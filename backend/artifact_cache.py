@@ -0,0 +1,154 @@
+"""In-process cache for parsed processed artifacts (Parquet frames, JSON).
+
+Entries are keyed by (path, loader) and versioned by the file's mtime and
+size; a file is re-stat'ed at most once per ``revalidate_seconds``, so hot
+artifacts are served without any filesystem access. Memory is bounded with
+LRU eviction, and concurrent first loads of the same key wait for a single
+read instead of stampeding the disk.
+
+Cached values are shared between requests and must be treated as read-only.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+Version = Tuple[int, int]  # (st_mtime_ns, st_size)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    version: Version
+    nbytes: int
+    checked_at: float
+
+
+def file_version(path: Path) -> Version:
+    """(mtime_ns, size) of ``path``; raises FileNotFoundError if it is missing."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def estimate_nbytes(value: Any, file_size: int) -> int:
+    """Approximate in-memory size: exact for frames, bytes and ``nbytes`` holders, file size otherwise."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return file_size
+
+
+class ArtifactCache:
+    """Thread-safe, memory-bounded LRU of values derived from files."""
+
+    def __init__(self, max_bytes: int = 256 * 1024**2, revalidate_seconds: float = 1.0):
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, Hashable], CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, Hashable], threading.Lock] = {}
+
+    def get(self, path: Path, loader: Callable[[Path], Any], kind: Optional[Hashable] = None) -> Any:
+        """Return ``loader(path)``, reusing the cached value while the file is unchanged.
+
+        ``kind`` distinguishes several values derived from one file (default:
+        the loader's qualified name).
+        """
+        return self.get_entry(path, loader, kind).value
+
+    def get_entry(self, path: Path, loader: Callable[[Path], Any], kind: Optional[Hashable] = None) -> CacheEntry:
+        """Like ``get`` but returns the entry, whose ``version`` identifies the file state."""
+        key = (str(path), kind if kind is not None else loader.__qualname__)
+
+        with self._lock:
+            entry = self._fresh(key, path)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # One loader per key; late arrivals find the entry it stored.
+        with key_lock:
+            with self._lock:
+                entry = self._fresh(key, path)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+
+            try:
+                # Stat before reading: a write racing the read leaves a stale version, never a stale value.
+                version = file_version(path)
+                value = loader(path)
+                entry = CacheEntry(value, version, estimate_nbytes(value, version[1]), time.monotonic())
+                with self._lock:
+                    self.misses += 1
+                    self._store(key, entry)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+            return entry
+
+    def _fresh(self, key: Tuple[str, Hashable], path: Path) -> Optional[CacheEntry]:
+        """The cached entry if still valid (caller holds ``_lock``); drops stale ones."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - entry.checked_at >= self.revalidate_seconds:
+            try:
+                current = file_version(path)
+            except FileNotFoundError:
+                current = None
+            if current != entry.version:
+                self._drop(key)
+                return None
+            entry.checked_at = now
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Tuple[str, Hashable], entry: CacheEntry) -> None:
+        if key in self._entries:
+            self._drop(key)
+        if entry.nbytes > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: Tuple[str, Hashable]) -> None:
+        self._bytes -= self._entries.pop(key).nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,79 @@
+"""Run blocking endpoint work off the event loop, with per-endpoint concurrency limits.
+
+Handlers that read artifacts or crunch pandas are written as plain functions
+and decorated with ``limited``: the request first waits (on the event loop,
+holding no thread) for one of the endpoint's slots, then runs on a shared,
+bounded worker pool. A request that cannot get a slot within ``max_wait``
+seconds is shed with 503 instead of queueing without bound.
+"""
+
+import asyncio
+import functools
+import os
+import weakref
+from typing import Any, Callable, TypeVar
+
+import anyio
+from fastapi import HTTPException
+
+from metrics import run_traced
+
+# Worker threads shared by every blocking endpoint
+WORKER_THREADS = int(os.getenv('API_WORKER_THREADS', 16))
+# Default in-flight requests per endpoint, and how long a request may queue for a slot
+ENDPOINT_CONCURRENCY = int(os.getenv('API_ENDPOINT_CONCURRENCY', 8))
+MAX_QUEUE_WAIT_SECONDS = float(os.getenv('API_MAX_QUEUE_WAIT_SECONDS', 10.0))
+
+T = TypeVar('T')
+
+_worker_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, anyio.CapacityLimiter]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def per_loop(instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]", factory: Callable[[], T]) -> T:
+    """The running event loop's instance of a loop-bound primitive, created on first use.
+
+    asyncio primitives bind to the first loop that waits on them, so one shared
+    instance fails in a second loop (a new ``asyncio.run``, another TestClient).
+    """
+    loop = asyncio.get_running_loop()
+    instance = instances.get(loop)
+    if instance is None:
+        instance = instances[loop] = factory()
+    return instance
+
+
+def worker_limiter() -> anyio.CapacityLimiter:
+    """The shared worker pool bound for the running event loop."""
+    return per_loop(_worker_limiters, lambda: anyio.CapacityLimiter(WORKER_THREADS))
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run ``func`` on the bounded worker pool and await its result."""
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=worker_limiter())
+
+
+def limited(concurrency: int = ENDPOINT_CONCURRENCY, max_wait: float = MAX_QUEUE_WAIT_SECONDS):
+    """Turn a blocking handler into an async endpoint with at most ``concurrency`` requests in flight."""
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        @functools.wraps(func)
+        async def endpoint(*args: Any, **kwargs: Any) -> Any:
+            semaphore = per_loop(semaphores, lambda: asyncio.Semaphore(concurrency))
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=max_wait)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=503, detail="Server busy, retry shortly", headers={"Retry-After": "1"})
+            try:
+                return await run_blocking(run_traced, func, *args, **kwargs)
+            finally:
+                semaphore.release()
+
+        return endpoint
+
+    return decorator
@@ -0,0 +1,93 @@
+"""Date-indexed range queries over Apple Health history.
+
+Built once per Parquet file version from the date/timestamp column alone: each
+row's calendar date (the column's first ten characters, i.e. the local date the
+record belongs to) goes into a sorted ``datetime64[D]`` key array, which
+answers ``[from, to]`` with two binary searches. Only the records of a
+non-empty range are read, with the bounds pushed down to Parquet as filters on
+that column, so row groups outside the range are skipped when the file is
+written in date order (as the Apple Health pipeline writes it).
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from json_responses import dumps
+
+
+def _date_keys(values: pd.Series) -> np.ndarray:
+    """Calendar date of each value (``NaT`` when it does not start with ``YYYY-MM-DD``)."""
+    return pd.to_datetime(values.str[:10], format="%Y-%m-%d", errors="coerce").to_numpy(dtype="datetime64[D]")
+
+
+class DateIndex:
+    """Sorted record dates of one history file; the records are read on demand."""
+
+    def __init__(self, file_path: Path, column: str, keys: np.ndarray):
+        self.file_path = file_path
+        self.column = column
+        self.keys = keys
+
+    @classmethod
+    def from_parquet(cls, file_path: Path, column: str) -> "DateIndex":
+        values = pq.read_table(file_path, columns=[column]).column(column).to_pandas().astype(str)
+        keys = _date_keys(values)
+        return cls(file_path, column, np.sort(keys[~np.isnat(keys)]))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.keys.nbytes)
+
+    def bounds(self, start: Optional[date], end: Optional[date]) -> slice:
+        """Positions in ``keys`` dated in ``[start, end]`` (inclusive; ``None`` leaves that side open)."""
+        lo = 0 if start is None else int(np.searchsorted(self.keys, np.datetime64(start, "D"), side="left"))
+        hi = len(self.keys) if end is None else int(np.searchsorted(self.keys, np.datetime64(end, "D"), side="right"))
+        return slice(lo, max(lo, hi))
+
+    def _filter(self, start: Optional[date], end: Optional[date]) -> Optional[ds.Expression]:
+        # ISO strings order like their dates; other column types are filtered after reading only
+        if not pa.types.is_string(pq.read_schema(self.file_path).field(self.column).type):
+            return None
+        expression = None
+        if start is not None:
+            expression = ds.field(self.column) >= start.isoformat()
+        if end is not None:
+            before = ds.field(self.column) < (end + timedelta(days=1)).isoformat()
+            expression = before if expression is None else expression & before
+        return expression
+
+    def records(self, start: Optional[date], end: Optional[date]) -> List[Dict[str, Any]]:
+        """Records dated in ``[start, end]``, by date and then by the full column value."""
+        bounds = self.bounds(start, end)
+        if bounds.start == bounds.stop:
+            return []
+        df = pq.read_table(self.file_path, filters=self._filter(start, end)).to_pandas()
+        values = df[self.column].astype(str)
+        keys = _date_keys(values)
+        keep = ~np.isnat(keys)
+        if start is not None:
+            keep &= keys >= np.datetime64(start, "D")
+        if end is not None:
+            keep &= keys <= np.datetime64(end, "D")
+        # Same-day records keep time order
+        order = np.lexsort((values.to_numpy()[keep], keys[keep]))
+        return df[keep].iloc[order].to_dict(orient="records")
+
+    def range_json(self, field: str, start: Optional[date], end: Optional[date]) -> bytes:
+        """``{"from", "to", "count", field: [...]}`` for the records in ``[start, end]``."""
+        records = self.records(start, end)
+        return dumps(
+            {
+                "from": start.isoformat() if start else None,
+                "to": end.isoformat() if end else None,
+                "count": len(records),
+                field: records,
+            }
+        )
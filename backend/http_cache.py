@@ -0,0 +1,113 @@
+"""Conditional GET and pre-compressed bodies for artifact-backed responses.
+
+A ``Payload`` is one artifact version's response body plus its validators
+(a weak ETag and Last-Modified from the file's mtime/size) and its gzip and,
+when the ``brotli`` package is installed, brotli encodings. Payloads are built
+once per version and cached, so a request costs a header comparison (304) or
+sending bytes that were compressed ahead of time.
+
+Also imported by ``pipeline_scripts/api_demo.py``: keep this module free of
+backend-only imports.
+"""
+
+import gzip
+import hashlib
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 512
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+@dataclass
+class Payload:
+    body: bytes
+    etag: str
+    last_modified: str
+    mtime: float
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.encoded.values())
+
+
+def make_payload(body: bytes, version: Tuple[int, int], variant: str = "") -> Payload:
+    """Payload for ``body`` rendered from an artifact at ``version`` (mtime_ns, size).
+
+    ``variant`` (e.g. the query string) distinguishes several bodies rendered
+    from one file, so each gets its own ETag.
+    """
+    mtime_ns, size = version
+    tag = f"{mtime_ns:x}-{size:x}"
+    if variant:
+        tag += "-" + hashlib.sha1(variant.encode()).hexdigest()[:12]
+    encoded = {}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoded["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            encoded["br"] = brotli.compress(body, quality=9)
+    return Payload(
+        body=body,
+        # Weak: gzip, brotli and identity bodies are equivalent representations
+        etag=f'W/"{tag}"',
+        last_modified=formatdate(mtime_ns / 1e9, usegmt=True),
+        mtime=mtime_ns / 1e9,
+        encoded=encoded,
+    )
+
+
+def _not_modified(request: Request, payload: Payload) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or payload.etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(payload.mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _accepted_encoding(request: Request, available: Dict[str, bytes]) -> Optional[str]:
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return next((name for name in ENCODINGS if name in available and accepted.get(name, 0) > 0), None)
+
+
+def conditional_response(request: Request, payload: Payload, media_type: str = "application/json") -> Response:
+    """304 when the client's validators match, else the best pre-encoded body it accepts."""
+    headers = {
+        "ETag": payload.etag,
+        "Last-Modified": payload.last_modified,
+        # Clients may keep the body but must revalidate; cheap thanks to 304s
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, payload):
+        return Response(status_code=304, headers=headers)
+    encoding = _accepted_encoding(request, payload.encoded)
+    if encoding is None:
+        return Response(payload.body, media_type=media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(payload.encoded[encoding], media_type=media_type, headers=headers)
@@ -0,0 +1,47 @@
+"""Fast JSON responses: orjson encoding with NaN/inf as null, and pre-serialized artifacts.
+
+orjson writes non-finite floats as ``null``, so payloads need no recursive
+sanitising pass; JSON artifacts are parsed once, re-encoded once and served
+from cached bytes for as long as the file is unchanged.
+"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not encode natively."""
+    if isinstance(obj, pd.Timestamp):
+        return None if pd.isna(obj) else obj.isoformat()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, Path):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` to JSON bytes; NaN and +/-inf become null."""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def read_json_bytes(file_path: Path) -> bytes:
+    """Parse a JSON file (tolerating NaN/Infinity literals) and re-encode it with nulls."""
+    with open(file_path, 'r') as f:
+        return dumps(json.load(f))
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson; ``bytes`` content is sent as already-serialized JSON."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        return dumps(content)
@@ -0,0 +1,269 @@
+"""Live LRI stream: one producer per session source, fanned out to many subscribers.
+
+The source is a CSV of scored windows that grows while a session is recorded
+(``window_start, window_end, lri, alertness, focus, arousal_balance``; a
+tailed file is the local stand-in for a device feed). A single producer task
+per file reads only the appended bytes, turns each new window into events
+(``window``, ``optimal_start``, ``optimal_end``) and encodes every event once;
+subscribers receive the same pre-encoded Server-Sent Events frames.
+
+Each subscriber has a bounded queue. A client that reads slower than windows
+arrive loses the oldest queued events rather than stalling the producer or
+growing memory, and is told how many it missed with a ``lagged`` event.
+"""
+
+import asyncio
+import csv
+import math
+import os
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from concurrency import per_loop, run_blocking
+from json_responses import dumps
+from session_analytics import MODERATE_THRESHOLD, OPTIMAL_THRESHOLD, classify_quality
+
+# How often the source is checked for appended rows
+POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', 0.5))
+# Events buffered per subscriber before the oldest are dropped
+QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', 256))
+# Idle interval after which a comment line keeps proxies from closing the stream
+HEARTBEAT_SECONDS = float(os.getenv('LIVE_HEARTBEAT_SECONDS', 15.0))
+# Windows replayed to a new subscriber in its snapshot
+SNAPSHOT_WINDOWS = 20
+# Largest chunk read from the source per call
+MAX_READ_BYTES = 1024**2
+
+COMPONENTS = ("alertness", "focus", "arousal_balance")
+
+
+@dataclass(frozen=True)
+class LiveEvent:
+    kind: str
+    data: bytes  # JSON
+    frame: bytes  # Server-Sent Events frame
+
+
+def make_event(kind: str, data: Dict[str, Any]) -> LiveEvent:
+    body = dumps(data)
+    return LiveEvent(kind, body, b"event: " + kind.encode() + b"\ndata: " + body + b"\n\n")
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _state(lri: Optional[float]) -> str:
+    if lri is None:
+        return "unknown"
+    if lri >= OPTIMAL_THRESHOLD:
+        return "optimal"
+    return "moderate" if lri >= MODERATE_THRESHOLD else "low"
+
+
+class CsvTail:
+    """Reads the complete rows appended to a CSV since the previous call."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._header: Optional[List[str]] = None
+        self._partial = b""
+
+    def read(self) -> Tuple[bool, List[Dict[str, str]]]:
+        """Return ``(reset, rows)``; ``reset`` is True when the file was truncated or replaced."""
+        stat = os.stat(self.path)
+        reset = self._inode is not None and (stat.st_ino != self._inode or stat.st_size < self._offset)
+        if reset:
+            self._offset, self._header, self._partial = 0, None, b""
+        self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return reset, []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(MAX_READ_BYTES)
+        self._offset += len(chunk)
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()  # incomplete until its newline is written
+
+        text = [line.decode("utf-8").rstrip("\r") for line in lines if line.strip()]
+        if self._header is None and text:
+            self._header = next(csv.reader(text[:1]))
+            text = text[1:]
+        return reset, list(csv.DictReader(text, fieldnames=self._header)) if text else []
+
+
+class LiveState:
+    """Session state folded from the window rows seen so far."""
+
+    def __init__(self):
+        self.windows_seen = 0
+        self.recent: deque = deque(maxlen=SNAPSHOT_WINDOWS)
+        self._run_start: Optional[str] = None
+        self._run_end: Optional[str] = None
+        self._run_lri: List[float] = []
+
+    def consume(self, row: Dict[str, str]) -> List[LiveEvent]:
+        lri = _number(row.get("lri"))
+        window = {
+            "window_start": row.get("window_start"),
+            "window_end": row.get("window_end") or None,
+            "lri": lri,
+            **{name: _number(row.get(name)) for name in COMPONENTS},
+            "state": _state(lri),
+        }
+        self.windows_seen += 1
+        self.recent.append(window)
+
+        events = [make_event("window", window)]
+        if window["state"] == "optimal":
+            if self._run_start is None:
+                self._run_start = window["window_start"]
+                events.append(make_event("optimal_start", {"start": self._run_start, "lri": lri}))
+            self._run_end = window["window_end"] or window["window_start"]
+            self._run_lri.append(lri)
+        elif self._run_start is not None:
+            events.append(make_event("optimal_end", self._close_run()))
+        return events
+
+    def _close_run(self) -> Dict[str, Any]:
+        avg_lri = sum(self._run_lri) / len(self._run_lri)
+        try:
+            duration = (datetime.fromisoformat(self._run_end) - datetime.fromisoformat(self._run_start)).total_seconds()
+        except (TypeError, ValueError):
+            duration = None
+        run = {
+            "start": self._run_start,
+            "end": self._run_end,
+            "duration_minutes": round(duration / 60.0, 2) if duration is not None else None,
+            "avg_lri": avg_lri,
+            "quality": classify_quality(avg_lri),
+        }
+        self._run_start, self._run_end, self._run_lri = None, None, []
+        return run
+
+    def snapshot(self) -> LiveEvent:
+        return make_event(
+            "snapshot",
+            {
+                "windows_seen": self.windows_seen,
+                "in_optimal_window": self._run_start is not None,
+                "optimal_since": self._run_start,
+                "recent_windows": list(self.recent),
+            },
+        )
+
+
+class Subscriber:
+    """One client's bounded event queue; overflow drops the oldest event."""
+
+    def __init__(self, maxsize: int = QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, event: LiveEvent) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class LiveSession:
+    """Tails one source and broadcasts its events while anyone is subscribed."""
+
+    def __init__(self, path: Path, poll_seconds: float = POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.state = LiveState()
+        self._tail = CsvTail(path)
+        self._subscribers: Set[Subscriber] = set()
+        self._poll_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, maxsize: int = QUEUE_SIZE) -> Subscriber:
+        """Catch up with the source, then register a subscriber that starts from a snapshot."""
+        await self._poll()
+        subscriber = Subscriber(maxsize)
+        subscriber.offer(self.state.snapshot())
+        self._subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def _publish(self, event: LiveEvent) -> None:
+        for subscriber in self._subscribers:
+            subscriber.offer(event)
+
+    async def _poll(self) -> None:
+        async with self._poll_lock:
+            while True:
+                try:
+                    reset, rows = await run_blocking(self._tail.read)
+                except FileNotFoundError:
+                    return
+                if reset:
+                    self.state = LiveState()
+                    self._publish(make_event("reset", {"source": self.path.name}))
+                for row in rows:
+                    for event in self.state.consume(row):
+                        self._publish(event)
+                if not rows:
+                    return
+
+    async def _run(self) -> None:
+        # Stops with the last subscriber; the next subscribe resumes from the same offset
+        while self._subscribers:
+            await self._poll()
+            await asyncio.sleep(self.poll_seconds)
+
+    async def sse(self, maxsize: int = QUEUE_SIZE) -> AsyncIterator[bytes]:
+        """Subscribe, then yield Server-Sent Events frames until the client disconnects.
+
+        The subscriber is registered inside the generator: a client that goes away
+        before the response body starts never runs it, so nothing is left to unsubscribe.
+        """
+        subscriber = await self.subscribe(maxsize)
+        reported = 0
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if subscriber.dropped > reported:
+                    yield make_event("lagged", {"dropped": subscriber.dropped - reported}).frame
+                    reported = subscriber.dropped
+                yield event.frame
+        finally:
+            self.unsubscribe(subscriber)
+
+
+class LiveHub:
+    """One ``LiveSession`` per source file and event loop, shared by all of its subscribers."""
+
+    def __init__(self):
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, LiveSession]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def session(self, path: Path) -> LiveSession:
+        # Producer task and poll lock belong to one loop
+        sessions = per_loop(self._sessions, dict)
+        key = str(path)
+        if key not in sessions:
+            sessions[key] = LiveSession(path)
+        return sessions[key]
@@ -0,0 +1,268 @@
+"""Request metrics in Prometheus text format, with load/compute spans and a slow-request log.
+
+``MetricsMiddleware`` times every request and records, per route template,
+a latency histogram, a response-size histogram and error counts (labelled
+with the exception a handler turned into an HTTP error). Handlers running on
+the worker pool also report how long they queued, how long they spent in
+artifact loads (``load_span``) and the remainder as compute. When
+``SLOW_REQUEST_SECONDS`` is set, a request still running after that long has
+its worker thread's stack sampled, and is logged with it when it finishes.
+
+Each observation is a bisect and a few additions under a lock.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with a stack sample (0 disables)
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 0))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {value:g}" for labels, value in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket = _labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]:.6g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors that produce (name, type, help, value) samples at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, float]]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, str, float]]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            for name, kind, help, value in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "Request latency.", LATENCY_BUCKETS, ("route", "method", "status"))
+)
+RESPONSE_BYTES = REGISTRY.register(
+    Histogram("http_response_size_bytes", "Response body size as sent (after compression).", SIZE_BUCKETS, ("route",))
+)
+ERRORS = REGISTRY.register(
+    Counter("http_request_errors_total", "Responses with status >= 400.", ("route", "status", "exception"))
+)
+SPAN_SECONDS = REGISTRY.register(
+    Histogram(
+        "http_request_span_seconds",
+        "Worker-pool handler time split into queue (waiting for a slot/thread), load (artifact access) and compute.",
+        LATENCY_BUCKETS,
+        ("route", "span"),
+    )
+)
+
+
+@dataclass
+class RequestTrace:
+    started: float
+    queue_seconds: float = 0.0
+    load_seconds: float = 0.0
+    work_seconds: float = 0.0
+    load_depth: int = 0
+    on_worker: bool = False
+    worker_thread: Optional[int] = None
+    exception: Optional[str] = None
+    stack: Optional[str] = None
+
+
+_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def load_span() -> Iterator[None]:
+    """Count the enclosed time as artifact loading for the current request (nested spans count once)."""
+    trace = _trace.get()
+    if trace is None or trace.load_depth:
+        yield
+        return
+    trace.load_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.load_depth -= 1
+        trace.load_seconds += time.perf_counter() - start
+
+
+def run_traced(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a handler body on a worker thread, recording its queue and work time on the request's trace."""
+    trace = _trace.get()
+    if trace is None:
+        return func(*args, **kwargs)
+    start = time.perf_counter()
+    trace.on_worker = True
+    trace.queue_seconds = start - trace.started
+    trace.worker_thread = threading.get_ident()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        trace.worker_thread = None
+        trace.work_seconds += time.perf_counter() - start
+
+
+def record_exception(exc: BaseException) -> None:
+    """Label the current request's error with ``exc``'s type, or that of the exception it replaced."""
+    trace = _trace.get()
+    if trace is not None:
+        cause = exc.__cause__ or exc.__context__ or exc
+        trace.exception = type(cause).__name__
+
+
+def _sample_stack(trace: RequestTrace) -> None:
+    frame = sys._current_frames().get(trace.worker_thread) if trace.worker_thread else None
+    if frame is not None:
+        trace.stack = "".join(traceback.format_stack(frame))
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding the request metrics (pure ASGI, so streaming responses are untouched)."""
+
+    def __init__(self, app, slow_seconds: float = SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(started=time.perf_counter())
+        token = _trace.set(trace)
+        sampler = None
+        if self.slow_seconds > 0:
+            sampler = asyncio.get_running_loop().call_later(self.slow_seconds, _sample_stack, trace)
+        response = {"status": 500, "bytes": 0, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["streaming"] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", ())
+                )
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            trace.exception = trace.exception or type(exc).__name__
+            raise
+        finally:
+            if sampler is not None:
+                sampler.cancel()
+            _trace.reset(token)
+            self._record(scope, trace, response)
+
+    def _record(self, scope, trace: RequestTrace, response: Dict[str, Any]) -> None:
+        elapsed = time.perf_counter() - trace.started
+        route = getattr(scope.get("route"), "path", "unmatched")
+        status = str(response["status"])
+        REQUEST_SECONDS.observe(elapsed, route, scope["method"], status)
+        RESPONSE_BYTES.observe(response["bytes"], route)
+        if response["status"] >= 400:
+            ERRORS.inc(route, status, trace.exception or "none")
+        if trace.on_worker:
+            SPAN_SECONDS.observe(trace.queue_seconds, route, "queue")
+            SPAN_SECONDS.observe(trace.load_seconds, route, "load")
+            SPAN_SECONDS.observe(max(trace.work_seconds - trace.load_seconds, 0.0), route, "compute")
+        if self.slow_seconds > 0 and elapsed >= self.slow_seconds and not response["streaming"]:
+            logger.warning(
+                "Slow request %s %s: %.3fs (status %s; queue %.3fs, load %.3fs, compute %.3fs)%s",
+                scope["method"],
+                route,
+                elapsed,
+                status,
+                trace.queue_seconds,
+                trace.load_seconds,
+                max(trace.work_seconds - trace.load_seconds, 0.0),
+                "\nWorker stack when slow:\n" + trace.stack if trace.stack else "",
+            )
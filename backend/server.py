@@ -1,20 +1,33 @@
 """FastAPI Backend for Brain Score App."""
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any
 import json
 import pandas as pd
 import math
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from functools import cached_property
 import os
 from dotenv import load_dotenv
 
+from artifact_cache import ArtifactCache, file_version
+from concurrency import limited
+from date_index import DateIndex
+from http_cache import Payload, conditional_response, make_payload
+from json_responses import FastJSONResponse, dumps, read_json_bytes
+from live_stream import LiveHub
+from metrics import REGISTRY, MetricsMiddleware, load_span, record_exception
+from session_analytics import compute_session_analytics
+
 load_dotenv()
 
-app = FastAPI(title="Brain Score API")
+# orjson responses: NaN/inf serialize as null without a sanitising pass
+app = FastAPI(title="Brain Score API", default_response_class=FastJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -25,39 +38,157 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, size, error and span metrics for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Data paths
-DATA_DIR = Path("/app/data/processed")
+DATA_DIR = Path(os.getenv('DATA_DIR', '/app/data/processed'))
 MUSE_DIR = DATA_DIR / "muse"
 APPLE_HEALTH_DIR = DATA_DIR / "apple_health"
 
+# Parsed artifacts shared across requests; files are re-stat'ed at most once a second
+ARTIFACTS = ArtifactCache(
+    max_bytes=int(float(os.getenv('ARTIFACT_CACHE_MB', 256)) * 1024**2),
+    revalidate_seconds=float(os.getenv('ARTIFACT_REVALIDATE_SECONDS', 1.0)),
+)
+# Per-query bodies (timeline zooms, date ranges) get their own small LRU, so a client
+# sweeping query strings evicts other queries, not the frames every endpoint shares
+QUERY_PAYLOADS = ArtifactCache(
+    max_bytes=int(float(os.getenv('QUERY_PAYLOAD_CACHE_MB', 32)) * 1024**2),
+    revalidate_seconds=ARTIFACTS.revalidate_seconds,
+)
+
+# Live session sources, one tailing producer per file
+LIVE_SESSIONS = LiveHub()
+
 # Request models
 class SessionAnalyzeRequest(BaseModel):
     participant_id: int = 0
     max_hours: float = 1.0
 
 # Helper functions
-def load_json(file_path: Path) -> Any:
-    """Load JSON file."""
+def read_json(file_path: Path) -> Any:
+    """Read and parse a JSON file."""
     with open(file_path, 'r') as f:
         return json.load(f)
 
+def load_json(file_path: Path) -> Any:
+    """Load JSON file (cached until it changes on disk; do not mutate)."""
+    with load_span():
+        return ARTIFACTS.get(file_path, read_json)
+
+def load_payload(file_path: Path, render=read_json_bytes, variant: str = "") -> Payload:
+    """Response body rendered from a file, with ETag and gzip/brotli encodings, built once per file version.
+
+    ``variant`` must identify the rendering (e.g. its query parameters) when
+    several bodies are served from one file; those are cached in ``QUERY_PAYLOADS``.
+    """
+    def build(path: Path) -> Payload:
+        version = file_version(path)
+        return make_payload(render(path), version, variant)
+    cache = QUERY_PAYLOADS if variant else ARTIFACTS
+    with load_span():
+        return cache.get(file_path, build, kind=("payload", variant))
+
 def load_parquet(file_path: Path) -> pd.DataFrame:
-    """Load Parquet file."""
-    return pd.read_parquet(file_path)
+    """Load Parquet file (cached until it changes on disk; do not mutate)."""
+    with load_span():
+        return ARTIFACTS.get(file_path, pd.read_parquet, kind="parquet")
+
+def load_artifact(loader, file_path: Path, detail: str):
+    """Load a cached artifact, turning a missing file into a 404."""
+    try:
+        return loader(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=detail)
+
+def wall_clock(value: Optional[datetime]) -> Optional[datetime]:
+    """``value`` as a naive local time, like the Muse timestamps.
+
+    Mind Monitor records the device's local time without an offset, and Apple
+    Health writes local times with theirs, so an aware value keeps its own wall
+    clock and drops the offset. Both sides must come from the same timezone,
+    the one the recording was made in; naive values are taken as already local.
+    """
+    if value is None:
+        return value
+    return value.replace(tzinfo=None)
+
+def most_recent(records: List[Dict], count: int) -> List[Dict]:
+    """The last ``count`` of date-ascending records (the Apple Health slices are written oldest first)."""
+    return records[max(len(records) - count, 0):]
+
+def read_date_index(file_path: Path, column: str) -> DateIndex:
+    """Build a date index over a Parquet file's ``column``."""
+    return DateIndex.from_parquet(file_path, column)
+
+def load_date_index(file_path: Path, column: str) -> DateIndex:
+    """Date index for a Parquet file, rebuilt only when it changes."""
+    with load_span():
+        return ARTIFACTS.get(file_path, lambda path: read_date_index(path, column), kind=("date_index", column))
 
 def get_muse_session_data(participant_id: int) -> Dict:
     """Get Muse session data for a participant."""
     session_file = MUSE_DIR / f"participant_museData{participant_id}_session.json"
-    if not session_file.exists():
-        raise HTTPException(status_code=404, detail=f"Participant {participant_id} not found")
-    return load_json(session_file)
+    return load_artifact(load_json, session_file, f"Participant {participant_id} not found")
+
+def get_muse_pyramid_data(participant_id: int) -> pd.DataFrame:
+    """Get the multi-resolution window pyramid for a participant."""
+    pyramid_file = MUSE_DIR / f"participant_museData{participant_id}_pyramid.parquet"
+    return load_artifact(load_parquet, pyramid_file, f"Timeline pyramid for participant {participant_id} not found")
 
 def get_muse_windows_data(participant_id: int) -> pd.DataFrame:
     """Get Muse windows data for a participant."""
     windows_file = MUSE_DIR / f"participant_museData{participant_id}_windows.parquet"
-    if not windows_file.exists():
-        raise HTTPException(status_code=404, detail=f"Windows data for participant {participant_id} not found")
-    return load_parquet(windows_file)
+    return load_artifact(load_parquet, windows_file, f"Windows data for participant {participant_id} not found")
+
+def read_session_analytics(file_path: Path) -> Dict:
+    """Compute session analytics from a windows Parquet file."""
+    return compute_session_analytics(load_parquet(file_path))
+
+def load_session_analytics(file_path: Path) -> Dict:
+    """Session analytics for a windows file, recomputed only when it changes (do not mutate)."""
+    with load_span():
+        return ARTIFACTS.get(file_path, read_session_analytics)
+
+def get_session_analytics(participant_id: int) -> Dict:
+    """Get materialized session analytics for a participant."""
+    windows_file = MUSE_DIR / f"participant_museData{participant_id}_windows.parquet"
+    return load_artifact(load_session_analytics, windows_file, f"Windows data for participant {participant_id} not found")
+
+class ParticipantData:
+    """One participant's artifacts and shared intermediates, each loaded at most once per request."""
+
+    def __init__(self, participant_id: int):
+        self.participant_id = participant_id
+
+    @cached_property
+    def session(self) -> Dict:
+        return get_muse_session_data(self.participant_id)
+
+    @cached_property
+    def windows(self) -> pd.DataFrame:
+        return get_muse_windows_data(self.participant_id)
+
+    @cached_property
+    def analytics(self) -> Dict:
+        return get_session_analytics(self.participant_id)
+
+    @cached_property
+    def sleep(self) -> List[Dict]:
+        return load_json(APPLE_HEALTH_DIR / "sleep_last_20_days.json")
+
+    @cached_property
+    def workouts(self) -> List[Dict]:
+        return load_json(APPLE_HEALTH_DIR / "workouts_last_20_days.json")
+
+    @cached_property
+    def session_start(self) -> datetime:
+        return datetime.fromisoformat(self.session['session_start'].replace('Z', '+00:00'))
+
+    @cached_property
+    def optimal_rows(self) -> pd.DataFrame:
+        return self.windows[self.windows['lri'] >= 70]
 
 # Endpoints
 
@@ -70,529 +201,626 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.exception_handler(HTTPException)
+async def handle_http_exception(request: Request, exc: HTTPException):
+    """Default HTTP error response; records which exception caused it for the error metrics."""
+    record_exception(exc)
+    return await http_exception_handler(request, exc)
+
+def cache_samples(cache: ArtifactCache, prefix: str, label: str):
+    stats = cache.stats()
+    return [
+        (f"{prefix}_hits_total", "counter", f"{label} hits.", stats['hits']),
+        (f"{prefix}_misses_total", "counter", f"{label} misses (loads).", stats['misses']),
+        (f"{prefix}_evictions_total", "counter", f"{label} LRU evictions.", stats['evictions']),
+        (f"{prefix}_hit_ratio", "gauge", f"{label} hits / lookups.", stats['hit_rate'] or 0.0),
+        (f"{prefix}_entries", "gauge", f"{label} entries.", stats['entries']),
+        (f"{prefix}_bytes", "gauge", f"Approximate bytes held by the {label.lower()}.", stats['bytes']),
+    ]
+
+REGISTRY.add_collector(lambda: cache_samples(ARTIFACTS, "artifact_cache", "Artifact cache"))
+REGISTRY.add_collector(lambda: cache_samples(QUERY_PAYLOADS, "query_payload_cache", "Query payload cache"))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, span, error and cache metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Artifact cache size and hit/miss counters, with the per-query payload cache's under ``query_payloads``."""
+    return {**ARTIFACTS.stats(), "query_payloads": QUERY_PAYLOADS.stats()}
+
 @app.post("/api/session/analyze")
-async def analyze_session(request: SessionAnalyzeRequest):
+@limited()
+def analyze_session(request: SessionAnalyzeRequest):
     """Analyze a Muse EEG session."""
     try:
         session_data = get_muse_session_data(request.participant_id)
-        windows_df = get_muse_windows_data(request.participant_id)
+        analytics = get_session_analytics(request.participant_id)
         
-        # Calculate session metrics from windows data
-        if len(windows_df) == 0:
+        if analytics['num_windows'] == 0:
             raise HTTPException(status_code=400, detail="No windows data available")
         
-        # Get LRI values
-        lri_values = windows_df['lri'].values
-        
-        # Find optimal windows (LRI >= 70)
-        optimal_threshold = 70
-        optimal_windows = []
-        
-        in_window = False
-        window_start_idx = 0
-        
-        for idx, row in windows_df.iterrows():
-            if row['lri'] >= optimal_threshold:
-                if not in_window:
-                    window_start_idx = idx
-                    in_window = True
-            else:
-                if in_window:
-                    window_rows = windows_df.loc[window_start_idx:idx-1]
-                    start_time = window_rows.iloc[0]['window_start']
-                    end_time = window_rows.iloc[-1]['window_end']
-                    optimal_windows.append({
-                        "start": start_time.isoformat() if hasattr(start_time, 'isoformat') else str(start_time),
-                        "end": end_time.isoformat() if hasattr(end_time, 'isoformat') else str(end_time),
-                        "duration_minutes": len(window_rows) * 2.5,  # 2.5 min windows
-                        "avg_lri": float(window_rows['lri'].mean()),
-                        "quality": "excellent" if window_rows['lri'].mean() >= 85 else "very_good" if window_rows['lri'].mean() >= 75 else "good"
-                    })
-                    in_window = False
-        
-        # Close last window if still open
-        if in_window:
-            window_rows = windows_df.loc[window_start_idx:]
-            start_time = window_rows.iloc[0]['window_start']
-            end_time = window_rows.iloc[-1]['window_end']
-            optimal_windows.append({
-                "start": start_time.isoformat() if hasattr(start_time, 'isoformat') else str(start_time),
-                "end": end_time.isoformat() if hasattr(end_time, 'isoformat') else str(end_time),
-                "duration_minutes": len(window_rows) * 2.5,
-                "avg_lri": float(window_rows['lri'].mean()),
-                "quality": "excellent" if window_rows['lri'].mean() >= 85 else "very_good" if window_rows['lri'].mean() >= 75 else "good"
-            })
-        
-        # Calculate time in state
-        optimal_minutes = len(windows_df[windows_df['lri'] >= 70]) * 2.5
-        moderate_minutes = len(windows_df[(windows_df['lri'] >= 40) & (windows_df['lri'] < 70)]) * 2.5
-        low_minutes = len(windows_df[windows_df['lri'] < 40]) * 2.5
-        
-        # Component scores - handle NaN values
-        def safe_mean(series, default):
-            if series.empty:
-                return default
-            mean_val = series.mean()
-            return float(mean_val) if not pd.isna(mean_val) else default
-        
-        component_scores = {
-            "alertness": safe_mean(windows_df.get('alertness', pd.Series()), 65.0),
-            "focus": safe_mean(windows_df.get('focus', pd.Series()), 58.0),
-            "arousal_balance": safe_mean(windows_df.get('arousal_balance', pd.Series()), 42.0)
-        }
-        
-        # Session score (weighted by time in optimal state)
-        session_score = (optimal_minutes / (optimal_minutes + moderate_minutes + low_minutes) * 100) if (optimal_minutes + moderate_minutes + low_minutes) > 0 else 0
-        
-        peak_idx = windows_df['lri'].idxmax()
-        peak_row = windows_df.loc[peak_idx]
-        
-        # Generate insights
-        insights = [
-            f"Peak Score of {peak_row['lri']:.1f} reached",
-            f"You maintained optimal state for {optimal_minutes:.0f} minutes ({(optimal_minutes/(optimal_minutes+moderate_minutes+low_minutes)*100):.0f}% of session)" if optimal_minutes > 0 else "Consider timing session after exercise for better results",
-            "Your focus metrics are strong" if component_scores['focus'] > 60 else "Try reducing distractions during session"
-        ]
-        
-        recommendations = [
-            "Schedule deep work during optimal windows" if len(optimal_windows) > 0 else "Try measuring after morning workout",
-            "Optimal windows typically occur 1-3 hours post-exercise"
-        ]
-        
-        # Prepare timeline data with proper serialization
-        timeline_data = []
-        for _, row in windows_df[['window_start', 'lri']].head(50).iterrows():
-            timeline_data.append({
-                'window_start': row['window_start'].isoformat() if hasattr(row['window_start'], 'isoformat') else str(row['window_start']),
-                'lri': float(row['lri']) if not pd.isna(row['lri']) else 0.0
-            })
-        
+        time_in_state = analytics['time_in_state']
         return {
             "session_duration_minutes": session_data.get('session_duration_minutes', 0),
-            "peak_lri": float(peak_row['lri']) if not pd.isna(peak_row['lri']) else 0.0,
-            "peak_timestamp": peak_row['window_start'].isoformat() if hasattr(peak_row['window_start'], 'isoformat') else str(peak_row['window_start']),
-            "avg_lri": float(windows_df['lri'].mean()) if not pd.isna(windows_df['lri'].mean()) else 0.0,
-            "median_lri": float(windows_df['lri'].median()) if not pd.isna(windows_df['lri'].median()) else 0.0,
-            "std_dev": float(windows_df['lri'].std()) if not pd.isna(windows_df['lri'].std()) else 0.0,
-            "optimal_windows": optimal_windows,
-            "time_in_state": {
-                "optimal_minutes": round(optimal_minutes, 2),
-                "moderate_minutes": round(moderate_minutes, 2),
-                "low_minutes": round(low_minutes, 2)
-            },
-            "component_scores": component_scores,
-            "session_score": round(session_score, 1),
-            "insights": insights,
-            "recommendations": recommendations,
-            "lri_timeline": timeline_data
+            "peak_lri": analytics['peak_lri'],
+            "peak_timestamp": analytics['peak_timestamp'],
+            "avg_lri": analytics['avg_lri'],
+            "median_lri": analytics['median_lri'],
+            "std_dev": analytics['std_dev'],
+            "optimal_windows": analytics['optimal_windows'],
+            "time_in_state": {name: round(minutes, 2) for name, minutes in time_in_state.items()},
+            "component_scores": analytics['component_scores'],
+            "session_score": round(analytics['session_score'], 1),
+            "insights": analytics['insights'],
+            "recommendations": analytics['recommendations'],
+            "lri_timeline": analytics['lri_timeline']
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sleep/last20")
-async def get_sleep_last_20():
+@limited()
+def get_sleep_last_20(request: Request):
     """Get last 20 days of sleep data."""
     try:
         sleep_file = APPLE_HEALTH_DIR / "sleep_last_20_days.json"
-        data = load_json(sleep_file)
-        
-        # Sanitize NaN values
-        def sanitize(obj):
-            if isinstance(obj, float):
-                if pd.isna(obj) or not math.isfinite(obj):
-                    return None
-                return obj
-            elif isinstance(obj, dict):
-                return {k: sanitize(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [sanitize(item) for item in obj]
-            return obj
-        
-        return sanitize(data)
+        return conditional_response(request, load_payload(sleep_file))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/workouts/last20")
-async def get_workouts_last_20():
+@limited()
+def get_workouts_last_20(request: Request):
     """Get last 20 days of workout data."""
     try:
         workouts_file = APPLE_HEALTH_DIR / "workouts_last_20_days.json"
-        data = load_json(workouts_file)
-        
-        # Sanitize NaN values
-        def sanitize(obj):
-            if isinstance(obj, float):
-                if pd.isna(obj) or not math.isfinite(obj):
-                    return None
-                return obj
-            elif isinstance(obj, dict):
-                return {k: sanitize(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [sanitize(item) for item in obj]
-            return obj
-        
-        return sanitize(data)
+        return conditional_response(request, load_payload(workouts_file))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_optimal_window_status(data: ParticipantData) -> Dict:
+    """Latest optimal window (LRI >= 70) of the session."""
+    # For demo, return latest optimal window
+    optimal_rows = data.optimal_rows
+
+    if len(optimal_rows) > 0:
+        latest_optimal = optimal_rows.iloc[-1]
+        quality = "excellent" if latest_optimal['lri'] >= 85 else "very_good" if latest_optimal['lri'] >= 75 else "good"
+
+        window_start = latest_optimal['window_start']
+        window_end = latest_optimal['window_end']
+
+        return {
+            "has_window": True,
+            "window_start": window_start.isoformat() if hasattr(window_start, 'isoformat') else str(window_start),
+            "window_end": window_end.isoformat() if hasattr(window_end, 'isoformat') else str(window_end),
+            "quality": quality,
+            "current_lri": float(latest_optimal['lri']) if not pd.isna(latest_optimal['lri']) else 0.0
+        }
+
+    return {
+        "has_window": False,
+        "quality": "none",
+        "message": "No optimal window currently"
+    }
+
 @app.get("/api/session/optimal-window-status")
-async def get_optimal_window_status(participant_id: int = 0):
+@limited()
+def get_optimal_window_status(participant_id: int = 0):
     """Get current optimal window status."""
     try:
-        session_data = get_muse_session_data(participant_id)
-        windows_df = get_muse_windows_data(participant_id)
-        
-        # For demo, return latest optimal window
-        optimal_rows = windows_df[windows_df['lri'] >= 70]
-        
-        if len(optimal_rows) > 0:
-            latest_optimal = optimal_rows.iloc[-1]
-            quality = "excellent" if latest_optimal['lri'] >= 85 else "very_good" if latest_optimal['lri'] >= 75 else "good"
-            
-            window_start = latest_optimal['window_start']
-            window_end = latest_optimal['window_end']
-            
-            return {
-                "has_window": True,
-                "window_start": window_start.isoformat() if hasattr(window_start, 'isoformat') else str(window_start),
-                "window_end": window_end.isoformat() if hasattr(window_end, 'isoformat') else str(window_end),
-                "quality": quality,
-                "current_lri": float(latest_optimal['lri']) if not pd.isna(latest_optimal['lri']) else 0.0
-            }
-        
-        return {
-            "has_window": False,
-            "quality": "none",
-            "message": "No optimal window currently"
-        }
-    
+        return build_optimal_window_status(ParticipantData(participant_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_today_summary(data: ParticipantData) -> Dict:
+    """Today's session summary from the materialized analytics."""
+    analytics = data.analytics
+    optimal_percentage = analytics['optimal_percentage']
+
+    session_score = optimal_percentage  # Simplified
+
+    return {
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "peak_lri": round(analytics['peak_lri'], 1),
+        "peak_time": analytics['peak_timestamp'],
+        "optimal_minutes": round(analytics['time_in_state']['optimal_minutes'], 1),
+        "optimal_percentage": round(optimal_percentage, 1),
+        "session_score": round(session_score, 1),
+        "has_session_data": True
+    }
+
 @app.get("/api/session/today-summary")
-async def get_today_summary(participant_id: int = 0):
+@limited()
+def get_today_summary(participant_id: int = 0):
     """Get today's session summary."""
     try:
-        windows_df = get_muse_windows_data(participant_id)
-        
-        peak_lri = float(windows_df['lri'].max())
-        peak_idx = windows_df['lri'].idxmax()
-        peak_time = windows_df.loc[peak_idx, 'window_start']
-        
-        optimal_minutes = len(windows_df[windows_df['lri'] >= 70]) * 2.5
-        total_minutes = len(windows_df) * 2.5
-        optimal_percentage = (optimal_minutes / total_minutes * 100) if total_minutes > 0 else 0
-        
-        session_score = optimal_percentage  # Simplified
-        
-        return {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "peak_lri": round(peak_lri, 1),
-            "peak_time": peak_time.isoformat() if hasattr(peak_time, 'isoformat') else str(peak_time),
-            "optimal_minutes": round(optimal_minutes, 1),
-            "optimal_percentage": round(optimal_percentage, 1),
-            "session_score": round(session_score, 1),
-            "has_session_data": True
-        }
-    
+        return build_today_summary(ParticipantData(participant_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_current_metrics(data: ParticipantData) -> Dict:
+    """Component means and last-20-window sparklines."""
+    windows_df = data.windows
+
+    # Get recent values (last 20 windows for sparkline)
+    recent_df = windows_df.tail(20)
+
+    def safe_mean(series, default):
+        if series.empty:
+            return default
+        mean_val = series.mean()
+        return float(mean_val) if not pd.isna(mean_val) else default
+
+    def safe_list(series, default_val, count=20):
+        if series.empty:
+            return [default_val] * count
+        result = []
+        for val in series.tolist():
+            result.append(float(val) if not pd.isna(val) else default_val)
+        return result
+
+    return {
+        "alertness": safe_mean(windows_df.get('alertness', pd.Series()), 65),
+        "focus": safe_mean(windows_df.get('focus', pd.Series()), 58),
+        "arousal_balance": safe_mean(windows_df.get('arousal_balance', pd.Series()), 42),
+        "sparkline_data": {
+            "alertness": safe_list(recent_df.get('alertness', pd.Series()), 65),
+            "focus": safe_list(recent_df.get('focus', pd.Series()), 58),
+            "arousal": safe_list(recent_df.get('arousal_balance', pd.Series()), 42)
+        }
+    }
+
 @app.get("/api/session/current-metrics")
-async def get_current_metrics(participant_id: int = 0):
+@limited()
+def get_current_metrics(participant_id: int = 0):
     """Get current session metrics."""
     try:
-        windows_df = get_muse_windows_data(participant_id)
-        
-        # Get recent values (last 20 windows for sparkline)
-        recent_df = windows_df.tail(20)
-        
-        def safe_mean(series, default):
-            if series.empty:
-                return default
-            mean_val = series.mean()
-            return float(mean_val) if not pd.isna(mean_val) else default
-        
-        def safe_list(series, default_val, count=20):
-            if series.empty:
-                return [default_val] * count
-            result = []
-            for val in series.tolist():
-                result.append(float(val) if not pd.isna(val) else default_val)
-            return result
-        
-        return {
-            "alertness": safe_mean(windows_df.get('alertness', pd.Series()), 65),
-            "focus": safe_mean(windows_df.get('focus', pd.Series()), 58),
-            "arousal_balance": safe_mean(windows_df.get('arousal_balance', pd.Series()), 42),
-            "sparkline_data": {
-                "alertness": safe_list(recent_df.get('alertness', pd.Series()), 65),
-                "focus": safe_list(recent_df.get('focus', pd.Series()), 58),
-                "arousal": safe_list(recent_df.get('arousal_balance', pd.Series()), 42)
-            }
-        }
-    
+        return build_current_metrics(ParticipantData(participant_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_brain_score(data: ParticipantData) -> Dict:
+    """Brain score from session analytics and the latest sleep record."""
+    # Load session analytics
+    analytics = data.analytics
+
+    # Load sleep data
+    sleep_data = data.sleep
+    latest_sleep = sleep_data[-1] if len(sleep_data) > 0 else {}
+
+    # === 1. LEARNING READINESS (55%) - Session Score ===
+    # Formula: 0.5 × avg_LRI + 0.3 × optimal_utilization + 0.2 × sleep_context
+
+    avg_lri = analytics['avg_lri']
+    optimal_utilization = analytics['optimal_percentage']
+
+    sleep_score_value = latest_sleep.get('sleep_score', 75)
+    sleep_context = sleep_score_value  # Use sleep score as context
+
+    # Session score calculation
+    session_score = (
+        0.50 * avg_lri +
+        0.30 * optimal_utilization +
+        0.20 * sleep_context
+    )
+
+    # Apply soft ceiling at 92 (Yerkes-Dodson inverted-U)
+    learning_readiness = min(session_score, 92)
+
+    # === 2. CONSOLIDATION (25%) - Sleep Score ===
+    consolidation = sleep_score_value
+
+    # === 3. BEHAVIOR ALIGNMENT (20%) ===
+    # Baseline 50, +10 if post-exercise session, +5 per workout utilized
+    # For demo: assume 1 workout, session was in optimal window
+    behavior_alignment = 50 + 10 + 5  # = 65
+    behavior_alignment = min(behavior_alignment, 95)  # Clamp
+
+    # === BRAIN SCORE (NEUROPLASTICITY READINESS) ===
+    brain_score = (
+        learning_readiness * 0.55 +
+        consolidation * 0.25 +
+        behavior_alignment * 0.20
+    )
+
+    return {
+        "brain_score": round(brain_score, 1),
+        "components": {
+            "learning_readiness": round(learning_readiness, 1),
+            "consolidation": round(consolidation, 1),
+            "behavior_alignment": round(behavior_alignment, 1)
+        },
+        "session_details": {
+            "avg_lri": round(avg_lri, 1),
+            "optimal_utilization": round(optimal_utilization, 1),
+            "sleep_context": round(sleep_context, 1)
+        },
+        "supporting_metrics": {
+            "best_session_id": f"sess_{datetime.now().strftime('%Y-%m-%d')}_morning",
+            "sleep_score": {"value": sleep_score_value, "version": "hrv_enabled"},
+            "workout_hits": 1
+        },
+        "insight": "Schedule deep work in the 2h window after your run."
+    }
+
 @app.get("/api/brain-score/today")
-async def get_brain_score_today(participant_id: int = 0):
+@limited()
+def get_brain_score_today(participant_id: int = 0):
     """Get today's brain score."""
     try:
-        # Load session data
-        windows_df = get_muse_windows_data(participant_id)
-        
-        # Load sleep data
-        sleep_data = load_json(APPLE_HEALTH_DIR / "sleep_last_20_days.json")
-        latest_sleep = sleep_data[0] if len(sleep_data) > 0 else {}
-        
-        # === 1. LEARNING READINESS (55%) - Session Score ===
-        # Formula: 0.5 × avg_LRI + 0.3 × optimal_utilization + 0.2 × sleep_context
-        
-        avg_lri = float(windows_df['lri'].mean()) if not pd.isna(windows_df['lri'].mean()) else 0.0
-        
-        optimal_minutes = len(windows_df[windows_df['lri'] >= 70]) * 2.5
-        total_minutes = len(windows_df) * 2.5
-        optimal_utilization = (optimal_minutes / total_minutes * 100) if total_minutes > 0 else 0
-        
-        sleep_score_value = latest_sleep.get('sleep_score', 75)
-        sleep_context = sleep_score_value  # Use sleep score as context
-        
-        # Session score calculation
-        session_score = (
-            0.50 * avg_lri +
-            0.30 * optimal_utilization +
-            0.20 * sleep_context
-        )
-        
-        # Apply soft ceiling at 92 (Yerkes-Dodson inverted-U)
-        learning_readiness = min(session_score, 92)
-        
-        # === 2. CONSOLIDATION (25%) - Sleep Score ===
-        consolidation = sleep_score_value
-        
-        # === 3. BEHAVIOR ALIGNMENT (20%) ===
-        # Baseline 50, +10 if post-exercise session, +5 per workout utilized
-        # For demo: assume 1 workout, session was in optimal window
-        behavior_alignment = 50 + 10 + 5  # = 65
-        behavior_alignment = min(behavior_alignment, 95)  # Clamp
-        
-        # === BRAIN SCORE (NEUROPLASTICITY READINESS) ===
-        brain_score = (
-            learning_readiness * 0.55 +
-            consolidation * 0.25 +
-            behavior_alignment * 0.20
-        )
-        
-        return {
-            "brain_score": round(brain_score, 1),
-            "components": {
-                "learning_readiness": round(learning_readiness, 1),
-                "consolidation": round(consolidation, 1),
-                "behavior_alignment": round(behavior_alignment, 1)
-            },
-            "session_details": {
-                "avg_lri": round(avg_lri, 1),
-                "optimal_utilization": round(optimal_utilization, 1),
-                "sleep_context": round(sleep_context, 1)
-            },
-            "supporting_metrics": {
-                "best_session_id": f"sess_{datetime.now().strftime('%Y-%m-%d')}_morning",
-                "sleep_score": {"value": sleep_score_value, "version": "hrv_enabled"},
-                "workout_hits": 1
-            },
-            "insight": "Schedule deep work in the 2h window after your run."
-        }
-    
+        return build_brain_score(ParticipantData(participant_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/workouts/recent")
-async def get_recent_workouts(days: int = 7):
+@limited()
+def get_recent_workouts(request: Request, days: int = 7):
     """Get recent workouts."""
     try:
         workouts_file = APPLE_HEALTH_DIR / "workouts_last_20_days.json"
-        data = load_json(workouts_file)
-        
-        def sanitize(obj):
-            if isinstance(obj, float):
-                if pd.isna(obj) or not math.isfinite(obj):
-                    return None
-                return obj
-            elif isinstance(obj, dict):
-                return {k: sanitize(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [sanitize(item) for item in obj]
-            return obj
-        
-        result = data[:days] if len(data) > days else data
-        return sanitize(result)
+        render = lambda path: dumps(most_recent(load_json(path), days))
+        return conditional_response(request, load_payload(workouts_file, render, f"recent:{days}"))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sleep/recent")
-async def get_recent_sleep(days: int = 7):
+@limited()
+def get_recent_sleep(request: Request, days: int = 7):
     """Get recent sleep records."""
     try:
         sleep_file = APPLE_HEALTH_DIR / "sleep_last_20_days.json"
-        data = load_json(sleep_file)
-        
-        def sanitize(obj):
-            if isinstance(obj, float):
-                if pd.isna(obj) or not math.isfinite(obj):
-                    return None
-                return obj
-            elif isinstance(obj, dict):
-                return {k: sanitize(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [sanitize(item) for item in obj]
-            return obj
-        
-        result = data[:days] if len(data) > days else data
-        return {"sleep_records": sanitize(result)}
+        render = lambda path: dumps({"sleep_records": most_recent(load_json(path), days)})
+        return conditional_response(request, load_payload(sleep_file, render, f"recent:{days}"))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def get_date_range(request: Request, file_path: Path, column: str, field: str, start: Optional[date], end: Optional[date]):
+    """Records of an indexed history file dated in [start, end], as a conditional response."""
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    render = lambda path: load_date_index(path, column).range_json(field, start, end)
+    payload = load_artifact(
+        lambda path: load_payload(path, render, f"range:{start}:{end}"), file_path, f"{file_path.name} not found"
+    )
+    return conditional_response(request, payload)
+
+@app.get("/api/sleep")
+@limited()
+def get_sleep_range(
+    request: Request,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+):
+    """Get sleep records for nights dated from..to (inclusive; either bound optional)."""
+    try:
+        return get_date_range(request, APPLE_HEALTH_DIR / "sleep_records.parquet", "date", "sleep_records", start, end)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/workouts")
+@limited()
+def get_workouts_range(
+    request: Request,
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+):
+    """Get workouts started on dates from..to (local date, inclusive; either bound optional)."""
+    try:
+        return get_date_range(request, APPLE_HEALTH_DIR / "workouts.parquet", "start_time", "workouts", start, end)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def build_session_context(data: ParticipantData) -> Dict:
+    """Session timing, post-exercise and circadian context."""
+    session_data = data.session
+    analytics = data.analytics
+
+    # Get workout data
+    workout_data = data.workouts
+    latest_workout = workout_data[-1] if len(workout_data) > 0 else None
+
+    # Calculate post-exercise hours
+    post_exercise_hours = None
+    if latest_workout:
+        # Muse timestamps are naive local time, Apple Health ones carry an offset: compare wall clocks
+        session_start = wall_clock(data.session_start)
+        workout_end = wall_clock(datetime.fromisoformat(latest_workout['end_time'].replace('Z', '+00:00')))
+        diff = session_start - workout_end
+        post_exercise_hours = diff.total_seconds() / 3600
+
+    # Count gamma peaks (LRI > 70)
+    gamma_peaks = analytics['optimal_count']
+
+    # Flow minutes: time covered by optimal windows
+    flow_minutes = analytics['time_in_state']['optimal_minutes']
+
+    # Determine circadian phase
+    session_hour = data.session_start.hour
+    if 6 <= session_hour < 11:
+        circadian_phase = 'morning_peak'
+    elif 14 <= session_hour < 17:
+        circadian_phase = 'afternoon_dip'
+    elif 17 <= session_hour < 21:
+        circadian_phase = 'evening_peak'
+    else:
+        circadian_phase = 'sleep'
+
+    return {
+        "participant_id": data.participant_id,
+        "session_time": {
+            "start": session_data['session_start'],
+            "end": session_data['session_end'],
+            "duration_minutes": session_data['session_duration_minutes']
+        },
+        "context": {
+            "post_exercise_hours": round(post_exercise_hours, 1) if post_exercise_hours else None,
+            "workout_type": latest_workout.get('workout_type', 'Unknown') if latest_workout else None,
+            "circadian_phase": circadian_phase,
+            "optimal_window": post_exercise_hours and 1 <= post_exercise_hours <= 4 if post_exercise_hours else False
+        },
+        "performance": {
+            "peak_moments": gamma_peaks,
+            "flow_minutes": round(flow_minutes, 1),
+            "peak_lri": analytics['peak_lri']
+        }
+    }
+
 @app.get("/api/session/context")
-async def get_session_context(participant_id: int = 0):
+@limited()
+def get_session_context(participant_id: int = 0):
     """Get contextual information about the session."""
     try:
-        session_data = get_muse_session_data(participant_id)
-        windows_df = get_muse_windows_data(participant_id)
-        
-        # Get workout data
-        workout_data = load_json(APPLE_HEALTH_DIR / "workouts_last_20_days.json")
-        latest_workout = workout_data[0] if len(workout_data) > 0 else None
-        
-        # Calculate post-exercise hours
-        post_exercise_hours = None
-        if latest_workout:
-            session_start = datetime.fromisoformat(session_data['session_start'].replace('Z', '+00:00'))
-            workout_end = datetime.fromisoformat(latest_workout['end_time'].replace('Z', '+00:00'))
-            diff = session_start - workout_end
-            post_exercise_hours = diff.total_seconds() / 3600
-        
-        # Count gamma peaks (LRI > 70)
-        gamma_peaks = len(windows_df[windows_df['lri'] >= 70])
-        
-        # Calculate flow minutes
-        flow_minutes = len(windows_df[windows_df['lri'] >= 70]) * 2.5
-        
-        # Determine circadian phase
-        session_hour = datetime.fromisoformat(session_data['session_start'].replace('Z', '+00:00')).hour
-        if 6 <= session_hour < 11:
-            circadian_phase = 'morning_peak'
-        elif 14 <= session_hour < 17:
-            circadian_phase = 'afternoon_dip'
-        elif 17 <= session_hour < 21:
-            circadian_phase = 'evening_peak'
-        else:
-            circadian_phase = 'sleep'
-        
-        return {
-            "participant_id": participant_id,
-            "session_time": {
-                "start": session_data['session_start'],
-                "end": session_data['session_end'],
-                "duration_minutes": session_data['session_duration_minutes']
-            },
-            "context": {
-                "post_exercise_hours": round(post_exercise_hours, 1) if post_exercise_hours else None,
-                "workout_type": latest_workout.get('workout_type', 'Unknown') if latest_workout else None,
-                "circadian_phase": circadian_phase,
-                "optimal_window": post_exercise_hours and 1 <= post_exercise_hours <= 4 if post_exercise_hours else False
-            },
-            "performance": {
-                "peak_moments": gamma_peaks,
-                "flow_minutes": round(flow_minutes, 1),
-                "peak_lri": float(windows_df['lri'].max())
-            }
-        }
+        return build_session_context(ParticipantData(participant_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def build_daily_timeline(data: ParticipantData) -> Dict:
+    """Full-day circadian baseline with the measured session overlaid."""
+    session_data = data.session
+    windows_df = data.windows
+
+    workout_data = data.workouts
+
+    # Calculate circadian baseline (simplified)
+    wake_time = 6.5  # 6:30 AM
+    sleep_time = 22.0  # 10:00 PM
+
+    baseline = []
+    for h_idx in range(96):  # 15-min intervals for 24h
+        h = h_idx * 0.25
+        if h < wake_time or h > sleep_time:
+            baseline.append(20)
+        else:
+            hours_awake = h - wake_time
+            # Simplified circadian curve
+            value = 40 + (30 * math.sin((hours_awake / 16) * math.pi))
+            # Add morning boost
+            if hours_awake < 4:
+                value += hours_awake * 8
+            # Afternoon dip
+            if 6 < hours_awake < 9:
+                value -= 15
+            baseline.append(min(max(value, 30), 95))
+
+    # Extract measured session data
+    session_start = data.session_start
+    start_hour = session_start.hour + session_start.minute / 60
+
+    measured_lri = []
+    for idx, row in windows_df.iterrows():
+        measured_lri.append({
+            "hour": start_hour + (idx * 2.5 / 60),  # 2.5 min windows
+            "lri": float(row['lri']) if not pd.isna(row['lri']) else None
+        })
+
+    # Get gamma peaks
+    peaks = []
+    for idx, row in data.optimal_rows.iterrows():
+        peaks.append({
+            "hour": start_hour + (idx * 2.5 / 60),
+            "lri": float(row['lri']),
+            "duration_min": 2.5
+        })
+
+    # Events
+    events = [
+        {"hour": wake_time, "type": "wake", "icon": "😴", "label": "Wake"},
+    ]
+
+    if len(workout_data) > 0:
+        workout_time = datetime.fromisoformat(workout_data[-1]['start_time'].replace('Z', '+00:00'))
+        events.append({
+            "hour": workout_time.hour + workout_time.minute / 60,
+            "type": "workout",
+            "icon": "🏃",
+            "label": "Run"
+        })
+
+    return {
+        "date": session_start.strftime("%Y-%m-%d"),
+        "user_schedule": {
+            "wake_time": wake_time,
+            "sleep_time": sleep_time
+        },
+        "circadian_baseline": baseline,
+        "measured_session": {
+            "start_hour": start_hour,
+            "end_hour": start_hour + (session_data['session_duration_minutes'] / 60),
+            "lri_values": measured_lri
+        },
+        "gamma_peaks": peaks,
+        "events": events
+    }
+
 @app.get("/api/session/daily-timeline")
-async def get_daily_timeline(participant_id: int = 0):
+@limited()
+def get_daily_timeline(participant_id: int = 0):
     """Get full-day timeline data with circadian baseline."""
     try:
-        session_data = get_muse_session_data(participant_id)
-        windows_df = get_muse_windows_data(participant_id)
-        
-        # Get sleep data for wake/sleep times
-        sleep_data = load_json(APPLE_HEALTH_DIR / "sleep_last_20_days.json")[0]
-        workout_data = load_json(APPLE_HEALTH_DIR / "workouts_last_20_days.json")
-        
-        # Calculate circadian baseline (simplified)
-        wake_time = 6.5  # 6:30 AM
-        sleep_time = 22.0  # 10:00 PM
-        
-        baseline = []
-        for h_idx in range(96):  # 15-min intervals for 24h
-            h = h_idx * 0.25
-            if h < wake_time or h > sleep_time:
-                baseline.append(20)
-            else:
-                hours_awake = h - wake_time
-                # Simplified circadian curve
-                value = 40 + (30 * math.sin((hours_awake / 16) * math.pi))
-                # Add morning boost
-                if hours_awake < 4:
-                    value += hours_awake * 8
-                # Afternoon dip
-                if 6 < hours_awake < 9:
-                    value -= 15
-                baseline.append(min(max(value, 30), 95))
-        
-        # Extract measured session data
-        session_start = datetime.fromisoformat(session_data['session_start'].replace('Z', '+00:00'))
-        start_hour = session_start.hour + session_start.minute / 60
-        
-        measured_lri = []
-        for idx, row in windows_df.iterrows():
-            measured_lri.append({
-                "hour": start_hour + (idx * 2.5 / 60),  # 2.5 min windows
-                "lri": float(row['lri']) if not pd.isna(row['lri']) else None
-            })
-        
-        # Get gamma peaks
-        peaks = []
-        for idx, row in windows_df[windows_df['lri'] >= 70].iterrows():
-            peaks.append({
-                "hour": start_hour + (idx * 2.5 / 60),
-                "lri": float(row['lri']),
-                "duration_min": 2.5
-            })
-        
-        # Events
-        events = [
-            {"hour": wake_time, "type": "wake", "icon": "😴", "label": "Wake"},
-        ]
-        
-        if len(workout_data) > 0:
-            workout_time = datetime.fromisoformat(workout_data[0]['start_time'].replace('Z', '+00:00'))
-            events.append({
-                "hour": workout_time.hour + workout_time.minute / 60,
-                "type": "workout",
-                "icon": "🏃",
-                "label": "Run"
-            })
-        
-        return {
-            "date": session_start.strftime("%Y-%m-%d"),
-            "user_schedule": {
-                "wake_time": wake_time,
-                "sleep_time": sleep_time
-            },
-            "circadian_baseline": baseline,
-            "measured_session": {
-                "start_hour": start_hour,
-                "end_hour": start_hour + (session_data['session_duration_minutes'] / 60),
-                "lri_values": measured_lri
-            },
-            "gamma_peaks": peaks,
-            "events": events
+        return build_daily_timeline(ParticipantData(participant_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/session/live")
+async def stream_live_session(participant_id: int = 0):
+    """Stream live windows, component scores and optimal-window transitions (Server-Sent Events)."""
+    live_file = MUSE_DIR / f"participant_museData{participant_id}_live.csv"
+    if not live_file.is_file():
+        raise HTTPException(status_code=404, detail=f"No live session for participant {participant_id}")
+    session = LIVE_SESSIONS.session(live_file)
+    return StreamingResponse(
+        session.sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Home screen sections served together by /api/dashboard
+DASHBOARD_SECTIONS = {
+    "brain_score": build_brain_score,
+    "today_summary": build_today_summary,
+    "current_metrics": build_current_metrics,
+    "optimal_window_status": build_optimal_window_status,
+    "context": build_session_context,
+    "daily_timeline": build_daily_timeline,
+}
+
+@app.get("/api/dashboard")
+@limited()
+def get_dashboard(participant_id: int = 0, fields: Optional[str] = None):
+    """Get the Home screen's sections in one response, loading each artifact once.
+
+    ``fields`` is a comma-separated subset of the section names (default: all).
+    A section that fails is reported under ``errors`` without failing the others.
+    """
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(DASHBOARD_SECTIONS)
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown dashboard fields: {', '.join(unknown)} (expected any of {', '.join(DASHBOARD_SECTIONS)})",
+        )
+
+    data = ParticipantData(participant_id)
+    response = {"participant_id": participant_id}
+    errors = {}
+    for name in dict.fromkeys(names):
+        try:
+            response[name] = DASHBOARD_SECTIONS[name](data)
+        except HTTPException as e:
+            errors[name] = e
+        except Exception as e:
+            errors[name] = HTTPException(status_code=500, detail=str(e))
+
+    if errors and len(response) == 1:
+        # Nothing could be built (e.g. unknown participant): fail like the single endpoints
+        raise next(iter(errors.values()))
+    if errors:
+        response["errors"] = {name: e.detail for name, e in errors.items()}
+    return response
+
+def build_session_timeline(
+    pyramid_df: pd.DataFrame,
+    participant_id: int,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    max_points: int,
+) -> Dict:
+    """Pick the finest pyramid level whose buckets in [start, end) fit in ``max_points``."""
+    # Same selection as pipeline_scripts.muse.pyramid.select_pyramid_level, which the
+    # backend cannot import (pipeline_scripts pulls in the pipeline's dependencies)
+    in_range = pd.Series(True, index=pyramid_df.index)
+    if start is not None:
+        in_range &= pyramid_df['bucket_start'] >= pd.Timestamp(start)
+    if end is not None:
+        in_range &= pyramid_df['bucket_start'] < pd.Timestamp(end)
+    subset = pyramid_df[in_range]
+
+    resolutions = sorted(pyramid_df['resolution_seconds'].unique())
+    points = subset.groupby('resolution_seconds').size()
+    resolution = next((r for r in resolutions if points.get(r, 0) <= max_points), resolutions[-1])
+    level_df = subset[subset['resolution_seconds'] == resolution]
+
+    metrics = ['lri', 'alertness', 'focus', 'arousal_balance']
+    rows = []
+    for record in level_df.to_dict(orient='records'):
+        row = {
+            "bucket_start": record['bucket_start'].isoformat(),
+            "window_count": int(record['window_count']),
         }
+        for metric in metrics:
+            for stat in ('mean', 'min', 'max'):
+                value = record.get(f"{metric}_{stat}")
+                row[f"{metric}_{stat}"] = float(value) if value is not None and not pd.isna(value) else None
+        rows.append(row)
+
+    return {
+        "participant_id": participant_id,
+        "level": level_df['level'].iloc[0] if len(level_df) else None,
+        "resolution_seconds": int(resolution),
+        "points": rows,
+    }
+
+@app.get("/api/session/timeline")
+@limited()
+def get_session_timeline(
+    request: Request,
+    participant_id: int = 0,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = 200,
+):
+    """Get an LRI timeline for any zoom level with at most ``max_points`` points.
+
+    Serves the finest pyramid level (30s, 2.5min, 10min, 1h) whose buckets in
+    [start, end) fit in ``max_points``, falling back to the coarsest level.
+    Each zoom is rendered once per pyramid version and revalidated by ETag.
+    """
+    try:
+        # Pyramid buckets are naive local time; aware bounds are compared by their wall clock
+        start, end = wall_clock(start), wall_clock(end)
+        pyramid_file = MUSE_DIR / f"participant_museData{participant_id}_pyramid.parquet"
+        render = lambda path: dumps(build_session_timeline(get_muse_pyramid_data(participant_id), participant_id, start, end, max_points))
+        variant = f"timeline:{start}:{end}:{max_points}"
+        payload = load_artifact(
+            lambda path: load_payload(path, render, variant),
+            pyramid_file,
+            f"Timeline pyramid for participant {participant_id} not found",
+        )
+        return conditional_response(request, payload)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,146 @@
+"""Per-participant session analytics materialized from a windows Parquet file.
+
+Computed once per windows-file version (the server caches the record in its
+artifact cache) and shared by the session, summary, context and brain-score
+endpoints. Durations follow the pipeline's ``SessionAnalyzer``: optimal
+windows span their actual timestamps and time in state is the union of the
+window intervals in each state, so overlapping windows are not double-counted.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+OPTIMAL_THRESHOLD = 70
+MODERATE_THRESHOLD = 40
+# Served when a component column is missing or all-NaN
+COMPONENT_DEFAULTS = {"alertness": 65.0, "focus": 58.0, "arousal_balance": 42.0}
+TIMELINE_POINTS = 50
+
+
+# _run_bounds and _union_minutes define optimal runs and time in state exactly as
+# pipeline_scripts/muse/session.py (_run_bounds, _sum_union_nanoseconds), which the
+# backend cannot import (pipeline_scripts pulls in the pipeline's dependencies).
+# Keep the two in sync.
+def _run_bounds(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(starts, ends)`` of the runs of True in ``mask`` (ends exclusive)."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _union_minutes(starts: np.ndarray, ends: np.ndarray) -> float:
+    """Total minutes covered by the union of ``[start, end]`` nanosecond intervals."""
+    if starts.size == 0:
+        return 0.0
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    reach = np.maximum.accumulate(ends[order])
+    block_starts = np.flatnonzero(np.concatenate(([True], starts[1:] > reach[:-1])))
+    block_ends = np.append(block_starts[1:], starts.size) - 1
+    return float(np.sum(reach[block_ends] - starts[block_starts])) / 1e9 / 60.0
+
+
+def _finite(value: float, default: Optional[float] = 0.0) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else default
+
+
+def classify_quality(lri: float) -> str:
+    if lri >= 85:
+        return "excellent"
+    if lri >= 75:
+        return "very_good"
+    return "good"
+
+
+def _optimal_windows(lri: np.ndarray, starts: pd.Series, ends: pd.Series) -> List[Dict[str, Any]]:
+    run_starts, run_ends = _run_bounds(lri >= OPTIMAL_THRESHOLD)
+    windows = []
+    for first, stop in zip(run_starts, run_ends):
+        start_time, end_time = starts.iloc[first], ends.iloc[stop - 1]
+        avg_lri = float(lri[first:stop].mean())
+        windows.append(
+            {
+                "start": start_time.isoformat(),
+                "end": end_time.isoformat(),
+                "duration_minutes": round((end_time - start_time).total_seconds() / 60.0, 2),
+                "avg_lri": avg_lri,
+                "quality": classify_quality(avg_lri),
+            }
+        )
+    return windows
+
+
+def compute_session_analytics(windows_df: pd.DataFrame) -> Dict[str, Any]:
+    """JSON-ready analytics for one participant's scored windows (NaN LRI windows are ignored)."""
+    lri = windows_df["lri"].to_numpy(dtype=float)
+    starts_ns = windows_df["window_start"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    ends_ns = windows_df["window_end"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+    def _minutes(mask: np.ndarray) -> float:
+        return _union_minutes(starts_ns[mask], ends_ns[mask])
+
+    optimal = lri >= OPTIMAL_THRESHOLD
+    time_in_state = {
+        "optimal_minutes": _minutes(optimal),
+        "moderate_minutes": _minutes((lri >= MODERATE_THRESHOLD) & (lri < OPTIMAL_THRESHOLD)),
+        "low_minutes": _minutes(lri < MODERATE_THRESHOLD),
+    }
+    state_minutes = sum(time_in_state.values())
+    total_minutes = _minutes(np.ones(len(lri), dtype=bool))
+
+    scored = ~np.isnan(lri)
+    if scored.any():
+        peak = int(np.nanargmax(lri))
+        peak_lri, peak_timestamp = float(lri[peak]), windows_df["window_start"].iloc[peak].isoformat()
+    else:
+        peak_lri, peak_timestamp = 0.0, None
+
+    component_scores = {}
+    for name, default in COMPONENT_DEFAULTS.items():
+        values = windows_df[name].to_numpy(dtype=float) if name in windows_df.columns else np.empty(0)
+        values = values[~np.isnan(values)]
+        component_scores[name] = float(values.mean()) if values.size else default
+
+    timeline = windows_df.head(TIMELINE_POINTS)
+    analytics = {
+        "num_windows": int(len(lri)),
+        "optimal_count": int(np.count_nonzero(optimal)),
+        "peak_lri": peak_lri,
+        "peak_timestamp": peak_timestamp,
+        "avg_lri": _finite(np.nanmean(lri)) if scored.any() else 0.0,
+        "median_lri": _finite(np.nanmedian(lri)) if scored.any() else 0.0,
+        "std_dev": _finite(np.nanstd(lri, ddof=1)) if scored.sum() > 1 else 0.0,
+        "optimal_windows": _optimal_windows(lri, windows_df["window_start"], windows_df["window_end"]),
+        "time_in_state": time_in_state,
+        "total_minutes": total_minutes,
+        "optimal_percentage": 100 * time_in_state["optimal_minutes"] / total_minutes if total_minutes > 0 else 0.0,
+        "session_score": 100 * time_in_state["optimal_minutes"] / state_minutes if state_minutes > 0 else 0.0,
+        "component_scores": component_scores,
+        "lri_timeline": [
+            {"window_start": start.isoformat(), "lri": _finite(value)}
+            for start, value in zip(timeline["window_start"], timeline["lri"].to_numpy(dtype=float))
+        ],
+    }
+    analytics["insights"], analytics["recommendations"] = _insights(analytics)
+    return analytics
+
+
+def _insights(analytics: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    optimal_minutes = analytics["time_in_state"]["optimal_minutes"]
+    insights = [
+        f"Peak Score of {analytics['peak_lri']:.1f} reached",
+        f"You maintained optimal state for {optimal_minutes:.0f} minutes ({analytics['session_score']:.0f}% of session)"
+        if optimal_minutes > 0
+        else "Consider timing session after exercise for better results",
+        "Your focus metrics are strong"
+        if analytics["component_scores"]["focus"] > 60
+        else "Try reducing distractions during session",
+    ]
+    recommendations = [
+        "Schedule deep work during optimal windows" if analytics["optimal_windows"] else "Try measuring after morning workout",
+        "Optimal windows typically occur 1-3 hours post-exercise",
+    ]
+    return insights, recommendations
@@ -0,0 +1,428 @@
+"""Latency benchmark harness for the Brain Score API over synthetic processed data.
+
+``generate`` writes a processed-data tree at any scale (participants with
+long windows files and pyramids, years of nightly sleep and workouts).
+``run`` serves that tree with the backend, either in-process through an ASGI
+transport or as a uvicorn server on localhost, drives a weighted mix of
+``/api`` requests from ``--clients`` closed-loop clients and prints
+throughput and p50/p95/p99 per route as JSON. ``compare`` diffs two reports,
+e.g. from two commits. Example::
+
+    python -m benchmarks.api_benchmark generate --out /tmp/bench-data --participants 50 --windows 20000
+    python -m benchmarks.api_benchmark run --data-dir /tmp/bench-data --clients 50 --output head.json
+    python -m benchmarks.api_benchmark compare base.json head.json
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+import typer
+
+from benchmarks.api_load_test import latency_summary
+from pipeline_scripts.muse.pyramid import build_window_pyramid
+
+app = typer.Typer(help=__doc__.splitlines()[0])
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT / "backend"
+WINDOW_STRIDE_SECONDS = 15
+WINDOW_SECONDS = 30
+TZ_OFFSET = "-08:00"
+LAST_YEAR = {"from": (date.today() - timedelta(days=365)).isoformat(), "to": date.today().isoformat()}
+
+
+@dataclass(frozen=True)
+class Route:
+    method: str
+    path: str
+    per_participant: bool = True
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+# Every JSON /api route (the SSE live stream and /metrics are not request/response)
+ROUTES: Dict[str, Route] = {
+    "health": Route("GET", "/api/health", per_participant=False),
+    "dashboard": Route("GET", "/api/dashboard"),
+    "brain_score": Route("GET", "/api/brain-score/today"),
+    "today_summary": Route("GET", "/api/session/today-summary"),
+    "current_metrics": Route("GET", "/api/session/current-metrics"),
+    "optimal_window_status": Route("GET", "/api/session/optimal-window-status"),
+    "context": Route("GET", "/api/session/context"),
+    "daily_timeline": Route("GET", "/api/session/daily-timeline"),
+    "session_timeline": Route("GET", "/api/session/timeline", params={"max_points": 200}),
+    "analyze": Route("POST", "/api/session/analyze"),
+    "sleep_last20": Route("GET", "/api/sleep/last20", per_participant=False),
+    "sleep_recent": Route("GET", "/api/sleep/recent", per_participant=False, params={"days": 7}),
+    "workouts_last20": Route("GET", "/api/workouts/last20", per_participant=False),
+    "workouts_recent": Route("GET", "/api/workouts/recent", per_participant=False, params={"days": 7}),
+    "sleep_range": Route("GET", "/api/sleep", per_participant=False, params=LAST_YEAR),
+    "workouts_range": Route("GET", "/api/workouts", per_participant=False, params=LAST_YEAR),
+    "cache_stats": Route("GET", "/api/cache/stats", per_participant=False),
+}
+
+
+# --- synthetic data -----------------------------------------------------------------------------
+
+
+def synthetic_windows(n: int, start: pd.Timestamp, rng: np.random.Generator) -> pd.DataFrame:
+    """Scored windows whose LRI drifts through low, moderate and optimal stretches."""
+    t = np.arange(n)
+    lri = 50 + 25 * np.sin(t / 40.0 + rng.uniform(0, 2 * np.pi)) + rng.normal(0, 6, n)
+    lri = np.clip(lri, 0, 100)
+    lri[rng.random(n) < 0.01] = np.nan
+    window_start = start + pd.to_timedelta(t * WINDOW_STRIDE_SECONDS, unit="s")
+    return pd.DataFrame(
+        {
+            "window_start": window_start,
+            "window_end": window_start + pd.Timedelta(seconds=WINDOW_SECONDS),
+            "num_samples": rng.integers(6000, 7700, n),
+            "lri": lri,
+            "base_lri": lri,
+            "alertness": np.clip(lri + rng.normal(5, 10, n), 0, 100),
+            "focus": np.clip(lri + rng.normal(-10, 10, n), 0, 100),
+            "arousal_balance": np.clip(rng.normal(45, 15, n), 0, 100),
+        }
+    )
+
+
+def _session_record(windows: pd.DataFrame) -> Dict[str, Any]:
+    start, end = windows["window_start"].iloc[0], windows["window_end"].iloc[-1]
+    lri = windows["lri"]
+    return {
+        "session_start": start.isoformat(),
+        "session_end": end.isoformat(),
+        "session_duration_minutes": round((end - start).total_seconds() / 60, 2),
+        "peak_lri": float(lri.max()),
+        "peak_timestamp": windows.loc[lri.idxmax(), "window_start"].isoformat(),
+        "avg_lri": float(lri.mean()),
+        "median_lri": float(lri.median()),
+        "std_dev": float(lri.std()),
+    }
+
+
+def synthetic_sleep(nights: int, end: pd.Timestamp, rng: np.random.Generator) -> pd.DataFrame:
+    """One record per night, ascending by date, ending the night before ``end``."""
+    dates = pd.date_range(end=end.normalize() - pd.Timedelta(days=1), periods=nights, freq="D")
+    bedtime = dates + pd.to_timedelta(rng.normal(23 * 60, 40, nights), unit="min")
+    duration = np.clip(rng.normal(7.2, 0.9, nights), 3, 11)
+    wake = bedtime + pd.to_timedelta(duration, unit="h")
+    efficiency = np.clip(rng.normal(90, 5, nights), 60, 100)
+    return pd.DataFrame(
+        {
+            "date": dates.strftime("%Y-%m-%d"),
+            "start_time": bedtime.strftime("%Y-%m-%dT%H:%M:%S") + TZ_OFFSET,
+            "end_time": wake.strftime("%Y-%m-%dT%H:%M:%S") + TZ_OFFSET,
+            "duration_hours": duration.round(2),
+            "time_in_bed_hours": (duration / efficiency * 100).round(2),
+            "sleep_efficiency": efficiency.round(1),
+            "deep_sleep_percent": np.clip(rng.normal(18, 5, nights), 0, 40).round(1),
+            "rem_sleep_percent": np.clip(rng.normal(21, 5, nights), 0, 40).round(1),
+            "hrv_rmssd_sleep": np.clip(rng.normal(55, 12, nights), 10, 150).round(1),
+            "bedtime_consistency_sd": np.clip(rng.normal(25, 10, nights), 0, 120).round(1),
+            "sleep_score": np.clip(rng.normal(78, 8, nights), 0, 100).round(1),
+            "sleep_score_version": "hrv_enabled",
+        }
+    )
+
+
+def synthetic_workouts(days: int, per_week: float, end: pd.Timestamp, rng: np.random.Generator) -> pd.DataFrame:
+    """Workouts sorted by start time over the ``days`` before ``end``."""
+    count = max(int(days / 7 * per_week), 1)
+    offsets = np.sort(rng.uniform(0, days * 86400, count))
+    start = end - pd.Timedelta(days=days) + pd.to_timedelta(offsets, unit="s")
+    minutes = np.clip(rng.normal(35, 15, count), 5, 180)
+    finish = start + pd.to_timedelta(minutes, unit="min")
+    heart_rate = rng.normal(145, 12, count)
+    return pd.DataFrame(
+        {
+            "workout_type": rng.choice(
+                ["HKWorkoutActivityTypeRunning", "HKWorkoutActivityTypeCycling", "HKWorkoutActivityTypeWalking"], count
+            ),
+            "start_time": start.strftime("%Y-%m-%dT%H:%M:%S") + TZ_OFFSET,
+            "end_time": finish.strftime("%Y-%m-%dT%H:%M:%S") + TZ_OFFSET,
+            "duration_minutes": minutes,
+            "is_high_intensity": heart_rate > 150,
+            "avg_heart_rate": heart_rate.round(1),
+            "max_heart_rate": (heart_rate + rng.normal(20, 5, count)).round(1),
+            "source": "Synthetic",
+        }
+    )
+
+
+def _last_20_days(records: pd.DataFrame, date_column: str) -> List[Dict[str, Any]]:
+    """The records of the 20 most recent dates, ascending (as the Apple Health pipeline writes them)."""
+    dates = records[date_column].str[:10]
+    keep = dates.isin(sorted(dates.unique())[-20:])
+    return json.loads(records[keep].to_json(orient="records"))
+
+
+def generate_dataset(
+    out: Path,
+    participants: int,
+    windows: int,
+    sleep_years: float,
+    workouts_per_week: float,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Write a processed-data tree under ``out`` and return its manifest."""
+    rng = np.random.default_rng(seed)
+    muse_dir, health_dir = out / "muse", out / "apple_health"
+    muse_dir.mkdir(parents=True, exist_ok=True)
+    health_dir.mkdir(parents=True, exist_ok=True)
+    today = pd.Timestamp.now().normalize()
+
+    for pid in range(participants):
+        start = today - pd.Timedelta(days=int(rng.integers(0, 30))) + pd.Timedelta(hours=float(rng.uniform(7, 18)))
+        windows_df = synthetic_windows(windows, start, rng)
+        windows_df.to_parquet(muse_dir / f"participant_museData{pid}_windows.parquet", index=False)
+        build_window_pyramid(windows_df).to_parquet(muse_dir / f"participant_museData{pid}_pyramid.parquet", index=False)
+        (muse_dir / f"participant_museData{pid}_session.json").write_text(json.dumps(_session_record(windows_df)))
+
+    nights = max(int(sleep_years * 365), 20)
+    sleep = synthetic_sleep(nights, today, rng)
+    workouts = synthetic_workouts(nights, workouts_per_week, today, rng)
+    sleep.to_parquet(health_dir / "sleep_records.parquet", index=False)
+    workouts.to_parquet(health_dir / "workouts.parquet", index=False)
+    (health_dir / "sleep_last_20_days.json").write_text(json.dumps(_last_20_days(sleep, "date")))
+    (health_dir / "workouts_last_20_days.json").write_text(json.dumps(_last_20_days(workouts, "start_time")))
+
+    manifest = {
+        "participants": participants,
+        "windows_per_participant": windows,
+        "sleep_nights": nights,
+        "workouts": len(workouts),
+        "seed": seed,
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+# --- load driver --------------------------------------------------------------------------------
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """``"all"`` or ``"name=weight,name=weight"`` over ``ROUTES``."""
+    if mix.strip() == "all":
+        return {name: 1.0 for name in ROUTES}
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in ROUTES:
+            raise typer.BadParameter(f"Unknown route {name!r}; expected any of {', '.join(ROUTES)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def _request(route: Route, participants: int, rng: random.Random) -> Tuple[Dict[str, Any], Optional[Dict]]:
+    params = dict(route.params)
+    participant_id = rng.randrange(participants)
+    if route.method == "POST":
+        return params, {"participant_id": participant_id}
+    if route.per_participant:
+        params["participant_id"] = participant_id
+    return params, None
+
+
+async def _client(
+    http: httpx.AsyncClient,
+    names: List[str],
+    weights: List[float],
+    participants: int,
+    seed: int,
+    measure_from: float,
+    deadline: float,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+) -> None:
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        route = ROUTES[name]
+        params, body = _request(route, participants, rng)
+        start = time.perf_counter()
+        try:
+            response = await http.request(route.method, route.path, params=params, json=body)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        if start >= measure_from:
+            latencies[name].append(time.perf_counter() - start)
+            errors[name] += failed
+
+
+async def drive(
+    http: httpx.AsyncClient,
+    mix: Dict[str, float],
+    participants: int,
+    clients: int,
+    duration: float,
+    warmup: float,
+    seed: int = 0,
+) -> Dict[str, Dict[str, float]]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    names, weights = list(mix), list(mix.values())
+    start = time.perf_counter()
+    measure_from, deadline = start + warmup, start + warmup + duration
+    await asyncio.gather(
+        *(
+            _client(http, names, weights, participants, seed + k, measure_from, deadline, latencies, errors)
+            for k in range(clients)
+        )
+    )
+    wall = time.perf_counter() - measure_from
+    report = {name: latency_summary(latencies[name], errors[name], wall) for name in names}
+    report["overall"] = latency_summary(
+        [value for values in latencies.values() for value in values], sum(errors.values()), wall
+    )
+    return report
+
+
+def _in_process_app(data_dir: Path):
+    os.environ["DATA_DIR"] = str(data_dir)
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    return server.app
+
+
+async def _wait_until_healthy(url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=url) as http:
+        while True:
+            try:
+                if (await http.get("/api/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Server at {url} did not become healthy within {timeout:.0f}s")
+            await asyncio.sleep(0.2)
+
+
+async def run_benchmark(
+    data_dir: Path, mode: str, port: int, mix: Dict[str, float], clients: int, duration: float, warmup: float
+) -> Dict[str, Dict[str, float]]:
+    participants = json.loads((data_dir / "manifest.json").read_text())["participants"]
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    if mode == "inprocess":
+        transport = httpx.ASGITransport(app=_in_process_app(data_dir))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as http:
+            return await drive(http, mix, participants, clients, duration, warmup)
+
+    url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "DATA_DIR": str(data_dir)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        await _wait_until_healthy(url)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as http:
+            return await drive(http, mix, participants, clients, duration, warmup)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- CLI ----------------------------------------------------------------------------------------
+
+
+@app.command()
+def generate(
+    out: Path = typer.Option(..., help="Directory to write the processed-data tree into."),
+    participants: int = typer.Option(20, help="Participants (windows, pyramid and session files each)."),
+    windows: int = typer.Option(2000, help="Windows per participant (15 s stride)."),
+    sleep_years: float = typer.Option(3.0, help="Years of nightly sleep records."),
+    workouts_per_week: float = typer.Option(4.0, help="Workouts per week over the same span."),
+    seed: int = typer.Option(0, help="Random seed."),
+) -> None:
+    """Write synthetic processed data."""
+    manifest = generate_dataset(out, participants, windows, sleep_years, workouts_per_week, seed)
+    typer.echo(json.dumps(manifest, indent=2))
+
+
+@app.command()
+def run(
+    data_dir: Path = typer.Option(..., help="Tree written by `generate`."),
+    mode: str = typer.Option("inprocess", help="`inprocess` (ASGI transport) or `server` (uvicorn on localhost)."),
+    port: int = typer.Option(8123, help="Port for --mode server."),
+    mix: str = typer.Option("all", help="`all` or weighted routes, e.g. `dashboard=4,sleep_last20=1`."),
+    clients: int = typer.Option(50, help="Concurrent closed-loop clients."),
+    duration: float = typer.Option(20.0, help="Measured seconds."),
+    warmup: float = typer.Option(3.0, help="Seconds of load before measuring."),
+    output: Optional[Path] = typer.Option(None, help="Also write the report to this file."),
+) -> None:
+    """Drive a request mix and report per-route latency."""
+    if mode not in ("inprocess", "server"):
+        raise typer.BadParameter("--mode must be `inprocess` or `server`")
+    weights = parse_mix(mix)
+    routes = asyncio.run(run_benchmark(data_dir, mode, port, weights, clients, duration, warmup))
+    report = {
+        "commit": _git_commit(),
+        "mode": mode,
+        "clients": clients,
+        "duration_seconds": duration,
+        "warmup_seconds": warmup,
+        "mix": weights,
+        "data": json.loads((data_dir / "manifest.json").read_text()),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "routes": routes,
+    }
+    text = json.dumps(report, indent=2)
+    if output is not None:
+        output.write_text(text + "\n")
+    typer.echo(text)
+
+
+@app.command()
+def compare(
+    base: Path = typer.Argument(..., help="Report from the baseline commit."),
+    head: Path = typer.Argument(..., help="Report to compare against it."),
+) -> None:
+    """Per-route change in throughput and p50/p95/p99 between two reports."""
+    base_routes = json.loads(base.read_text())["routes"]
+    head_routes = json.loads(head.read_text())["routes"]
+    diff = {}
+    for name in base_routes.keys() & head_routes.keys():
+        before, after = base_routes[name], head_routes[name]
+        diff[name] = {
+            metric: {
+                "base": before[metric],
+                "head": after[metric],
+                "change_pct": round(100 * (after[metric] - before[metric]) / before[metric], 1) if before[metric] else None,
+            }
+            for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    typer.echo(json.dumps(dict(sorted(diff.items())), indent=2))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,107 @@
+"""Closed-loop load test for the Brain Score API.
+
+``--clients`` concurrent clients each issue requests back to back, cycling
+through ``--paths``, for ``--duration`` seconds against a running server, then
+per-path and overall latency percentiles are printed as JSON. Example::
+
+    (cd backend && uvicorn server:app --port 8001) &
+    python -m benchmarks.api_load_test --url http://127.0.0.1:8001 --clients 100 --duration 20
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+import numpy as np
+import typer
+
+app = typer.Typer(help=__doc__.splitlines()[0])
+
+# The Home screen's fan-out plus the heavier session and data endpoints
+DEFAULT_PATHS = [
+    "/api/brain-score/today",
+    "/api/session/today-summary",
+    "/api/session/current-metrics",
+    "/api/session/optimal-window-status",
+    "/api/session/context",
+    "/api/session/daily-timeline",
+    "/api/sleep/last20",
+    "/api/workouts/last20",
+    "/api/dashboard",
+    "/api/health",
+]
+
+
+def latency_summary(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, float]:
+    """Request count, error count, throughput and p50/p95/p99/max latency in milliseconds."""
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if values.size else (float("nan"),) * 3
+    return {
+        "requests": int(values.size),
+        "errors": errors,
+        "throughput_rps": round(values.size / wall_seconds, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2) if values.size else None,
+    }
+
+
+async def _client(
+    http: httpx.AsyncClient,
+    paths: List[str],
+    offset: int,
+    deadline: float,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+) -> None:
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await http.get(path)
+            failed = response.status_code >= 500
+        except httpx.HTTPError:
+            failed = True
+        latencies[path].append(time.perf_counter() - start)
+        errors[path] += failed
+
+
+async def run_load(url: str, paths: List[str], clients: int, duration: float) -> Dict[str, Dict[str, float]]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as http:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(_client(http, paths, k, deadline, latencies, errors) for k in range(clients)))
+        wall = time.perf_counter() - start
+
+    report = {path: latency_summary(latencies[path], errors[path], wall) for path in paths}
+    report["overall"] = latency_summary(
+        [value for values in latencies.values() for value in values], sum(errors.values()), wall
+    )
+    return report
+
+
+@app.command()
+def main(
+    url: str = typer.Option("http://127.0.0.1:8001", help="Base URL of a running server."),
+    clients: int = typer.Option(100, help="Concurrent closed-loop clients."),
+    duration: float = typer.Option(20.0, help="Seconds to run."),
+    paths: str = typer.Option(",".join(DEFAULT_PATHS), help="Comma-separated GET paths to cycle through."),
+) -> None:
+    path_list = [path.strip() for path in paths.split(",") if path.strip()]
+    report = asyncio.run(run_load(url, path_list, clients, duration))
+    typer.echo(json.dumps({"clients": clients, "duration_seconds": duration, "routes": report}, indent=2))
+
+
+if __name__ == "__main__":
+    app()
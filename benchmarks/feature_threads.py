@@ -0,0 +1,106 @@
+"""Scaling of block-parallel Muse window features and LRI scoring with thread count.
+
+Synthesises a Mind Monitor-style recording (10 Hz band powers for every
+band/channel plus HSI, with a few masked stretches), then times
+``generate_windows`` and the pipeline's LRI scoring at each thread count and
+prints one JSON object per run. Example::
+
+    python -m benchmarks.feature_threads --hours 24 --step-seconds 1 --threads 1,2,4,8,16
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+import typer
+
+from pipeline_scripts.muse.constants import BAND_COLUMNS_LOWER, CHANNELS, FEATURE_BLOCK_WINDOWS
+from pipeline_scripts.muse.lri import LRICalculator
+from pipeline_scripts.muse.pipeline import _score_windows
+from pipeline_scripts.muse.windowing import generate_windows
+
+app = typer.Typer(help=__doc__.splitlines()[0])
+
+
+def synthetic_recording(hours: float, rate_hz: float = 10.0, seed: int = 0) -> pd.DataFrame:
+    n = int(hours * 3600 * rate_hz)
+    rng = np.random.default_rng(seed)
+    index = pd.Timestamp("2025-01-01") + pd.to_timedelta(np.arange(n) / rate_hz, unit="s")
+    df = pd.DataFrame({col: rng.normal(0.8, 0.3, n) for col in BAND_COLUMNS_LOWER}, index=index)
+    for ch in CHANNELS:
+        df[f"hsi_{ch}"] = 1.0
+    # Quality-masked stretches exercise the NaN-aware paths.
+    masked = rng.random(n) < 0.02
+    df.loc[masked, ["alpha_af8", "beta_af8", "theta_af8"]] = np.nan
+    return df
+
+
+def _best_of(repeats: int, run: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@app.command()
+def main(
+    hours: float = typer.Option(8.0, help="Length of the synthetic recording."),
+    step_seconds: int = typer.Option(1, help="Window stride; smaller strides mean more windows."),
+    window_seconds: int = typer.Option(30, help="Window length."),
+    threads: str = typer.Option("1,2,4,8,16", help="Comma-separated thread counts to time."),
+    block_windows: int = typer.Option(FEATURE_BLOCK_WINDOWS, help="Windows per block."),
+    repeats: int = typer.Option(3, help="Best-of repeats per thread count."),
+    extended: bool = typer.Option(True, help="Include variance/slope/asymmetry features."),
+) -> None:
+    df = synthetic_recording(hours)
+    counts: List[int] = [int(value) for value in threads.split(",") if value.strip()]
+    baseline = {}
+    for count in counts:
+        windows = generate_windows(
+            df,
+            window_size_seconds=window_seconds,
+            step_seconds=step_seconds,
+            grid_interval_seconds=step_seconds,
+            extended_features=extended,
+            threads=count,
+            block_windows=block_windows,
+        )
+        timings = {
+            "windows": _best_of(
+                repeats,
+                lambda: generate_windows(
+                    df,
+                    window_size_seconds=window_seconds,
+                    step_seconds=step_seconds,
+                    grid_interval_seconds=step_seconds,
+                    extended_features=extended,
+                    threads=count,
+                    block_windows=block_windows,
+                ),
+            ),
+            "lri": _best_of(repeats, lambda: _score_windows(windows, LRICalculator(), threads=count)),
+        }
+        baseline = baseline or timings
+        typer.echo(
+            json.dumps(
+                {
+                    "threads": count,
+                    "cpu_count": os.cpu_count(),
+                    "samples": len(df),
+                    "windows": len(windows),
+                    **{f"{stage}_seconds": round(value, 4) for stage, value in timings.items()},
+                    **{f"{stage}_speedup": round(baseline[stage] / value, 2) for stage, value in timings.items()},
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    app()
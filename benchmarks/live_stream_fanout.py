@@ -0,0 +1,137 @@
+"""Fan-out and backpressure of the live LRI stream under many subscribers.
+
+Replays a windows Parquet file into the live CSV that ``/api/session/live``
+tails, at ``--rate`` windows per second, while ``--subscribers`` SSE clients
+(a ``--slow-fraction`` of them pausing ``--slow-delay`` seconds per event)
+listen. Prints delivery latency from append to receipt, events received and
+events dropped for slow clients, as JSON. Example::
+
+    (cd backend && uvicorn server:app --port 8001) &
+    python -m benchmarks.live_stream_fanout --url http://127.0.0.1:8001 \\
+        --live-file /app/data/processed/muse/participant_museData0_live.csv --subscribers 200
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import pandas as pd
+import typer
+
+from benchmarks.api_load_test import latency_summary
+
+app = typer.Typer(help=__doc__.splitlines()[0])
+
+LIVE_COLUMNS = ["window_start", "window_end", "lri", "alertness", "focus", "arousal_balance"]
+
+
+async def _replay(windows: pd.DataFrame, live_file: Path, rate: float, written: Dict[str, float]) -> None:
+    rows = windows.reindex(columns=LIVE_COLUMNS)
+    with open(live_file, "a") as f:
+        for record in rows.itertuples(index=False):
+            start = pd.Timestamp(record.window_start).isoformat()
+            values = [start, pd.Timestamp(record.window_end).isoformat()]
+            values += ["" if pd.isna(value) else repr(float(value)) for value in record[2:]]
+            written[start] = time.perf_counter()
+            f.write(",".join(values) + "\n")
+            f.flush()
+            await asyncio.sleep(1.0 / rate)
+
+
+async def _subscriber(
+    http: httpx.AsyncClient,
+    participant_id: int,
+    delay: float,
+    written: Dict[str, float],
+    latencies: List[float],
+    counts: Dict[str, int],
+) -> None:
+    async with http.stream("GET", "/api/session/live", params={"participant_id": participant_id}) as response:
+        kind = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                kind = line[7:]
+            elif line.startswith("data: ") and kind:
+                data = json.loads(line[6:])
+                counts[kind] = counts.get(kind, 0) + 1
+                if kind == "window" and data["window_start"] in written:
+                    latencies.append(time.perf_counter() - written[data["window_start"]])
+                elif kind == "lagged":
+                    counts["dropped"] = counts.get("dropped", 0) + data["dropped"]
+                if delay:
+                    await asyncio.sleep(delay)
+
+
+async def run_fanout(
+    url: str,
+    participant_id: int,
+    windows: pd.DataFrame,
+    live_file: Path,
+    subscribers: int,
+    slow_fraction: float,
+    slow_delay: float,
+    rate: float,
+) -> Dict[str, Dict[str, float]]:
+    live_file.write_text(",".join(LIVE_COLUMNS) + "\n")
+    written: Dict[str, float] = {}
+    slow = int(subscribers * slow_fraction)
+    groups = {"fast": ([], []), "slow": ([], [])}
+    limits = httpx.Limits(max_connections=subscribers, max_keepalive_connections=subscribers)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=None) as http:
+        tasks = []
+        for k in range(subscribers):
+            name = "slow" if k < slow else "fast"
+            counts: Dict[str, int] = {}
+            groups[name][1].append(counts)
+            delay = slow_delay if name == "slow" else 0.0
+            tasks.append(asyncio.create_task(_subscriber(http, participant_id, delay, written, groups[name][0], counts)))
+        await asyncio.sleep(1.0)  # let every client connect and take its snapshot
+        start = time.perf_counter()
+        await _replay(windows, live_file, rate, written)
+        await asyncio.sleep(2.0)  # drain
+        wall = time.perf_counter() - start
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    report = {}
+    for name, (latencies, counts) in groups.items():
+        if not counts:
+            continue
+        report[name] = {
+            "subscribers": len(counts),
+            "windows_written": len(written),
+            "windows_received_avg": sum(c.get("window", 0) for c in counts) / len(counts),
+            "dropped_avg": sum(c.get("dropped", 0) for c in counts) / len(counts),
+            "delivery": latency_summary(latencies, 0, wall),
+        }
+    return report
+
+
+@app.command()
+def main(
+    url: str = typer.Option("http://127.0.0.1:8001", help="Base URL of a running server."),
+    participant_id: int = typer.Option(0, help="Participant whose live CSV is replayed."),
+    windows_file: Path = typer.Option(
+        Path("data/processed/muse/participant_museData0_windows.parquet"), help="Scored windows to replay."
+    ),
+    live_file: Path = typer.Option(..., help="The server's live CSV for the participant (overwritten)."),
+    subscribers: int = typer.Option(100, help="Concurrent SSE clients."),
+    slow_fraction: float = typer.Option(0.1, help="Fraction of clients that read slowly."),
+    slow_delay: float = typer.Option(0.5, help="Seconds a slow client pauses per event."),
+    rate: float = typer.Option(20.0, help="Windows appended per second."),
+) -> None:
+    windows = pd.read_parquet(windows_file)
+    report = asyncio.run(
+        run_fanout(url, participant_id, windows, live_file, subscribers, slow_fraction, slow_delay, rate)
+    )
+    typer.echo(json.dumps({"subscribers": subscribers, "rate_per_second": rate, "groups": report}, indent=2))
+
+
+if __name__ == "__main__":
+    app()
@@ -1,52 +1,73 @@
-"""Read-only demo API to serve hackathon artifacts from data/processed/muse."""
+"""Read-only demo API to serve hackathon artifacts from data/processed/muse.
+
+Each artifact is rendered to JSON once per file version (mtime, size) along
+with its gzip (and, if ``brotli`` is installed, brotli) encoding; requests are
+answered from those bytes, or with 304 when the client's ETag or
+Last-Modified still matches. Caching, validators and encodings come from the
+backend's ``artifact_cache``, ``http_cache`` and ``json_responses``, so both
+APIs answer conditional requests identically and write NaN as ``null``.
+"""
 
 from __future__ import annotations
 
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any
 import csv
 import json
+import sys
 
-from fastapi import FastAPI, HTTPException
-
+from fastapi import FastAPI, HTTPException, Request, Response
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data" / "processed" / "muse"
 
+# Payload caching, conditional GET and compression are the backend's (flat modules in backend/)
+sys.path.insert(0, str(ROOT / "backend"))
+from artifact_cache import ArtifactCache, file_version  # noqa: E402
+from http_cache import Payload, conditional_response, make_payload  # noqa: E402
+from json_responses import dumps  # noqa: E402
+
 app = FastAPI(title="Axon Demo API", version="0.1.0")
 
+_payloads = ArtifactCache(max_bytes=64 * 1024**2)
+
 
 def _read_json(path: Path) -> Any:
-    if not path.is_file():
-        raise HTTPException(status_code=404, detail=f"File not found: {path}")
     return json.loads(path.read_text(encoding="utf-8"))
 
 
 def _read_csv_as_dicts(path: Path) -> List[Dict[str, str]]:
-    if not path.is_file():
-        raise HTTPException(status_code=404, detail=f"File not found: {path}")
     with path.open("r", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         return list(reader)
 
 
+def _payload(path: Path, render: Callable[[Path], Any]) -> Payload:
+    """Rendered body, validators and encodings for ``path``, rebuilt only when the file changes."""
+    try:
+        return _payloads.get(path, lambda p: make_payload(dumps(render(p)), file_version(p)))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+
+
+def _serve(request: Request, path: Path, render: Callable[[Path], Any]) -> Response:
+    return conditional_response(request, _payload(path, render))
+
+
 @app.get("/demo/timeline")
-def get_timeline() -> Any:
-    return _read_json(DATA_DIR / "timeline.json")
+def get_timeline(request: Request) -> Response:
+    return _serve(request, DATA_DIR / "timeline.json", _read_json)
 
 
 @app.get("/demo/daily-sessions")
-def get_daily_sessions() -> Any:
-    return _read_json(DATA_DIR / "daily_sessions.json")
+def get_daily_sessions(request: Request) -> Response:
+    return _serve(request, DATA_DIR / "daily_sessions.json", _read_json)
 
 
 @app.get("/demo/daily-brain-scores")
-def get_daily_brain_scores() -> Dict[str, Any]:
-    rows = _read_csv_as_dicts(DATA_DIR / "daily_brain_scores.csv")
-    return {"rows": rows}
+def get_daily_brain_scores(request: Request) -> Response:
+    return _serve(request, DATA_DIR / "daily_brain_scores.csv", lambda path: {"rows": _read_csv_as_dicts(path)})
 
 
 # To run:
 # uvicorn pipeline_scripts.api_demo:app --reload
-
-
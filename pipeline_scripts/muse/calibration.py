@@ -0,0 +1,176 @@
+"""Per-participant LRI calibration profiles built from streaming quantile sketches."""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import pandas as pd
+
+from pipeline_scripts.utils import TDigest, ensure_directory, get_logger
+from pipeline_scripts.muse.constants import CALIBRATION_MIN_WINDOWS, CALIBRATION_QUANTILES
+from pipeline_scripts.muse.lri import POPULATION_RANGES, LRICalculator, calibration_inputs
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class CalibrationProfile:
+    """One t-digest per ``POPULATION_RANGES`` quantity for each of a participant's sessions.
+
+    ``sessions`` is keyed by input content hash, so re-processing a recording
+    never counts its windows twice, and :meth:`without` can leave a recording
+    out when it is scored again (its LRI must not depend on its own windows).
+    """
+
+    participant_id: str
+    sessions: Dict[str, Dict[str, TDigest]] = field(default_factory=dict)
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self.sessions)
+
+    @property
+    def sketches(self) -> Dict[str, TDigest]:
+        """Per-quantity digests merged over every session."""
+        merged: Dict[str, TDigest] = {}
+        for sketches in self.sessions.values():
+            for name, sketch in sketches.items():
+                merged.setdefault(name, TDigest(sketch.compression)).merge(sketch)
+        return merged
+
+    @property
+    def num_windows(self) -> int:
+        return int(min((sketch.count for sketch in self.sketches.values()), default=0))
+
+    @property
+    def version(self) -> str:
+        """Short digest of the included sources; changes whenever the ranges can."""
+        return hashlib.sha256("\n".join(sorted(self.sessions)).encode()).hexdigest()[:16]
+
+    def without(self, source: str) -> "CalibrationProfile":
+        """This profile minus ``source`` (a no-op when it was never included)."""
+        return replace(self, sessions={key: value for key, value in self.sessions.items() if key != source})
+
+    def update(self, windows_df: pd.DataFrame, source: str) -> bool:
+        """Fold one session's windows in; returns False if ``source`` was already included."""
+        if source in self.sessions:
+            return False
+        inputs = calibration_inputs(windows_df)
+        sketches = {name: TDigest() for name in POPULATION_RANGES}
+        for name, sketch in sketches.items():
+            sketch.update(inputs[name].to_numpy())
+        self.sessions[source] = sketches
+        return True
+
+    def ranges(self, quantiles: Tuple[float, float] = CALIBRATION_QUANTILES) -> Dict[str, Tuple[float, float]]:
+        """The participant's (low, high) percentile range per quantity, skipping degenerate ones."""
+        ranges = {}
+        for name, sketch in self.sketches.items():
+            low, high = (float(value) for value in sketch.quantile(list(quantiles)))
+            if high - low > 1e-9:
+                ranges[name] = (low, high)
+        return ranges
+
+    def to_dict(self) -> Dict:
+        return {
+            "participant_id": self.participant_id,
+            "num_windows": self.num_windows,
+            "sources": self.sources,
+            "sessions": {
+                source: {name: sketch.to_dict() for name, sketch in sketches.items()}
+                for source, sketches in self.sessions.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "CalibrationProfile":
+        return cls(
+            participant_id=str(payload["participant_id"]),
+            sessions={
+                source: {name: TDigest.from_dict(sketch) for name, sketch in sketches.items()}
+                for source, sketches in payload.get("sessions", {}).items()
+            },
+        )
+
+
+def profile_path(calibration_dir: Path, participant_id: str) -> Path:
+    return Path(calibration_dir) / f"participant_{participant_id}_calibration.json"
+
+
+def load_profile(calibration_dir: Path, participant_id: str) -> CalibrationProfile:
+    """Load a participant's profile, or an empty one if none has been written yet."""
+    path = profile_path(calibration_dir, participant_id)
+    if not path.is_file():
+        return CalibrationProfile(participant_id=str(participant_id))
+    return CalibrationProfile.from_dict(json.loads(path.read_text(encoding="utf-8")))
+
+
+def save_profile(profile: CalibrationProfile, calibration_dir: Path) -> Path:
+    """Write the profile atomically so readers never see a partial file."""
+    path = profile_path(ensure_directory(Path(calibration_dir)), profile.participant_id)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(profile.to_dict(), fh)
+        os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+    return path
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``<path>.lock``, shared by every process writing ``path``."""
+    with open(path.with_name(path.name + ".lock"), "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def add_session(calibration_dir: Path, participant_id: str, windows_df: pd.DataFrame, source: str) -> bool:
+    """Fold one session into the participant's saved profile; False if ``source`` was already in it.
+
+    The profile is re-loaded, updated and saved under a lock, so recordings of
+    one participant processed in parallel (``run_all --workers``) all land in it.
+    """
+    calibration_dir = ensure_directory(Path(calibration_dir))
+    with _locked(profile_path(calibration_dir, participant_id)):
+        profile = load_profile(calibration_dir, participant_id)
+        if not profile.update(windows_df, source=source):
+            return False
+        save_profile(profile, calibration_dir)
+    return True
+
+
+def calibrated_calculator(
+    base: LRICalculator,
+    profile: CalibrationProfile,
+    min_windows: int = CALIBRATION_MIN_WINDOWS,
+    quantiles: Tuple[float, float] = CALIBRATION_QUANTILES,
+) -> LRICalculator:
+    """``base`` normalising with the participant's percentiles once the profile has ``min_windows``.
+
+    Shared by the batch pipeline and online scoring, so both map the same
+    features to the same LRI. Callers scoring a recording already in the
+    profile pass ``profile.without(source)``.
+    """
+    if profile.num_windows < min_windows:
+        logger.info(
+            "Participant %s has %s calibration windows (< %s); using population ranges",
+            profile.participant_id,
+            profile.num_windows,
+            min_windows,
+        )
+        return base
+    return replace(base, ranges=profile.ranges(quantiles))
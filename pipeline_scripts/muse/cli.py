@@ -1,11 +1,15 @@
 """Command-line interface for Muse EEG pipeline."""
 
+import json
 from pathlib import Path
 from typing import Optional
 
+import pandas as pd
 import typer
 
+from pipeline_scripts.muse.dataset import write_session_dataset
 from pipeline_scripts.muse.pipeline import process_muse_csv
+from pipeline_scripts.utils import file_sha256
 
 app = typer.Typer(help="Muse EEG data processing pipeline")
 
@@ -28,3 +32,32 @@ def process(
     for key, path in outputs.items():
         typer.echo(f"  {key}: {path}")
 
+
+@app.command("build-dataset")
+def build_dataset(
+    processed_dir: Path = typer.Argument(
+        Path("data/processed/muse"), exists=True, file_okay=False, help="Directory with participant_<id>_* outputs"
+    ),
+    dataset_dir: Optional[Path] = typer.Option(None, help="Dataset root (defaults to <processed_dir>/dataset)"),
+) -> None:
+    """Backfill the partitioned dataset from existing per-participant windows/session files."""
+
+    dataset_root = dataset_dir or processed_dir / "dataset"
+    count = 0
+    for windows_path in sorted(processed_dir.glob("participant_*_windows.parquet")):
+        participant_id = windows_path.name[len("participant_") : -len("_windows.parquet")]
+        session_path = processed_dir / f"participant_{participant_id}_session.json"
+        if not session_path.is_file():
+            typer.echo(f"  skipping {windows_path.name}: no session JSON")
+            continue
+        summary = json.loads(session_path.read_text(encoding="utf-8"))
+        # The source CSV is not known here, so the windows file stands in for the recording
+        recording = file_sha256(windows_path)
+        write_session_dataset(pd.read_parquet(windows_path), [summary], participant_id, recording, dataset_root)
+        count += 1
+
+    typer.echo(f"Wrote {count} participants to {dataset_root}")
+
+
+if __name__ == "__main__":
+    app()
@@ -11,7 +11,14 @@ BAND_COLUMNS_LOWER = [col.lower() for col in BAND_COLUMNS]
 HSI_COLUMNS = ["HSI_TP9", "HSI_AF7", "HSI_AF8", "HSI_TP10"]
 HSI_COLUMNS_LOWER = [col.lower() for col in HSI_COLUMNS]
 
+RAW_COLUMNS = ["RAW_TP9", "RAW_AF7", "RAW_AF8", "RAW_TP10"]
+RAW_COLUMNS_LOWER = [col.lower() for col in RAW_COLUMNS]
+
 TIMESTAMP_COLUMN = "timestamp"
+ELEMENTS_COLUMN = "elements"
+
+# Inter-hemispheric (left, right) channel pairs for asymmetry features
+ASYMMETRY_PAIRS = {"frontal": ("af7", "af8"), "temporal": ("tp9", "tp10")}
 
 DERIVED_COLUMNS = [
     "theta_beta_ratio_tp9",
@@ -30,6 +37,61 @@ EXPECTED_SAMPLE_INTERVAL_SECONDS = 1.0
 WINDOW_SIZE_SECONDS = 30
 WINDOW_STEP_SECONDS = 15
 MIN_WINDOW_COVERAGE = 0.8
+# Uniform resampling grid: intervals must divide window size and step; the
+# finest one at or above the recording's sample spacing is chosen.
+MIN_GRID_INTERVAL_SECONDS = EXPECTED_SAMPLE_INTERVAL_SECONDS
+GRID_INTERVAL_CANDIDATES_SECONDS = (0.1, 0.25, 0.5, 1.0, 2.0, 2.5, 3.0, 5.0, 7.5, 10.0, 15.0)
+SESSION_GAP_SECONDS = 300
+
+# Windows per block when features and LRI are computed on a thread pool; large
+# enough that NumPy work (which drops the GIL) dominates per-block overhead.
+FEATURE_BLOCK_WINDOWS = 2048
+
+# Streaming session summaries: LRI is clipped to [0, 100], so a fixed histogram
+# of this bin width gives a mergeable median within half a bin of exact.
+LRI_HISTOGRAM_BIN_WIDTH = 0.01
+
+# Zoomable timeline pyramid (finest first; each level divides the next)
+PYRAMID_LEVELS_SECONDS = {"30s": 30, "2.5min": 150, "10min": 600, "1h": 3600}
+PYRAMID_METRICS = ["lri", "alertness", "focus", "arousal_balance"]
 
 DEFAULT_HSI_THRESHOLD = 2.5
 
+# Per-participant LRI calibration: percentile range used once enough windows are seen
+CALIBRATION_QUANTILES = (0.05, 0.95)
+CALIBRATION_MIN_WINDOWS = 240  # ~1 h of 15 s-stride windows
+
+# Per-channel quality masking: a channel sample is flagged when its total band
+# power (averaged per JUMP_SLOT_SECONDS) deviates from the trailing window by
+# more than the configured threshold in sigma (e.g. 6.0). Off by default: it costs
+# about a third more than masking without it and changes existing outputs.
+JUMP_Z_THRESHOLD = None
+JUMP_SLOT_SECONDS = 0.1
+JUMP_WINDOW_SECONDS = 10.0
+JUMP_MIN_SAMPLES = 10
+JUMP_MIN_STD = 0.01
+# Mind Monitor Elements markers -> (affected channels, half-width in seconds)
+MARKER_ARTIFACTS = {
+    "blink": (["af7", "af8"], 0.5),
+    "jaw_clench": (CHANNELS, 1.0),
+}
+
+LOADER_ENGINES = ("pandas", "arrow")
+DEFAULT_LOADER_ENGINE = "pandas"
+
+FEATURE_SOURCES = ("auto", "bands", "raw")
+DEFAULT_FEATURE_SOURCE = "auto"
+
+# Raw-signal spectral stage (mirrors the Muse headset's own band definitions)
+RAW_SAMPLING_RATE_HZ = 256
+FREQUENCY_BANDS_HZ = {
+    "delta": (1.0, 4.0),
+    "theta": (4.0, 8.0),
+    "alpha": (7.5, 13.0),
+    "beta": (13.0, 30.0),
+    "gamma": (30.0, 44.0),
+}
+SPECTRAL_SEGMENT_SECONDS = 1.0
+SPECTRAL_WELCH_SECONDS = 2.0
+SPECTRAL_OUTPUT_INTERVAL_SECONDS = EXPECTED_SAMPLE_INTERVAL_SECONDS
+
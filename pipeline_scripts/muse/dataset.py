@@ -0,0 +1,193 @@
+"""Consolidated Hive-partitioned Parquet dataset for processed Muse sessions.
+
+Layout under ``<dataset_root>``::
+
+    windows/participant_id=<id>/date=<YYYY-MM-DD>/<recording>-0.parquet
+    sessions/participant_id=<id>/date=<YYYY-MM-DD>/<recording>-0.parquet
+
+Window files are sorted by ``window_start`` and written in bounded row groups
+with column statistics, so readers can prune partitions by participant/date
+and skip row groups on ``window_start``/``lri`` predicates. Session rows are
+partitioned by the date of ``session_start``, so each night processed for a
+participant adds its own partition. Files are named after the recording they
+came from (its input hash), so recordings sharing a date, or one running past
+midnight into another's date, sit side by side in the same partition.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from pipeline_scripts.utils import ensure_directory, get_logger
+
+logger = get_logger(__name__)
+
+WINDOWS_DATASET_DIR = "windows"
+SESSIONS_DATASET_DIR = "sessions"
+ROWS_PER_GROUP = 8192
+
+WINDOWS_PARTITIONING = ds.partitioning(
+    pa.schema([("participant_id", pa.string()), ("date", pa.string())]),
+    flavor="hive",
+)
+SESSIONS_PARTITIONING = WINDOWS_PARTITIONING
+
+TimeLike = Union[str, date, datetime, pd.Timestamp]
+
+
+def _session_row(summary: Dict, participant_id: str, segment: int, num_windows: int) -> Dict:
+    time_in_state = summary.get("time_in_state", {})
+    components = summary.get("component_scores", {})
+    return {
+        "participant_id": participant_id,
+        "segment": segment,
+        "session_start": pd.Timestamp(summary["session_start"]),
+        "session_end": pd.Timestamp(summary["session_end"]),
+        "session_duration_minutes": summary["session_duration_minutes"],
+        "num_windows": num_windows,
+        "peak_lri": summary["peak_lri"],
+        "peak_timestamp": pd.Timestamp(summary["peak_timestamp"]),
+        "avg_lri": summary["avg_lri"],
+        "median_lri": summary["median_lri"],
+        "std_dev": summary["std_dev"],
+        "session_score": summary["session_score"],
+        "optimal_window_count": len(summary.get("optimal_windows", [])),
+        "optimal_minutes": time_in_state.get("optimal_minutes"),
+        "moderate_minutes": time_in_state.get("moderate_minutes"),
+        "low_minutes": time_in_state.get("low_minutes"),
+        "alertness": components.get("alertness"),
+        "focus": components.get("focus"),
+        "arousal_balance": components.get("arousal_balance"),
+    }
+
+
+def _remove_recording(root: Path, participant_id: str, recording: str) -> None:
+    for path in root.glob(f"participant_id={participant_id}/date=*/{recording}-*.parquet"):
+        path.unlink()
+
+
+def write_session_dataset(
+    windows_df: pd.DataFrame,
+    summaries: List[Dict],
+    participant_id: str,
+    recording: str,
+    dataset_root: Path,
+    num_windows: Optional[List[int]] = None,
+) -> Dict[str, Path]:
+    """Write one recording's windows and session rows into the consolidated dataset.
+
+    ``summaries`` holds one SessionAnalyzer summary per recording segment and
+    ``num_windows`` the matching window counts (defaults to all windows for a
+    single summary). ``recording`` (the input file's hash) names the files
+    written; re-processing a recording first deletes the files carrying its
+    name, so its rows are replaced while other recordings of the same
+    participant and date (and other participants, possibly written from
+    separate processes) are kept.
+    """
+    dataset_root = ensure_directory(Path(dataset_root))
+    windows_root = dataset_root / WINDOWS_DATASET_DIR
+    sessions_root = dataset_root / SESSIONS_DATASET_DIR
+    participant_id = str(participant_id)
+    for root in (windows_root, sessions_root):
+        _remove_recording(root, participant_id, recording)
+
+    windows = windows_df.sort_values("window_start", kind="stable").reset_index(drop=True)
+    windows = windows.assign(
+        participant_id=participant_id,
+        date=windows["window_start"].dt.strftime("%Y-%m-%d"),
+    )
+    ds.write_dataset(
+        pa.Table.from_pandas(windows, preserve_index=False),
+        windows_root,
+        format="parquet",
+        partitioning=WINDOWS_PARTITIONING,
+        basename_template=f"{recording}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        max_rows_per_group=ROWS_PER_GROUP,
+        min_rows_per_group=min(ROWS_PER_GROUP, len(windows)),
+    )
+
+    if num_windows is None:
+        num_windows = [len(windows)] if len(summaries) == 1 else [None] * len(summaries)
+    sessions = pd.DataFrame(
+        [
+            _session_row(summary, participant_id, segment, count)
+            for segment, (summary, count) in enumerate(zip(summaries, num_windows))
+        ]
+    )
+    sessions["date"] = sessions["session_start"].dt.strftime("%Y-%m-%d")
+    ds.write_dataset(
+        pa.Table.from_pandas(sessions, preserve_index=False),
+        sessions_root,
+        format="parquet",
+        partitioning=SESSIONS_PARTITIONING,
+        basename_template=f"{recording}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+    logger.info("Wrote %s windows for participant %s to %s", len(windows), participant_id, dataset_root)
+    return {"windows_dataset": windows_root, "sessions_dataset": sessions_root}
+
+
+def windows_dataset(dataset_root: Path) -> ds.Dataset:
+    """Open the windows dataset with its Hive partitioning schema."""
+    return ds.dataset(Path(dataset_root) / WINDOWS_DATASET_DIR, format="parquet", partitioning=WINDOWS_PARTITIONING)
+
+
+def read_windows(
+    dataset_root: Path,
+    participant_ids: Optional[Iterable[str]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    min_lri: Optional[float] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Read windows, pruning participant/date partitions and pushing down time/LRI filters.
+
+    ``start`` is inclusive and ``end`` exclusive, both compared to ``window_start``.
+    """
+    expression = None
+
+    def _and(condition: ds.Expression) -> None:
+        nonlocal expression
+        expression = condition if expression is None else expression & condition
+
+    if participant_ids is not None:
+        _and(ds.field("participant_id").isin([str(pid) for pid in participant_ids]))
+    if start is not None:
+        start = pd.Timestamp(start)
+        _and(ds.field("date") >= start.strftime("%Y-%m-%d"))
+        _and(ds.field("window_start") >= start)
+    if end is not None:
+        end = pd.Timestamp(end)
+        _and(ds.field("date") <= end.strftime("%Y-%m-%d"))
+        _and(ds.field("window_start") < end)
+    if min_lri is not None:
+        _and(ds.field("lri") >= float(min_lri))
+
+    table = windows_dataset(dataset_root).to_table(columns=columns, filter=expression)
+    df = table.to_pandas()
+    if "window_start" in df.columns:
+        df = df.sort_values(
+            ["participant_id", "window_start"] if "participant_id" in df.columns else ["window_start"],
+            kind="stable",
+        ).reset_index(drop=True)
+    return df
+
+
+def read_sessions(dataset_root: Path, participant_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Read the compact session-summary table, optionally for a subset of participants."""
+    dataset = ds.dataset(
+        Path(dataset_root) / SESSIONS_DATASET_DIR, format="parquet", partitioning=SESSIONS_PARTITIONING
+    )
+    expression = None
+    if participant_ids is not None:
+        expression = ds.field("participant_id").isin([str(pid) for pid in participant_ids])
+    df = dataset.to_table(filter=expression).to_pandas()
+    return df.sort_values(["participant_id", "session_start"], kind="stable").reset_index(drop=True)
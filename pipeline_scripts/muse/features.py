@@ -4,17 +4,70 @@ from __future__ import annotations
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
 
-from pipeline_scripts.muse.constants import BAND_COLUMNS_LOWER, CHANNELS
+from pipeline_scripts.muse.constants import ASYMMETRY_PAIRS, BAND_COLUMNS_LOWER, BAND_PREFIXES, CHANNELS
 
 
-def compute_window_features(window_df: pd.DataFrame) -> Dict:
-    features: Dict[str, float] = {}
+def _row_nanmean(block: np.ndarray, out: np.ndarray) -> None:
+    """Per-row mean over non-NaN entries (NaN when a row has none), written into ``out``."""
+    valid = ~np.isnan(block)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(np.where(valid, block, 0.0).sum(axis=1), valid.sum(axis=1), out=out)
+
+
+def window_feature_names(columns: Sequence[str], extended: bool = False) -> List[str]:
+    """Output feature columns, in order, for windows averaged over ``columns``."""
+    present = set(columns)
+    names = [col for col in BAND_COLUMNS_LOWER if col in present]
+    for ch in CHANNELS:
+        if f"theta_{ch}" in present and f"beta_{ch}" in present:
+            names.append(f"theta_beta_ratio_{ch}")
+        if f"beta_{ch}" in present and f"alpha_{ch}" in present:
+            names.append(f"beta_alpha_ratio_{ch}")
+    if present & {"theta_af7", "theta_af8"}:
+        names.append("frontal_theta_avg")
+    if present & {"alpha_tp9", "alpha_tp10"}:
+        names.append("posterior_alpha_avg")
+    names.append("hs_i_mean")
+
+    if extended:
+        names += [f"{col}_var" for col in BAND_COLUMNS_LOWER if col in present]
+        names += [f"{col}_slope" for col in BAND_COLUMNS_LOWER if col in present]
+        for band in BAND_PREFIXES:
+            for region, (left, right) in ASYMMETRY_PAIRS.items():
+                if f"{band}_{left}" in present and f"{band}_{right}" in present:
+                    names.append(f"{band}_asymmetry_{region}")
+    return names
+
+
+def write_window_features(
+    columns: Sequence[str],
+    means: np.ndarray,
+    out: Dict[str, np.ndarray],
+    variances: Optional[np.ndarray] = None,
+    slopes: Optional[np.ndarray] = None,
+) -> None:
+    """Compute features for a block of windows straight into ``out``.
+
+    ``means`` (and the optional ``variances``/``slopes``) are ``(windows,
+    len(columns))`` arrays; ``out`` maps each ``window_feature_names`` entry
+    to a writable array of the block's length, typically a slice of the full
+    output. The extended features are written when ``variances`` is given.
+
+    Extended features are per-band variance, slope (per second) and
+    inter-hemispheric asymmetry: right minus left mean band power for each
+    pair in ``ASYMMETRY_PAIRS``. Mind Monitor band powers are log-scaled, so
+    this is the usual log-ratio asymmetry index.
+    """
+    index = {col: i for i, col in enumerate(columns)}
+
+    def _mean(col: str) -> np.ndarray:
+        return means[:, index[col]]
 
     for col in BAND_COLUMNS_LOWER:
-        if col in window_df.columns:
-            features[col] = float(window_df[col].mean())
+        if col in index:
+            out[col][:] = _mean(col)
 
     # Derived ratios per channel
     for ch in CHANNELS:
@@ -22,22 +75,47 @@ def compute_window_features(window_df: pd.DataFrame) -> Dict:
         beta_col = f"beta_{ch}"
         alpha_col = f"alpha_{ch}"
 
-        if theta_col in window_df and beta_col in window_df:
-            ratio = window_df[theta_col].mean() / (window_df[beta_col].mean() + 1e-6)
-            features[f"theta_beta_ratio_{ch}"] = float(ratio)
+        if theta_col in index and beta_col in index:
+            np.divide(_mean(theta_col), _mean(beta_col) + 1e-6, out=out[f"theta_beta_ratio_{ch}"])
 
-        if beta_col in window_df and alpha_col in window_df:
-            ratio = window_df[beta_col].mean() / (window_df[alpha_col].mean() + 1e-6)
-            features[f"beta_alpha_ratio_{ch}"] = float(ratio)
+        if beta_col in index and alpha_col in index:
+            np.divide(_mean(beta_col), _mean(alpha_col) + 1e-6, out=out[f"beta_alpha_ratio_{ch}"])
 
-    frontal_theta_cols = [col for col in ["theta_af7", "theta_af8"] if col in window_df.columns]
+    frontal_theta_cols = [index[col] for col in ["theta_af7", "theta_af8"] if col in index]
     if frontal_theta_cols:
-        features["frontal_theta_avg"] = float(window_df[frontal_theta_cols].mean().mean())
+        _row_nanmean(means[:, frontal_theta_cols], out["frontal_theta_avg"])
 
-    posterior_alpha_cols = [col for col in ["alpha_tp9", "alpha_tp10"] if col in window_df.columns]
+    posterior_alpha_cols = [index[col] for col in ["alpha_tp9", "alpha_tp10"] if col in index]
     if posterior_alpha_cols:
-        features["posterior_alpha_avg"] = float(window_df[posterior_alpha_cols].mean().mean())
+        _row_nanmean(means[:, posterior_alpha_cols], out["posterior_alpha_avg"])
+
+    hsi_cols = [i for col, i in index.items() if col.startswith("hsi_")]
+    if hsi_cols:
+        _row_nanmean(means[:, hsi_cols], out["hs_i_mean"])
+    else:
+        out["hs_i_mean"][:] = np.nan
+
+    if variances is None:
+        return
+    for col in BAND_COLUMNS_LOWER:
+        if col in index:
+            out[f"{col}_var"][:] = variances[:, index[col]]
+            out[f"{col}_slope"][:] = slopes[:, index[col]]
+    for band in BAND_PREFIXES:
+        for region, (left, right) in ASYMMETRY_PAIRS.items():
+            left_col, right_col = f"{band}_{left}", f"{band}_{right}"
+            if left_col in index and right_col in index:
+                np.subtract(_mean(right_col), _mean(left_col), out=out[f"{band}_asymmetry_{region}"])
+
 
-    features["hs_i_mean"] = float(window_df[[c for c in window_df.columns if c.startswith("hsi_")]].mean().mean())
-    return features
+def compute_features_from_means(means: pd.DataFrame) -> pd.DataFrame:
+    """Derive window features from per-window column means (one row per window)."""
+    columns = list(means.columns)
+    out = {name: np.empty(len(means)) for name in window_feature_names(columns)}
+    write_window_features(columns, means.to_numpy(dtype=float), out)
+    return pd.DataFrame(out, index=means.index)
 
+
+def compute_window_features(window_df: pd.DataFrame) -> Dict:
+    means = window_df.mean(numeric_only=True).to_frame().T
+    return {name: float(value) for name, value in compute_features_from_means(means).iloc[0].items()}
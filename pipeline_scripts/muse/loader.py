@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
+import csv
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional
 
@@ -12,9 +16,15 @@ from pipeline_scripts.muse.constants import (
     BAND_COLUMNS_LOWER,
     HSI_COLUMNS,
     HSI_COLUMNS_LOWER,
+    RAW_COLUMNS_LOWER,
     TIMESTAMP_COLUMN,
     DEFAULT_HSI_THRESHOLD,
+    DEFAULT_LOADER_ENGINE,
+    ELEMENTS_COLUMN,
+    JUMP_Z_THRESHOLD,
+    LOADER_ENGINES,
 )
+from pipeline_scripts.muse.quality import apply_quality_mask
 
 logger = get_logger(__name__)
 
@@ -34,16 +44,12 @@ def _standardise_columns(columns: Iterable[str]) -> Dict[str, str]:
     return mapping
 
 
-def load_clean_data(
-    csv_path: Path,
-    hsi_threshold: float = DEFAULT_HSI_THRESHOLD,
-    chunk_size: int = 100_000,
-) -> pd.DataFrame:
-    """Load Muse CSV and apply cleaning filters."""
-    csv_path = Path(csv_path)
-    if not csv_path.is_file():
-        raise FileNotFoundError(f"Muse CSV not found: {csv_path}")
+def _read_header(csv_path: Path) -> List[str]:
+    with csv_path.open("r", encoding="utf-8", newline="") as fh:
+        return next(csv.reader(fh), [])
 
+
+def _load_pandas(csv_path: Path, chunk_size: int) -> List[pd.DataFrame]:
     parts: List[pd.DataFrame] = []
 
     for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
@@ -54,34 +60,139 @@ def load_clean_data(
 
         chunk[TIMESTAMP_COLUMN] = pd.to_datetime(chunk[TIMESTAMP_COLUMN], errors="coerce")
         chunk = chunk.dropna(subset=[TIMESTAMP_COLUMN])
-        chunk = chunk.sort_values(TIMESTAMP_COLUMN)
-
-        # Drop warmup rows (all band powers zero)
-        band_cols_present = [col for col in BAND_COLUMNS_LOWER if col in chunk.columns]
-        if band_cols_present:
-            band_zero_mask = (chunk[band_cols_present].abs().sum(axis=1) == 0)
-            chunk = chunk.loc[~band_zero_mask]
-
-        # HSI filtering
-        hsi_cols_present = [col for col in HSI_COLUMNS_LOWER if col in chunk.columns]
-        if hsi_cols_present:
-            hsi_mask = (chunk[hsi_cols_present] <= hsi_threshold).all(axis=1)
-            chunk = chunk.loc[hsi_mask]
 
         if not chunk.empty:
             parts.append(chunk)
 
-    if not parts:
-        raise ValueError("No data left after cleaning filters.")
+    return parts
+
+
+def _read_arrow_table(csv_path: Path, columns: Dict[str, str], parse_timestamps: bool) -> pa.Table:
+    column_types = {
+        source: pa.string() if target == ELEMENTS_COLUMN else pa.float32()
+        for source, target in columns.items()
+        if target != TIMESTAMP_COLUMN
+    }
+    if parse_timestamps:
+        column_types.update(
+            {source: pa.timestamp("ns") for source, target in columns.items() if target == TIMESTAMP_COLUMN}
+        )
+    return pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(columns),
+            column_types=column_types,
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def _read_projected(csv_path: Path, wanted: Iterable[str]) -> pd.DataFrame:
+    """Read the ``wanted`` standardised columns as float32 plus a parsed timestamp."""
+    wanted = set(wanted) | {TIMESTAMP_COLUMN}
+    columns = {
+        source: target
+        for source, target in _standardise_columns(_read_header(csv_path)).items()
+        if target in wanted
+    }
+    if TIMESTAMP_COLUMN not in columns.values():
+        raise ValueError("Timestamp column required in Muse CSV data.")
+
+    try:
+        table = _read_arrow_table(csv_path, columns, parse_timestamps=True)
+    except pa.ArrowInvalid:
+        # Non-ISO timestamps: fall back to lenient pandas parsing for that column only.
+        logger.warning("Native timestamp parsing failed for %s; coercing with pandas", csv_path.name)
+        table = _read_arrow_table(csv_path, columns, parse_timestamps=False)
+
+    df = table.rename_columns([columns[name] for name in table.column_names]).to_pandas()
+    if not pd.api.types.is_datetime64_any_dtype(df[TIMESTAMP_COLUMN]):
+        df[TIMESTAMP_COLUMN] = pd.to_datetime(df[TIMESTAMP_COLUMN], errors="coerce")
+    return df.dropna(subset=[TIMESTAMP_COLUMN])
+
+
+def _load_arrow(csv_path: Path) -> List[pd.DataFrame]:
+    """Read only timestamp, band, HSI and Elements columns through the pyarrow CSV reader.
+
+    Bands and HSI are decoded straight into float32 and timestamps are parsed
+    natively; raw EEG, motion and telemetry columns are never materialised.
+    """
+    df = _read_projected(csv_path, BAND_COLUMNS_LOWER + HSI_COLUMNS_LOWER + [ELEMENTS_COLUMN])
 
-    df = pd.concat(parts, ignore_index=True)
-    df = df.set_index(TIMESTAMP_COLUMN).sort_index()
+    return [df] if not df.empty else []
+
+
+def load_clean_data(
+    csv_path: Path,
+    hsi_threshold: float = DEFAULT_HSI_THRESHOLD,
+    chunk_size: int = 100_000,
+    engine: str = DEFAULT_LOADER_ENGINE,
+    jump_z_threshold: Optional[float] = JUMP_Z_THRESHOLD,
+) -> pd.DataFrame:
+    """Load Muse CSV and apply cleaning filters.
+
+    ``engine="pandas"`` streams every column through ``pd.read_csv`` in chunks;
+    ``engine="arrow"`` projects to timestamp/band/HSI/Elements columns and stores
+    bands and HSI as float32. Cleaning is per channel (see
+    :func:`~pipeline_scripts.muse.quality.apply_quality_mask`): bad channel
+    samples become NaN and only rows without any valid channel are dropped.
+    """
+    csv_path = Path(csv_path)
+    if not csv_path.is_file():
+        raise FileNotFoundError(f"Muse CSV not found: {csv_path}")
+    if engine not in LOADER_ENGINES:
+        raise ValueError(f"Unknown Muse loader engine '{engine}'; expected one of {LOADER_ENGINES}.")
+
+    if engine == "arrow":
+        parts = _load_arrow(csv_path)
+    else:
+        parts = _load_pandas(csv_path, chunk_size)
+
+    if parts:
+        df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+        df = df.set_index(TIMESTAMP_COLUMN).sort_index(kind="stable")
+        df = apply_quality_mask(df, hsi_threshold=hsi_threshold, jump_z_threshold=jump_z_threshold)
+    if not parts or df.empty:
+        raise ValueError("No data left after cleaning filters.")
 
     logger.info(
-        "Loaded %s rows for %s after cleaning",
+        "Loaded %s rows for %s after cleaning (%s engine)",
         len(df),
         csv_path.name,
+        engine,
     )
 
     return df
 
+
+def detect_feature_source(csv_path: Path) -> str:
+    """Return ``"bands"`` if the CSV carries precomputed band powers, else ``"raw"`` if it has raw EEG."""
+    columns = set(_standardise_columns(_read_header(Path(csv_path))).values())
+    if columns.intersection(BAND_COLUMNS_LOWER):
+        return "bands"
+    if columns.intersection(RAW_COLUMNS_LOWER):
+        return "raw"
+    return "bands"
+
+
+def load_raw_eeg(csv_path: Path) -> pd.DataFrame:
+    """Load raw EEG channels (``raw_tp9`` ... ``raw_tp10``) as float32, indexed by timestamp.
+
+    Rows without a complete set of raw samples (e.g. Mind Monitor marker rows) are dropped.
+    """
+    csv_path = Path(csv_path)
+    if not csv_path.is_file():
+        raise FileNotFoundError(f"Muse CSV not found: {csv_path}")
+
+    df = _read_projected(csv_path, RAW_COLUMNS_LOWER)
+    raw_cols = [col for col in RAW_COLUMNS_LOWER if col in df.columns]
+    if not raw_cols:
+        raise ValueError("No raw EEG columns detected in Muse CSV data.")
+
+    df = df.dropna(subset=raw_cols)
+    if df.empty:
+        raise ValueError("No raw EEG samples left after cleaning.")
+
+    df = df.set_index(TIMESTAMP_COLUMN).sort_index(kind="stable")
+    logger.info("Loaded %s raw EEG samples for %s", len(df), csv_path.name)
+    return df[raw_cols]
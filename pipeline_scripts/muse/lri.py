@@ -3,44 +3,108 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 
 import numpy as np
+import pandas as pd
+
+ArrayLike = Union[float, np.ndarray]
+
+# Population (min, max) ranges mapped onto 0-100 by ``LRICalculator._normalize``;
+# per-participant calibration replaces them with the user's own percentiles.
+POPULATION_RANGES: Dict[str, Tuple[float, float]] = {
+    "beta": (0.1, 2.0),
+    "theta_beta_ratio": (0.5, 2.0),
+    "alpha": (0.2, 1.5),
+    "frontal_theta": (0.3, 1.5),
+    "frontal_alpha": (0.2, 1.2),
+    "frontal_gamma": (0.05, 0.3),
+}
+
+ALL_BETA = ["beta_tp9", "beta_af7", "beta_af8", "beta_tp10"]
+ALL_THETA = ["theta_tp9", "theta_af7", "theta_af8", "theta_tp10"]
+ALL_ALPHA = ["alpha_tp9", "alpha_af7", "alpha_af8", "alpha_tp10"]
+
+
+def _channel_mean(features: Mapping[str, ArrayLike], columns: List[str]) -> ArrayLike:
+    """Mean over the channels with a valid value; quality-masked channels arrive as NaN.
+
+    Works on scalars or equal-length arrays per column (one entry per window).
+    """
+    values = np.stack(np.broadcast_arrays(*(np.asarray(features.get(col, 0.0), dtype=float) for col in columns)))
+    valid = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(valid, values, 0.0).sum(axis=0) / valid.sum(axis=0)
+
+
+def calibration_inputs(windows_df: pd.DataFrame) -> pd.DataFrame:
+    """Per-window values of every ``POPULATION_RANGES`` quantity, as ``LRICalculator`` computes them."""
+
+    def _mean(columns: List[str]) -> pd.Series:
+        present = [col for col in columns if col in windows_df.columns]
+        return windows_df[present].mean(axis=1) if present else pd.Series(np.nan, index=windows_df.index)
+
+    beta = _mean(ALL_BETA)
+    return pd.DataFrame(
+        {
+            "beta": beta,
+            "theta_beta_ratio": _mean(ALL_THETA) / (beta + 1e-6),
+            "alpha": _mean(ALL_ALPHA),
+            "frontal_theta": _mean(["theta_af7", "theta_af8"]),
+            "frontal_alpha": _mean(["alpha_af7", "alpha_af8"]),
+            "frontal_gamma": _mean(["gamma_af7", "gamma_af8"]),
+        }
+    )
 
 
 @dataclass
 class LRICalculator:
     optimal_beta_alpha_ratio: float = 1.5
+    alertness_weight: float = 0.4
+    focus_weight: float = 0.4
+    arousal_weight: float = 0.2
+    # Per-participant overrides of POPULATION_RANGES (see muse.calibration)
+    ranges: Optional[Dict[str, Tuple[float, float]]] = None
+
+    def _scaled(self, name: str, value: ArrayLike) -> ArrayLike:
+        min_val, max_val = (self.ranges or {}).get(name, POPULATION_RANGES[name])
+        return self._normalize(value, min_val, max_val)
 
     def calculate(self, features: Dict[str, float], post_exercise_multiplier: float = 1.0) -> Dict[str, float]:
+        return {
+            name: float(value) for name, value in self.calculate_arrays(features, post_exercise_multiplier).items()
+        }
+
+    def calculate_arrays(
+        self,
+        features: Mapping[str, ArrayLike],
+        post_exercise_multiplier: ArrayLike = 1.0,
+    ) -> Dict[str, ArrayLike]:
+        """``calculate`` over many windows at once: each feature is an array with one entry per window."""
         alertness = self._calculate_alertness(features)
         focus = self._calculate_focus(features)
         arousal = self._calculate_arousal(features)
 
-        base_lri = 0.4 * alertness + 0.4 * focus + 0.2 * arousal
+        base_lri = self.alertness_weight * alertness + self.focus_weight * focus + self.arousal_weight * arousal
         lri = base_lri * post_exercise_multiplier
 
         return {
-            "lri": float(np.clip(lri, 0, 100)),
-            "base_lri": float(np.clip(base_lri, 0, 100)),
-            "alertness": float(alertness),
-            "focus": float(focus),
-            "arousal_balance": float(arousal),
+            "lri": np.clip(lri, 0, 100),
+            "base_lri": np.clip(base_lri, 0, 100),
+            "alertness": alertness,
+            "focus": focus,
+            "arousal_balance": arousal,
         }
 
-    def _calculate_alertness(self, features: Dict[str, float]) -> float:
-        beta_values = [features.get(col, 0.0) for col in ["beta_tp9", "beta_af7", "beta_af8", "beta_tp10"]]
-        theta_values = [features.get(col, 0.0) for col in ["theta_tp9", "theta_af7", "theta_af8", "theta_tp10"]]
-        alpha_values = [features.get(col, 0.0) for col in ["alpha_tp9", "alpha_af7", "alpha_af8", "alpha_tp10"]]
-
-        beta_avg = np.mean(beta_values)
-        theta_avg = np.mean(theta_values)
-        alpha_avg = np.mean(alpha_values)
+    def _calculate_alertness(self, features: Mapping[str, ArrayLike]) -> ArrayLike:
+        beta_avg = _channel_mean(features, ALL_BETA)
+        theta_avg = _channel_mean(features, ALL_THETA)
+        alpha_avg = _channel_mean(features, ALL_ALPHA)
 
-        beta_score = self._normalize(beta_avg, 0.1, 2.0)
+        beta_score = self._scaled("beta", beta_avg)
         theta_beta_ratio = theta_avg / (beta_avg + 1e-6)
-        theta_beta_score = 100 - self._normalize(theta_beta_ratio, 0.5, 2.0)
-        alpha_suppression_score = 100 - self._normalize(alpha_avg, 0.2, 1.5)
+        theta_beta_score = 100 - self._scaled("theta_beta_ratio", theta_beta_ratio)
+        alpha_suppression_score = 100 - self._scaled("alpha", alpha_avg)
 
         return np.clip(
             0.4 * beta_score + 0.3 * theta_beta_score + 0.3 * alpha_suppression_score,
@@ -48,14 +112,10 @@ class LRICalculator:
             100,
         )
 
-    def _calculate_focus(self, features: Dict[str, float]) -> float:
-        theta_values = [features.get(col, 0.0) for col in ["theta_af7", "theta_af8"]]
-        alpha_values = [features.get(col, 0.0) for col in ["alpha_af7", "alpha_af8"]]
-        gamma_values = [features.get(col, 0.0) for col in ["gamma_af7", "gamma_af8"]]
-
-        theta_score = self._normalize(np.mean(theta_values), 0.3, 1.5)
-        alpha_mod_score = self._normalize(np.mean(alpha_values), 0.2, 1.2)
-        gamma_score = self._normalize(np.mean(gamma_values), 0.05, 0.3)
+    def _calculate_focus(self, features: Mapping[str, ArrayLike]) -> ArrayLike:
+        theta_score = self._scaled("frontal_theta", _channel_mean(features, ["theta_af7", "theta_af8"]))
+        alpha_mod_score = self._scaled("frontal_alpha", _channel_mean(features, ["alpha_af7", "alpha_af8"]))
+        gamma_score = self._scaled("frontal_gamma", _channel_mean(features, ["gamma_af7", "gamma_af8"]))
 
         return np.clip(
             0.5 * theta_score + 0.3 * alpha_mod_score + 0.2 * gamma_score,
@@ -63,16 +123,16 @@ class LRICalculator:
             100,
         )
 
-    def _calculate_arousal(self, features: Dict[str, float]) -> float:
-        beta_avg = np.mean([features.get(col, 0.0) for col in ["beta_tp9", "beta_af7", "beta_af8", "beta_tp10"]])
-        alpha_avg = np.mean([features.get(col, 0.0) for col in ["alpha_tp9", "alpha_af7", "alpha_af8", "alpha_tp10"]])
+    def _calculate_arousal(self, features: Mapping[str, ArrayLike]) -> ArrayLike:
+        beta_avg = _channel_mean(features, ALL_BETA)
+        alpha_avg = _channel_mean(features, ALL_ALPHA)
 
         ratio = beta_avg / (alpha_avg + 1e-6)
-        deviation = abs(ratio - self.optimal_beta_alpha_ratio)
-        return float(100 * np.exp(-0.5 * (deviation / 0.5) ** 2))
+        deviation = np.abs(ratio - self.optimal_beta_alpha_ratio)
+        return 100 * np.exp(-0.5 * (deviation / 0.5) ** 2)
 
     @staticmethod
-    def _normalize(value: float, min_val: float, max_val: float) -> float:
+    def _normalize(value: ArrayLike, min_val: float, max_val: float) -> ArrayLike:
         norm = (value - min_val) / (max_val - min_val)
-        return float(np.clip(norm * 100, 0, 100))
+        return np.clip(norm * 100, 0, 100)
 
@@ -3,64 +3,336 @@
 from __future__ import annotations
 
 import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
+import numpy as np
 import pandas as pd
 
-from pipeline_scripts.utils import ensure_directory, get_logger, load_config
-from pipeline_scripts.muse.loader import load_clean_data
+from pipeline_scripts.utils import (
+    StageCache,
+    code_version,
+    ensure_directory,
+    file_sha256,
+    get_logger,
+    load_config,
+    run_blocks,
+    stage_key,
+)
+from pipeline_scripts.muse import (
+    constants,
+    features,
+    loader,
+    lri,
+    quality,
+    resample,
+    segmentation,
+    session,
+    spectral,
+    windowing,
+)
+from pipeline_scripts.muse.calibration import add_session, calibrated_calculator, load_profile, profile_path
+from pipeline_scripts.muse.constants import (
+    CALIBRATION_MIN_WINDOWS,
+    DEFAULT_LOADER_ENGINE,
+    FEATURE_BLOCK_WINDOWS,
+    FEATURE_SOURCES,
+    JUMP_Z_THRESHOLD,
+)
+from pipeline_scripts.muse.dataset import write_session_dataset
+from pipeline_scripts.muse.loader import detect_feature_source, load_clean_data, load_raw_eeg
+from pipeline_scripts.muse.pyramid import build_window_pyramid
+from pipeline_scripts.muse.segmentation import split_sessions
+from pipeline_scripts.muse.spectral import compute_band_power_frame
 from pipeline_scripts.muse.windowing import generate_windows
 from pipeline_scripts.muse.lri import LRICalculator
 from pipeline_scripts.muse.session import SessionAnalyzer
 
 logger = get_logger(__name__)
 
+LRI_COLUMNS = ["lri", "base_lri", "alertness", "focus", "arousal_balance"]
+
+
+def _load_params(muse_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "feature_source": str(muse_cfg.get("feature_source", "auto")),
+        "hsi_threshold": float(muse_cfg.get("hsi_threshold", 2.5)),
+        "jump_z_threshold": muse_cfg.get("jump_z_threshold", JUMP_Z_THRESHOLD),
+        "loader_engine": str(muse_cfg.get("loader_engine", DEFAULT_LOADER_ENGINE)),
+        "raw_sampling_rate_hz": float(muse_cfg.get("raw_sampling_rate_hz", 256)),
+    }
+
+
+def _window_params(muse_cfg: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "session_gap_seconds": float(muse_cfg.get("session_gap_seconds", 300)),
+        "window_size_seconds": int(muse_cfg.get("window_size_seconds", 30)),
+        "step_seconds": int(muse_cfg.get("window_overlap_seconds", 15)),
+        "min_coverage": float(muse_cfg.get("min_window_coverage", 0.8)),
+        "grid_interval_seconds": (
+            float(muse_cfg["grid_interval_seconds"]) if muse_cfg.get("grid_interval_seconds") else None
+        ),
+        "extended_features": bool(muse_cfg.get("extended_features", False)),
+    }
+
+
+def _load_cleaned(csv_path: Path, params: Dict[str, Any]) -> pd.DataFrame:
+    feature_source = params["feature_source"]
+    if feature_source not in FEATURE_SOURCES:
+        raise ValueError(f"Unknown Muse feature source '{feature_source}'; expected one of {FEATURE_SOURCES}.")
+    if feature_source == "auto":
+        feature_source = detect_feature_source(csv_path)
+
+    if feature_source == "raw":
+        # Raw-only recordings: derive Mind Monitor-style band powers before windowing.
+        return compute_band_power_frame(
+            load_raw_eeg(csv_path),
+            sampling_rate_hz=params["raw_sampling_rate_hz"],
+        )
+    return load_clean_data(
+        csv_path,
+        hsi_threshold=params["hsi_threshold"],
+        engine=params["loader_engine"],
+        jump_z_threshold=params["jump_z_threshold"],
+    )
+
+
+def _window_segment(segment_df: pd.DataFrame, params: Dict[str, Any], threads: int = 1) -> pd.DataFrame:
+    """Window one continuous recording segment."""
+    return generate_windows(
+        segment_df,
+        window_size_seconds=params["window_size_seconds"],
+        step_seconds=params["step_seconds"],
+        min_coverage=params["min_coverage"],
+        grid_interval_seconds=params["grid_interval_seconds"],
+        extended_features=params["extended_features"],
+        threads=threads,
+    )
+
+
+def _window_segments(cleaned_df: pd.DataFrame, params: Dict[str, Any], workers: int, threads: int = 1) -> pd.DataFrame:
+    """Split at gaps and window each segment independently (across processes when ``workers`` > 1).
+
+    Each segment's windows are computed on ``threads`` threads when segments
+    run in-process; worker processes use one thread each.
+    """
+    segments = split_sessions(
+        cleaned_df,
+        gap_seconds=params["session_gap_seconds"],
+        min_duration_seconds=params["window_size_seconds"],
+    )
+
+    workers = min(workers, len(segments))
+    if workers <= 1:
+        segment_windows = [_window_segment(segment, params, threads) for segment in segments]
+    else:
+        logger.info("Windowing %s segments on %s worker processes", len(segments), workers)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            segment_windows = list(executor.map(_window_segment, segments, [params] * len(segments)))
+
+    return pd.concat(
+        [windows.assign(segment=index) for index, windows in enumerate(segment_windows)],
+        ignore_index=True,
+    )
+
+
+def _score_windows(windows_df: pd.DataFrame, lri_calc: LRICalculator, threads: int = 1) -> pd.DataFrame:
+    """Append LRI columns, scoring blocks of windows on ``threads`` threads."""
+    inputs = {
+        col: windows_df[col].to_numpy(dtype=float)
+        for col in dict.fromkeys(lri.ALL_BETA + lri.ALL_THETA + lri.ALL_ALPHA + ["gamma_af7", "gamma_af8"])
+        if col in windows_df.columns
+    }
+    scores = {name: np.empty(len(windows_df)) for name in LRI_COLUMNS}
+
+    def _block(lo: int, hi: int) -> None:
+        block = lri_calc.calculate_arrays({col: values[lo:hi] for col, values in inputs.items()})
+        for name in LRI_COLUMNS:
+            scores[name][lo:hi] = block[name]
+
+    run_blocks(len(windows_df), FEATURE_BLOCK_WINDOWS, _block, threads=threads)
+    return windows_df.assign(**scores)
+
+
+def _analyse_sessions(windows_df: pd.DataFrame, analyzer: SessionAnalyzer) -> Dict[str, Any]:
+    """Analyse every segment independently, plus the whole file when there are several."""
+    segments = [group.reset_index(drop=True) for _, group in windows_df.groupby("segment", sort=True)]
+    summaries = [analyzer.analyse(segment) for segment in segments]
+    return {
+        "session": summaries[0] if len(summaries) == 1 else analyzer.analyse(windows_df),
+        "segments": summaries,
+        "num_windows": [len(segment) for segment in segments],
+    }
+
+
+def _calibration_dir(muse_cfg: Dict[str, Any], output_dir: Path) -> Path:
+    return Path(muse_cfg.get("calibration_dir") or Path(output_dir) / "calibration")
+
+
+def _participant_id(csv_path: Path) -> str:
+    return Path(csv_path).stem.split("_")[-1]
+
+
+def calibration_version(csv_path: Path, output_dir: Path, muse_cfg: Dict[str, Any], input_hash: str) -> Optional[str]:
+    """Version of the calibration profile ``csv_path`` would be scored against (None when calibration is off).
+
+    The recording's own windows are left out, so the version only changes when
+    other recordings of the participant are added.
+    """
+    if not muse_cfg.get("calibrate", False):
+        return None
+    profile = load_profile(_calibration_dir(muse_cfg, output_dir), _participant_id(csv_path))
+    return profile.without(input_hash).version
+
+
+def _stage_keys(
+    input_hash: str,
+    load_params: Dict[str, Any],
+    window_params: Dict[str, Any],
+    lri_calc: LRICalculator,
+    analyzer: SessionAnalyzer,
+) -> Dict[str, str]:
+    """Chain each stage's key from its upstream key, parameters and source code.
+
+    Every stage's helpers live in this module and read ``constants``, so both
+    are versioned with the first stage; the chain carries them to the rest.
+    """
+    shared = (constants, sys.modules[__name__])
+    keys = {"load": stage_key("load", input_hash, load_params, code_version(loader, quality, spectral, *shared))}
+    keys["windows"] = stage_key(
+        "windows", keys["load"], window_params, code_version(segmentation, resample, windowing, features)
+    )
+    keys["lri"] = stage_key("lri", keys["windows"], asdict(lri_calc), code_version(lri))
+    keys["session"] = stage_key(
+        "session", keys["lri"], {"optimal_threshold": analyzer.optimal_threshold}, code_version(session)
+    )
+    return keys
+
 
 def process_muse_csv(
     csv_path: Path,
     output_dir: Path,
     config_path: Optional[Path] = None,
+    segment_workers: Optional[int] = None,
+    cache: Optional[StageCache] = None,
+    feature_threads: Optional[int] = None,
 ) -> Dict[str, Path]:
-    config = load_config(config_path)
+    """Process one Muse CSV into windows Parquet and session JSON outputs.
 
+    The recording is split into sessions at gaps longer than
+    ``muse.session_gap_seconds``; segments are windowed and analysed
+    independently (in parallel when ``segment_workers`` > 1, default
+    ``muse.segment_workers`` or every core). With more than one segment an
+    extra ``participant_<id>_session_<k>.json`` is written per segment.
+    Features and LRI are computed in blocks of windows on ``feature_threads``
+    threads (default ``muse.feature_threads`` or every core).
+
+    With ``muse.cache_dir`` set (or a ``cache`` passed in), cleaned data,
+    windows, scored windows and session summaries are cached per stage, keyed
+    on the input hash, the stage's parameters and its code; a re-run resumes
+    from the first stage whose key changed.
+
+    With ``muse.calibrate``, windows are scored against the participant's
+    calibration profile (``muse.calibration_dir``, default
+    ``<output_dir>/calibration``) once it holds enough windows from other
+    recordings, and the session is then folded into that profile. Re-running
+    a recording therefore scores it against the same ranges as before, unless
+    other recordings were added in between (see :func:`calibration_version`).
+    """
+    config = load_config(config_path)
     muse_cfg = config.muse
-    cleaned_df = load_clean_data(
-        csv_path,
-        hsi_threshold=float(muse_cfg.get("hsi_threshold", 2.5)),
-    )
+    csv_path = Path(csv_path)
 
-    windows_df = generate_windows(
-        cleaned_df,
-        window_size_seconds=int(muse_cfg.get("window_size_seconds", 30)),
-        step_seconds=int(muse_cfg.get("window_overlap_seconds", 15)),
-        min_coverage=float(muse_cfg.get("min_window_coverage", 0.8)),
-    )
+    if cache is None and muse_cfg.get("cache_dir"):
+        cache = StageCache(
+            Path(muse_cfg["cache_dir"]),
+            max_bytes=int(float(muse_cfg.get("cache_max_mb", 2048)) * 1024**2),
+        )
+    if segment_workers is None:
+        segment_workers = int(muse_cfg.get("segment_workers") or os.cpu_count() or 1)
+    if feature_threads is None:
+        feature_threads = int(muse_cfg.get("feature_threads") or os.cpu_count() or 1)
 
-    lri_calc = LRICalculator()
-    lri_metrics = windows_df.apply(
-        lambda row: lri_calc.calculate(row.to_dict()),
-        axis=1,
-        result_type="expand",
-    )
-    windows_df = pd.concat([windows_df, lri_metrics], axis=1)
+    output_dir = Path(output_dir)
+    participant_id = _participant_id(csv_path)
+    calibrate = bool(muse_cfg.get("calibrate", False))
+    write_dataset = bool(muse_cfg.get("write_dataset", False))
+    input_hash = file_sha256(csv_path) if cache is not None or calibrate or write_dataset else ""
+
+    load_params = _load_params(muse_cfg)
+    window_params = _window_params(muse_cfg)
+    lri_calc = LRICalculator(**muse_cfg.get("lri", {}))
+    if calibrate:
+        calibration_dir = _calibration_dir(muse_cfg, output_dir)
+        profile = load_profile(calibration_dir, participant_id)
+        lri_calc = calibrated_calculator(
+            lri_calc,
+            profile.without(input_hash),
+            min_windows=int(muse_cfg.get("calibration_min_windows", CALIBRATION_MIN_WINDOWS)),
+        )
+    analyzer = SessionAnalyzer(lri_calc, optimal_threshold=muse_cfg.get("optimal_threshold", 70))
+
+    keys = _stage_keys(input_hash, load_params, window_params, lri_calc, analyzer) if cache is not None else {}
+
+    def _stage(name: str, compute: Callable[[], Any]) -> Any:
+        return compute() if cache is None else cache.get_or_compute(name, keys[name], compute)
+
+    # Stages are evaluated lazily from the end, so a cache hit never touches the stages before it.
+    def cleaned() -> pd.DataFrame:
+        return _stage("load", lambda: _load_cleaned(csv_path, load_params))
+
+    def windowed() -> pd.DataFrame:
+        return _stage("windows", lambda: _window_segments(cleaned(), window_params, segment_workers, feature_threads))
 
-    analyzer = SessionAnalyzer(lri_calc)
-    session_summary = analyzer.analyse(windows_df)
+    windows_df = _stage("lri", lambda: _score_windows(windowed(), lri_calc, feature_threads))
+    analysis = _stage("session", lambda: _analyse_sessions(windows_df, analyzer))
+    if cache is not None:
+        logger.info("Stage cache for %s: %s", csv_path.name, cache.summary())
 
-    output_dir = ensure_directory(Path(output_dir))
-    participant_id = csv_path.stem.split("_")[-1]
+    session_summary = analysis["session"]
+    segment_summaries = analysis["segments"]
+
+    output_dir = ensure_directory(output_dir)
 
     windows_path = output_dir / f"participant_{participant_id}_windows.parquet"
     session_path = output_dir / f"participant_{participant_id}_session.json"
+    pyramid_path = output_dir / f"participant_{participant_id}_pyramid.parquet"
 
     windows_df.to_parquet(windows_path, index=False)
     session_path.write_text(json.dumps(session_summary, indent=2), encoding="utf-8")
+    build_window_pyramid(windows_df).to_parquet(pyramid_path, index=False)
 
-    logger.info("Processed Muse session written to %s", output_dir)
-
-    return {
+    outputs = {
         "windows": windows_path,
         "session": session_path,
+        "pyramid": pyramid_path,
     }
+    if len(segment_summaries) > 1:
+        for index, summary in enumerate(segment_summaries):
+            segment_path = output_dir / f"participant_{participant_id}_session_{index}.json"
+            segment_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+            outputs[f"session_{index}"] = segment_path
+
+    if calibrate and add_session(calibration_dir, participant_id, windows_df, input_hash):
+        outputs["calibration"] = profile_path(calibration_dir, participant_id)
+
+    if write_dataset:
+        dataset_root = Path(muse_cfg.get("dataset_dir") or output_dir / "dataset")
+        outputs.update(
+            write_session_dataset(
+                windows_df,
+                segment_summaries,
+                participant_id,
+                input_hash,
+                dataset_root,
+                num_windows=analysis["num_windows"],
+            )
+        )
+
+    logger.info("Processed Muse session written to %s", output_dir)
 
+    return outputs
@@ -0,0 +1,111 @@
+"""Multi-resolution aggregation pyramid over Muse windows for zoomable timelines."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline_scripts.muse.constants import PYRAMID_LEVELS_SECONDS, PYRAMID_METRICS
+
+
+def _aggregate(bucket_ns: np.ndarray, counts: np.ndarray, stats: Dict[str, Dict[str, np.ndarray]], resolution_ns: int):
+    """Merge rows (sorted by ``bucket_ns``) into buckets of ``resolution_ns``.
+
+    ``stats`` maps metric -> {"sum", "valid", "min", "max"} arrays aligned with
+    ``counts``; sums and valid counts leave out NaN values and ``fmin``/``fmax``
+    ignore them, so a NaN window does not blank the buckets above it.
+    """
+    buckets = bucket_ns // resolution_ns * resolution_ns
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+
+    merged = {
+        metric: {
+            "sum": np.add.reduceat(values["sum"], starts),
+            "valid": np.add.reduceat(values["valid"], starts),
+            "min": np.fmin.reduceat(values["min"], starts),
+            "max": np.fmax.reduceat(values["max"], starts),
+        }
+        for metric, values in stats.items()
+    }
+    return buckets[starts], np.add.reduceat(counts, starts), merged
+
+
+def build_window_pyramid(
+    windows_df: pd.DataFrame,
+    levels_seconds: Dict[str, int] = PYRAMID_LEVELS_SECONDS,
+    metrics: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Aggregate windows into every pyramid level, finest first.
+
+    The finest level buckets windows by ``window_start``; each coarser level is
+    derived from the one below (means over valid values, min of mins, max of maxes),
+    so levels must be listed fine to coarse and divide each other evenly.
+    Returns one row per (level, bucket) with ``<metric>_mean/_min/_max`` columns,
+    NaN only when every window in the bucket is NaN for that metric.
+    """
+    metrics = [m for m in (metrics or PYRAMID_METRICS) if m in windows_df.columns]
+    if windows_df.empty or not metrics:
+        raise ValueError("Cannot build a pyramid without windows and LRI metrics.")
+
+    ordered = windows_df.sort_values("window_start", kind="stable")
+    bucket_ns = ordered["window_start"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    counts = np.ones(len(ordered), dtype=np.int64)
+    stats = {}
+    for metric in metrics:
+        values = ordered[metric].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        stats[metric] = {
+            "sum": np.where(valid, values, 0.0),
+            "valid": valid.astype(np.int64),
+            "min": values,
+            "max": values,
+        }
+
+    frames: List[pd.DataFrame] = []
+    previous_resolution: Optional[int] = None
+    for level, resolution in levels_seconds.items():
+        if previous_resolution and resolution % previous_resolution:
+            raise ValueError(f"Pyramid level {level} ({resolution}s) is not a multiple of {previous_resolution}s.")
+        bucket_ns, counts, stats = _aggregate(bucket_ns, counts, stats, int(resolution * 1e9))
+        previous_resolution = resolution
+
+        frame = {
+            "level": level,
+            "resolution_seconds": resolution,
+            "bucket_start": bucket_ns.view("datetime64[ns]"),
+            "window_count": counts,
+        }
+        for metric, values in stats.items():
+            frame[f"{metric}_mean"] = np.divide(
+                values["sum"], values["valid"], out=np.full(len(counts), np.nan), where=values["valid"] > 0
+            )
+            frame[f"{metric}_min"] = values["min"]
+            frame[f"{metric}_max"] = values["max"]
+        frames.append(pd.DataFrame(frame))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def select_pyramid_level(
+    pyramid_df: pd.DataFrame,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    max_points: int = 200,
+) -> pd.DataFrame:
+    """Return the finest level's buckets in ``[start, end)`` that fit in ``max_points``.
+
+    Falls back to the coarsest level when none fit.
+    """
+    in_range = pd.Series(True, index=pyramid_df.index)
+    if start is not None:
+        in_range &= pyramid_df["bucket_start"] >= pd.Timestamp(start)
+    if end is not None:
+        in_range &= pyramid_df["bucket_start"] < pd.Timestamp(end)
+    subset = pyramid_df.loc[in_range]
+
+    resolutions = sorted(pyramid_df["resolution_seconds"].unique())
+    points = subset.groupby("resolution_seconds").size()
+    chosen = next((r for r in resolutions if points.get(r, 0) <= max_points), resolutions[-1])
+    return subset.loc[subset["resolution_seconds"] == chosen].reset_index(drop=True)
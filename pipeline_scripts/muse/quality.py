@@ -0,0 +1,169 @@
+"""Per-channel quality masking for cleaned Muse band-power data."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline_scripts.utils import get_logger
+from pipeline_scripts.muse.constants import (
+    BAND_PREFIXES,
+    CHANNELS,
+    DEFAULT_HSI_THRESHOLD,
+    ELEMENTS_COLUMN,
+    JUMP_MIN_SAMPLES,
+    JUMP_MIN_STD,
+    JUMP_SLOT_SECONDS,
+    JUMP_WINDOW_SECONDS,
+    JUMP_Z_THRESHOLD,
+    MARKER_ARTIFACTS,
+)
+
+logger = get_logger(__name__)
+
+
+def _near_markers(ns: np.ndarray, marker_ns: np.ndarray, pad_ns: int) -> np.ndarray:
+    """Mask of samples within ``pad_ns`` of any (sorted) marker time."""
+    pos = np.searchsorted(marker_ns, ns)
+    before = marker_ns[np.clip(pos - 1, 0, marker_ns.size - 1)]
+    after = marker_ns[np.clip(pos, 0, marker_ns.size - 1)]
+    return (np.abs(ns - before) <= pad_ns) | (np.abs(after - ns) <= pad_ns)
+
+
+def _jump_flags(
+    power: np.ndarray,
+    valid: np.ndarray,
+    slot: np.ndarray,
+    run_starts: np.ndarray,
+    window_slots: int,
+    z_threshold: float,
+) -> np.ndarray:
+    """Flag samples in slots whose mean power is a ``z_threshold``-sigma outlier.
+
+    ``slot`` bins samples into ``JUMP_SLOT_SECONDS`` slots (each occupied slot is
+    the contiguous run starting at ``run_starts``); each slot is compared with
+    the valid samples of the ``window_slots`` slots before it. Band powers only
+    update every ~0.1 s, so slot resolution loses nothing over per-sample tests.
+    """
+    filled = np.where(valid, power, 0.0)
+    occupied = slot[run_starts]
+    per_slot = np.zeros((3, int(slot[-1]) + 2))
+    per_slot[0, occupied + 1] = np.add.reduceat(filled, run_starts)
+    per_slot[1, occupied + 1] = np.add.reduceat(filled * filled, run_starts)
+    per_slot[2, occupied + 1] = np.add.reduceat(valid.view(np.int8), run_starts, dtype=np.int64)
+
+    # Row k of ``prefix`` sums slots [0, k); slot k's window is [k - window_slots, k).
+    prefix = np.cumsum(per_slot, axis=1)
+    starts = np.maximum(np.arange(prefix.shape[1] - 1) - window_slots, 0)
+    total, total_sq, count = prefix[:, :-1] - prefix[:, starts]
+    slot_total, _, slot_count = per_slot[:, 1:]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        variance = np.maximum((total_sq - total * mean) / (count - 1), JUMP_MIN_STD**2)
+        deviation = slot_total / slot_count - mean
+        flagged = (count >= JUMP_MIN_SAMPLES) & (deviation * deviation > z_threshold**2 * variance)
+    return valid & flagged[slot]
+
+
+def _marker_times(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    if ELEMENTS_COLUMN not in df.columns:
+        return {}
+    markers = df[ELEMENTS_COLUMN].dropna()
+    if markers.empty:
+        return {}
+    marker_ns = markers.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    labels = markers.astype(str)
+    return {name: marker_ns[labels.str.contains(name, regex=False).to_numpy()] for name in MARKER_ARTIFACTS}
+
+
+def channel_validity(
+    df: pd.DataFrame,
+    hsi_threshold: float = DEFAULT_HSI_THRESHOLD,
+    jump_z_threshold: Optional[float] = JUMP_Z_THRESHOLD,
+) -> Dict[str, np.ndarray]:
+    """Boolean validity mask per channel for a time-sorted, timestamp-indexed frame.
+
+    A channel sample is invalid when its band powers are missing or all zero
+    (marker rows, headset warm-up), its HSI exceeds ``hsi_threshold``, it lies
+    near a blink/jaw-clench marker in the Elements column, or its total band
+    power jumps by more than ``jump_z_threshold`` sigma against the trailing
+    ``JUMP_WINDOW_SECONDS`` (``None``/0 disables jump detection).
+    """
+    ns = df.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    near_marker = {
+        name: _near_markers(ns, marker_ns, int(MARKER_ARTIFACTS[name][1] * 1e9))
+        for name, marker_ns in _marker_times(df).items()
+        if marker_ns.size
+    }
+    if jump_z_threshold:
+        slot = (ns - ns[0]) // int(JUMP_SLOT_SECONDS * 1e9)
+        run_starts = np.flatnonzero(np.concatenate(([True], slot[1:] != slot[:-1])))
+        window_slots = int(round(JUMP_WINDOW_SECONDS / JUMP_SLOT_SECONDS))
+
+    validity: Dict[str, np.ndarray] = {}
+    for ch in CHANNELS:
+        cols = [f"{band}_{ch}" for band in BAND_PREFIXES if f"{band}_{ch}" in df.columns]
+        if not cols:
+            continue
+        # Column by column, so no band block is copied; a missing band leaves NaN power.
+        power = np.zeros(len(df))
+        for col in cols:
+            power += df[col].to_numpy()
+        valid = np.isfinite(power) & (power != 0)
+
+        hsi_col = f"hsi_{ch}"
+        if hsi_col in df.columns:
+            valid &= df[hsi_col].to_numpy() <= hsi_threshold
+
+        for name, near in near_marker.items():
+            if ch in MARKER_ARTIFACTS[name][0]:
+                valid &= ~near
+
+        if jump_z_threshold:
+            valid &= ~_jump_flags(power, valid, slot, run_starts, window_slots, jump_z_threshold)
+
+        validity[ch] = valid
+    return validity
+
+
+def apply_quality_mask(
+    df: pd.DataFrame,
+    hsi_threshold: float = DEFAULT_HSI_THRESHOLD,
+    jump_z_threshold: Optional[float] = JUMP_Z_THRESHOLD,
+) -> pd.DataFrame:
+    """Blank invalid channel samples to NaN and drop rows with no valid channel.
+
+    Window means then average each channel over its own valid samples instead
+    of discarding whole rows when a single channel is bad.
+    """
+    if df.empty:
+        return df
+    validity = channel_validity(df, hsi_threshold, jump_z_threshold)
+    if not validity:
+        return df
+
+    masks = np.column_stack(list(validity.values()))
+    keep = masks.any(axis=1)
+    # take() rather than .loc[keep]: a fresh frame, so blanking below is not a chained assignment
+    cleaned = df if keep.all() else df.take(np.flatnonzero(keep))
+    masks = masks[keep]
+
+    blanked: List[str] = []
+    for ch, valid in zip(validity, masks.T):
+        if valid.all():
+            continue
+        if cleaned is df:
+            cleaned = df.copy()
+        cols = [f"{band}_{ch}" for band in BAND_PREFIXES if f"{band}_{ch}" in cleaned.columns]
+        cleaned.loc[~valid, cols] = np.nan
+        blanked.append(ch)
+
+    if blanked:
+        logger.info(
+            "Quality mask: dropped %s rows, blanked samples on %s",
+            len(df) - len(cleaned),
+            ", ".join(f"{ch} ({int((~validity[ch][keep]).sum())})" for ch in blanked),
+        )
+    return cleaned
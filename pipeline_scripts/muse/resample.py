@@ -0,0 +1,152 @@
+"""Snap cleaned Muse samples onto a uniform time grid."""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline_scripts.utils import run_blocks
+from pipeline_scripts.muse.constants import GRID_INTERVAL_CANDIDATES_SECONDS, MIN_GRID_INTERVAL_SECONDS
+
+
+@dataclass
+class UniformGrid:
+    """Per-slot aggregates of samples binned at ``interval_ns`` from ``origin_ns``.
+
+    Slots keep sums and non-NaN counts per column rather than resampled values,
+    so any run of slots reproduces the exact sample mean of its columns.
+    ``moments`` optionally adds ``sum_sq`` (x²), ``sum_t``/``sum_tt`` (t, t² over
+    non-NaN samples) and ``sum_tx`` (t·x), with t in seconds since ``origin_ns``,
+    enough for exact per-window variance and least-squares slope.
+    """
+
+    origin_ns: int
+    interval_ns: int
+    columns: List[str]
+    sums: np.ndarray  # (n_slots, n_columns) float64, NaN samples excluded
+    counts: np.ndarray  # (n_slots, n_columns) int64 non-NaN samples
+    rows: np.ndarray  # (n_slots,) int64 samples of any kind
+    first_ns: np.ndarray  # (n_slots,) earliest sample timestamp, int64 max when empty
+    last_ns: np.ndarray  # (n_slots,) latest sample timestamp, int64 min when empty
+    moments: Dict[str, np.ndarray] = field(default_factory=dict)  # (n_slots, n_columns) float64 each
+
+    @property
+    def n_slots(self) -> int:
+        return int(self.rows.size)
+
+    @property
+    def coverage(self) -> np.ndarray:
+        """Boolean mask of slots holding at least one sample."""
+        return self.rows > 0
+
+
+def infer_grid_interval(
+    index: pd.DatetimeIndex,
+    window_size_seconds: float,
+    step_seconds: float,
+    min_interval_seconds: float = MIN_GRID_INTERVAL_SECONDS,
+) -> float:
+    """Pick a grid interval that divides both window size and step.
+
+    Uses the smallest candidate no finer than the recording's median positive
+    sample spacing (and ``min_interval_seconds``) so every slot can be filled.
+    """
+    ns = index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    diffs = np.diff(ns)
+    positive = diffs[diffs > 0]
+    spacing = float(np.median(positive)) / 1e9 if positive.size else min_interval_seconds
+    target = max(spacing, min_interval_seconds)
+
+    def _divides(interval: float) -> bool:
+        return all(
+            math.isclose(length / interval, round(length / interval), abs_tol=1e-9)
+            for length in (window_size_seconds, step_seconds)
+        )
+
+    candidates = [c for c in GRID_INTERVAL_CANDIDATES_SECONDS if _divides(c)]
+    return next((c for c in candidates if c >= target), candidates[-1] if candidates else float(step_seconds))
+
+
+def resample_to_grid(
+    df: pd.DataFrame,
+    interval_seconds: float,
+    columns: Optional[List[str]] = None,
+    moments: bool = False,
+    threads: Optional[int] = 1,
+) -> UniformGrid:
+    """Bin a time-indexed frame (sorted) into uniform slots starting at its first timestamp.
+
+    Columns are reduced independently, on ``threads`` threads (None/0 = every
+    core), each writing its own column of the preallocated outputs.
+    """
+    if df.empty:
+        raise ValueError("Cannot resample empty dataframe.")
+
+    columns = list(columns if columns is not None else df.columns)
+    ns = df.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    interval_ns = int(round(interval_seconds * 1e9))
+    slot = (ns - ns[0]) // interval_ns
+    n_slots = int(slot[-1]) + 1
+
+    # Samples are time-sorted, so each occupied slot is one contiguous run.
+    run_starts = np.flatnonzero(np.concatenate(([True], slot[1:] != slot[:-1])))
+    run_ends = np.append(run_starts[1:], slot.size)
+    occupied = slot[run_starts]
+
+    # Column-major, so each per-column reduction below reads contiguous memory.
+    values = np.asfortranarray(df[columns].to_numpy(dtype=np.float64))
+
+    sums = np.zeros((n_slots, len(columns)))
+    counts = np.zeros((n_slots, len(columns)), dtype=np.int64)
+    rows = np.zeros(n_slots, dtype=np.int64)
+    first_ns = np.full(n_slots, np.iinfo(np.int64).max)
+    last_ns = np.full(n_slots, np.iinfo(np.int64).min)
+    extra: Dict[str, np.ndarray] = (
+        {name: np.zeros((n_slots, len(columns))) for name in ("sum_sq", "sum_t", "sum_tt", "sum_tx")} if moments else {}
+    )
+
+    rows[occupied] = run_ends - run_starts
+    first_ns[occupied] = ns[run_starts]
+    last_ns[occupied] = ns[run_ends - 1]
+    if moments:
+        t = (ns - ns[0]) / 1e9
+        shared_t = np.add.reduceat(t, run_starts)
+        shared_tt = np.add.reduceat(t * t, run_starts)
+
+    def _column(j: int, _: int) -> None:
+        column = values[:, j]
+        valid = ~np.isnan(column)
+        # Without NaNs the column shares the slot's row count and time moments.
+        all_valid = bool(valid.all())
+        filled = column if all_valid else np.where(valid, column, 0.0)
+
+        sums[occupied, j] = np.add.reduceat(filled, run_starts)
+        counts[occupied, j] = rows[occupied] if all_valid else np.add.reduceat(valid.astype(np.int64), run_starts)
+        if moments:
+            extra["sum_sq"][occupied, j] = np.add.reduceat(filled * filled, run_starts)
+            extra["sum_tx"][occupied, j] = np.add.reduceat(filled * t, run_starts)
+            if all_valid:
+                extra["sum_t"][occupied, j] = shared_t
+                extra["sum_tt"][occupied, j] = shared_tt
+            else:
+                t_valid = np.where(valid, t, 0.0)
+                extra["sum_t"][occupied, j] = np.add.reduceat(t_valid, run_starts)
+                extra["sum_tt"][occupied, j] = np.add.reduceat(t_valid * t, run_starts)
+
+    run_blocks(len(columns), 1, _column, threads=threads)
+
+    return UniformGrid(
+        origin_ns=int(ns[0]),
+        interval_ns=interval_ns,
+        columns=columns,
+        sums=sums,
+        counts=counts,
+        rows=rows,
+        first_ns=first_ns,
+        last_ns=last_ns,
+        moments=extra,
+    )
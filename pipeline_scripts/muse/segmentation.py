@@ -0,0 +1,45 @@
+"""Split a cleaned Muse recording into independent sessions at long gaps."""
+
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from pipeline_scripts.utils import get_logger
+from pipeline_scripts.muse.constants import SESSION_GAP_SECONDS, WINDOW_SIZE_SECONDS
+
+logger = get_logger(__name__)
+
+
+def split_sessions(
+    df: pd.DataFrame,
+    gap_seconds: float = SESSION_GAP_SECONDS,
+    min_duration_seconds: float = WINDOW_SIZE_SECONDS,
+) -> List[pd.DataFrame]:
+    """Return time-ordered segments of ``df`` separated by gaps longer than ``gap_seconds``.
+
+    Segments shorter than ``min_duration_seconds`` (too short for a single
+    window) are dropped. Each segment is a positional slice of ``df``.
+    """
+    if df.empty:
+        raise ValueError("Cannot segment empty dataframe.")
+
+    ns = df.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    breaks = np.flatnonzero(np.diff(ns) > int(gap_seconds * 1e9)) + 1
+    bounds = np.concatenate(([0], breaks, [len(df)]))
+
+    segments: List[pd.DataFrame] = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        duration = (ns[end - 1] - ns[start]) / 1e9
+        if duration < min_duration_seconds:
+            logger.info("Dropping %.1fs segment starting %s (shorter than one window)", duration, df.index[start])
+            continue
+        segments.append(df.iloc[start:end])
+
+    if not segments:
+        raise ValueError("No segment long enough for a window after gap-based segmentation.")
+
+    logger.info("Split recording into %s session segment(s)", len(segments))
+    return segments
@@ -2,15 +2,126 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from pipeline_scripts.muse.constants import LRI_HISTOGRAM_BIN_WIDTH
 from pipeline_scripts.muse.lri import LRICalculator
 
+COMPONENTS = ("alertness", "focus", "arousal_balance")
+_HISTOGRAM_BINS = int(round(100 / LRI_HISTOGRAM_BIN_WIDTH))
+
+
+@dataclass
+class LRIAccumulator:
+    """Constant-memory running summary of scored windows, mergeable across chunks and segments.
+
+    - mean/variance: Welford's update, applied per chunk with Chan et al.'s
+      pairwise combination, so merge order does not matter;
+    - median: counts in ``LRI_HISTOGRAM_BIN_WIDTH`` bins over [0, 100];
+      each order statistic is taken at its bin centre, so the median is within
+      ``LRI_HISTOGRAM_BIN_WIDTH / 2`` of the exact value;
+    - peak: highest LRI and its window start (earliest on ties, as ``idxmax``);
+    - span, windows at or above ``optimal_threshold`` and component sums.
+
+    ``count`` is the windows with an LRI; ``window_count`` includes unscorable
+    (NaN) windows, which the optimal share is taken over, as in the batch summary.
+
+    Library-only: the pipeline holds every window of a recording in memory and
+    uses the exact ``SessionAnalyzer.analyse``. This is for callers that score
+    windows as they arrive and cannot keep them.
+    """
+
+    optimal_threshold: float = 70
+    window_count: int = 0
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    histogram: np.ndarray = field(default_factory=lambda: np.zeros(_HISTOGRAM_BINS, dtype=np.int64))
+    peak_lri: float = -np.inf
+    peak_timestamp: Optional[pd.Timestamp] = None
+    session_start: Optional[pd.Timestamp] = None
+    session_end: Optional[pd.Timestamp] = None
+    optimal_count: int = 0
+    component_sums: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(COMPONENTS, 0.0))
+    component_counts: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(COMPONENTS, 0))
+
+    def update(self, windows_df: pd.DataFrame) -> None:
+        """Fold in a chunk of scored windows (``window_start``, ``window_end``, ``lri``, components)."""
+        if windows_df.empty:
+            return
+        chunk = LRIAccumulator(self.optimal_threshold)
+        lri = windows_df["lri"].to_numpy(dtype=float)
+        valid = ~np.isnan(lri)
+        values = lri[valid]
+
+        chunk.window_count = len(windows_df)
+        chunk.session_start = windows_df["window_start"].min()
+        chunk.session_end = windows_df["window_end"].max()
+        if values.size:
+            chunk.count = int(values.size)
+            chunk.mean = float(values.mean())
+            chunk.m2 = float(np.sum((values - chunk.mean) ** 2))
+            bins = np.clip((values / LRI_HISTOGRAM_BIN_WIDTH).astype(np.int64), 0, _HISTOGRAM_BINS - 1)
+            chunk.histogram = np.bincount(bins, minlength=_HISTOGRAM_BINS)
+            chunk.optimal_count = int(np.count_nonzero(values >= self.optimal_threshold))
+
+            peak = int(np.nanargmax(lri))
+            chunk.peak_lri = float(lri[peak])
+            chunk.peak_timestamp = windows_df["window_start"].iloc[peak]
+        for name in COMPONENTS:
+            if name in windows_df.columns:
+                component = windows_df[name].to_numpy(dtype=float)
+                component = component[~np.isnan(component)]
+                chunk.component_sums[name] = float(component.sum())
+                chunk.component_counts[name] = int(component.size)
+
+        self.merge(chunk)
+
+    def merge(self, other: "LRIAccumulator") -> None:
+        """Combine another accumulator into this one (associative and commutative up to rounding)."""
+        total = self.count + other.count
+        if total:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.window_count += other.window_count
+        self.histogram = self.histogram + other.histogram
+        self.optimal_count += other.optimal_count
+
+        if other.peak_timestamp is not None and (
+            self.peak_timestamp is None
+            or other.peak_lri > self.peak_lri
+            or (other.peak_lri == self.peak_lri and other.peak_timestamp < self.peak_timestamp)
+        ):
+            self.peak_lri, self.peak_timestamp = other.peak_lri, other.peak_timestamp
+        if other.session_start is not None:
+            if self.session_start is None:
+                self.session_start, self.session_end = other.session_start, other.session_end
+            else:
+                self.session_start = min(self.session_start, other.session_start)
+                self.session_end = max(self.session_end, other.session_end)
+        for name in COMPONENTS:
+            self.component_sums[name] += other.component_sums[name]
+            self.component_counts[name] += other.component_counts[name]
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (ddof=0), as in the batch summary."""
+        return float(np.sqrt(self.m2 / self.count)) if self.count else float("nan")
+
+    @property
+    def median(self) -> float:
+        if not self.count:
+            return float("nan")
+        cumulative = np.cumsum(self.histogram)
+        middle = np.searchsorted(cumulative, [(self.count - 1) // 2, self.count // 2], side="right")
+        return float(np.mean((middle + 0.5) * LRI_HISTOGRAM_BIN_WIDTH))
+
 
 @dataclass
 class SessionAnalyzer:
@@ -29,6 +140,39 @@ class SessionAnalyzer:
         summary["recommendations"] = self._generate_recommendations(summary)
         return summary
 
+    def accumulator(self) -> LRIAccumulator:
+        """Empty running summary for streaming mode; feed chunks with ``update`` and ``merge``."""
+        return LRIAccumulator(optimal_threshold=self.optimal_threshold)
+
+    def summarise(self, accumulator: LRIAccumulator) -> Dict:
+        """The ``_compute_summary`` fields plus ``component_scores`` from a running summary.
+
+        Matches the batch summary except ``median_lri``, which is within
+        ``LRI_HISTOGRAM_BIN_WIDTH / 2`` (see ``LRIAccumulator``).
+        """
+        if not accumulator.count:
+            raise ValueError("Cannot summarise an empty accumulator.")
+        duration_minutes = (accumulator.session_end - accumulator.session_start).total_seconds() / 60.0
+        optimal_percentage = 100 * accumulator.optimal_count / accumulator.window_count
+
+        return {
+            "session_start": accumulator.session_start.isoformat(),
+            "session_end": accumulator.session_end.isoformat(),
+            "session_duration_minutes": round(duration_minutes, 2),
+            "peak_lri": accumulator.peak_lri,
+            "peak_timestamp": accumulator.peak_timestamp.isoformat(),
+            "avg_lri": accumulator.mean,
+            "median_lri": accumulator.median,
+            "std_dev": accumulator.std,
+            "session_score": float(self._score(accumulator.mean, optimal_percentage)),
+            "component_scores": {
+                name: accumulator.component_sums[name] / accumulator.component_counts[name]
+                if accumulator.component_counts[name]
+                else float("nan")
+                for name in COMPONENTS
+            },
+        }
+
     def _compute_summary(self, windows_df: pd.DataFrame) -> Dict:
         session_start = windows_df["window_start"].iloc[0]
         session_end = windows_df["window_end"].iloc[-1]
@@ -50,42 +194,33 @@ class SessionAnalyzer:
         }
 
     def _find_optimal_windows(self, windows_df: pd.DataFrame) -> List[Dict]:
-        optimal_windows: List[Dict] = []
-        current_window: Optional[Dict] = None
-
-        for _, row in windows_df.iterrows():
-            if row["lri"] >= self.optimal_threshold:
-                if current_window is None:
-                    current_window = {
-                        "start": row["window_start"],
-                        "samples": [row],
-                    }
-                else:
-                    current_window["samples"].append(row)
-            else:
-                if current_window:
-                    optimal_windows.append(self._close_window(current_window))
-                    current_window = None
-
-        if current_window:
-            optimal_windows.append(self._close_window(current_window))
-
-        return optimal_windows
-
-    def _close_window(self, window: Dict) -> Dict:
-        samples = window["samples"]
-        start_time = samples[0]["window_start"]
-        end_time = samples[-1]["window_end"]
+        lri = windows_df["lri"].to_numpy(dtype=float)
+        starts, ends = _run_bounds(lri >= self.optimal_threshold)
+        if starts.size == 0:
+            return []
+
+        # Per-run LRI sums from one reduceat over [start, end) boundary pairs.
+        bounds = np.column_stack([starts, ends]).ravel()
+        run_sums = np.add.reduceat(np.append(lri, 0.0), bounds)[::2]
+        run_means = run_sums / (ends - starts)
+
+        start_times = windows_df["window_start"].iloc[starts]
+        end_times = windows_df["window_end"].iloc[ends - 1]
+        return [
+            self._close_window(start_time, end_time, avg_lri)
+            for start_time, end_time, avg_lri in zip(start_times, end_times, run_means)
+        ]
+
+    def _close_window(self, start_time: pd.Timestamp, end_time: pd.Timestamp, avg_lri: float) -> Dict:
         # Use actual timestamps to compute duration to avoid double-counting overlap
         duration_minutes = (end_time - start_time).total_seconds() / 60.0
-        avg_lri = np.mean([row["lri"] for row in samples])
         quality = self._classify_quality(avg_lri)
 
         return {
             "start": start_time.isoformat(),
             "end": end_time.isoformat(),
             "duration_minutes": round(duration_minutes, 2),
-            "avg_lri": round(avg_lri, 2),
+            "avg_lri": round(float(avg_lri), 2),
             "quality": quality,
         }
 
@@ -104,37 +239,16 @@ class SessionAnalyzer:
         Compute time in state using union of window intervals per state.
         This avoids double-counting due to window overlap.
         """
-        def _intervals_for_mask(mask: pd.Series) -> List:
-            rows = windows_df.loc[mask, ["window_start", "window_end"]].itertuples(index=False)
-            return [(r.window_start, r.window_end) for r in rows]
-
-        def _sum_union_minutes(intervals: List) -> float:
-            if not intervals:
-                return 0.0
-            # Sort by start time
-            intervals = sorted(intervals, key=lambda iv: iv[0])
-            merged = []
-            cur_start, cur_end = intervals[0]
-            for start, end in intervals[1:]:
-                if start <= cur_end:
-                    # Overlapping; extend
-                    if end > cur_end:
-                        cur_end = end
-                else:
-                    merged.append((cur_start, cur_end))
-                    cur_start, cur_end = start, end
-            merged.append((cur_start, cur_end))
-            total_seconds = sum((end - start).total_seconds() for start, end in merged)
-            return total_seconds / 60.0
-
-        lri = windows_df["lri"]
-        optimal_intervals = _intervals_for_mask(lri >= 70)
-        moderate_intervals = _intervals_for_mask((lri >= 40) & (lri < 70))
-        low_intervals = _intervals_for_mask(lri < 40)
-
-        optimal_minutes = _sum_union_minutes(optimal_intervals)
-        moderate_minutes = _sum_union_minutes(moderate_intervals)
-        low_minutes = _sum_union_minutes(low_intervals)
+        lri = windows_df["lri"].to_numpy(dtype=float)
+        starts = _as_nanoseconds(windows_df["window_start"])
+        ends = _as_nanoseconds(windows_df["window_end"])
+
+        def _union_minutes(mask: np.ndarray) -> float:
+            return _sum_union_nanoseconds(starts[mask], ends[mask]) / 1e9 / 60.0
+
+        optimal_minutes = _union_minutes(lri >= 70)
+        moderate_minutes = _union_minutes((lri >= 40) & (lri < 70))
+        low_minutes = _union_minutes(lri < 40)
 
         return {
             "optimal_minutes": round(optimal_minutes, 2),
@@ -154,7 +268,10 @@ class SessionAnalyzer:
         optimal_percentage = float(
             100 * (windows_df["lri"] >= self.optimal_threshold).mean()
         )
+        return self._score(avg_lri, optimal_percentage)
 
+    @staticmethod
+    def _score(avg_lri: float, optimal_percentage: float) -> float:
         # Sleep/post-exercise bonuses not applied in standalone pipeline.
         return round(
             0.40 * avg_lri + 0.30 * optimal_percentage,
@@ -194,3 +311,27 @@ class SessionAnalyzer:
 
         return recs
 
+
+# backend/session_analytics.py keeps its own copy of _run_bounds and the interval
+# union (the backend does not import pipeline_scripts); keep the two in sync.
+def _run_bounds(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(starts, ends)`` of the runs of True in ``mask`` (ends exclusive)."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _as_nanoseconds(timestamps: pd.Series) -> np.ndarray:
+    return timestamps.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _sum_union_nanoseconds(starts: np.ndarray, ends: np.ndarray) -> int:
+    """Total length covered by the union of ``[start, end]`` intervals."""
+    if starts.size == 0:
+        return 0
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    reach = np.maximum.accumulate(ends[order])
+    # An interval opens a new merged block when it starts after everything before it has ended.
+    block_starts = np.flatnonzero(np.concatenate(([True], starts[1:] > reach[:-1])))
+    block_ends = np.append(block_starts[1:], starts.size) - 1
+    return int(np.sum(reach[block_ends] - starts[block_starts]))
@@ -0,0 +1,142 @@
+"""Band-power estimation from raw Muse EEG samples (Welch's method)."""
+
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from pipeline_scripts.utils import get_logger
+from pipeline_scripts.muse.constants import (
+    BAND_PREFIXES,
+    CHANNELS,
+    FREQUENCY_BANDS_HZ,
+    RAW_SAMPLING_RATE_HZ,
+    SPECTRAL_OUTPUT_INTERVAL_SECONDS,
+    SPECTRAL_SEGMENT_SECONDS,
+    SPECTRAL_WELCH_SECONDS,
+)
+
+logger = get_logger(__name__)
+
+# Segments transformed per FFT batch; bounds the complex spectrum buffer to ~10 MB per channel.
+_FFT_BLOCK_SEGMENTS = 8192
+
+
+def _band_matrix(
+    segment_samples: int,
+    sampling_rate_hz: float,
+    window: np.ndarray,
+    bands: Dict[str, Tuple[float, float]],
+) -> np.ndarray:
+    """Return an ``(n_freqs, n_bands)`` matrix mapping |FFT|^2 to summed one-sided PSD per band."""
+    freqs = np.fft.rfftfreq(segment_samples, d=1.0 / sampling_rate_hz)
+
+    # One-sided PSD density scaling (as scipy.signal.welch with scaling="density").
+    scale = np.full(freqs.shape, 2.0 / (sampling_rate_hz * np.sum(window**2)))
+    scale[0] /= 2.0
+    if segment_samples % 2 == 0:
+        scale[-1] /= 2.0
+
+    matrix = np.zeros((freqs.size, len(bands)))
+    for j, (low, high) in enumerate(bands.values()):
+        in_band = (freqs >= low) & (freqs < high)
+        matrix[in_band, j] = scale[in_band]
+    return matrix
+
+
+def welch_band_powers(
+    samples: np.ndarray,
+    sampling_rate_hz: float = RAW_SAMPLING_RATE_HZ,
+    segment_seconds: float = SPECTRAL_SEGMENT_SECONDS,
+    welch_seconds: float = SPECTRAL_WELCH_SECONDS,
+    output_interval_seconds: float = SPECTRAL_OUTPUT_INTERVAL_SECONDS,
+    bands: Dict[str, Tuple[float, float]] = FREQUENCY_BANDS_HZ,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute log10 absolute band powers for every channel and output frame.
+
+    ``samples`` is ``(n_samples, n_channels)``. All channels' Hann-windowed,
+    50%-overlapping segments are taken as one strided view and transformed in
+    batched ``rfft`` calls; each output frame is the Welch average of the
+    segments covering ``welch_seconds`` and frames advance by
+    ``output_interval_seconds``. Following the Muse convention, a band's
+    absolute power is ``log10`` of the PSD summed over its frequency bins.
+
+    Returns ``(powers, frame_starts)``: powers has shape
+    ``(n_frames, n_bands, n_channels)`` and ``frame_starts`` holds the sample
+    index at which each frame begins.
+    """
+    segment_samples = int(round(segment_seconds * sampling_rate_hz))
+    segment_step = max(segment_samples // 2, 1)
+    segments_per_frame = max(int(round((welch_seconds * sampling_rate_hz - segment_samples) / segment_step)) + 1, 1)
+    frame_step = max(int(round(output_interval_seconds * sampling_rate_hz / segment_step)), 1)
+
+    signal = np.ascontiguousarray(np.asarray(samples, dtype=np.float32).T)
+    n_channels, n_samples = signal.shape
+    if n_samples < segment_samples:
+        raise ValueError("Not enough raw samples for a single spectral segment.")
+
+    # (channels, segments, segment_samples) view over the signal; no data is copied here.
+    segments = sliding_window_view(signal, segment_samples, axis=-1)[:, ::segment_step]
+    n_segments = segments.shape[1]
+    if n_segments < segments_per_frame:
+        raise ValueError("Not enough raw samples for a single Welch frame.")
+
+    window = np.hanning(segment_samples + 2)[1:-1].astype(np.float32)
+    band_matrix = _band_matrix(segment_samples, sampling_rate_hz, window, bands)
+
+    segment_power = np.empty((n_channels, n_segments, len(bands)))
+    for start in range(0, n_segments, _FFT_BLOCK_SEGMENTS):
+        block = segments[:, start : start + _FFT_BLOCK_SEGMENTS]
+        block = (block - block.mean(axis=-1, keepdims=True)) * window
+        spectrum = np.fft.rfft(block, axis=-1)
+        periodogram = spectrum.real**2 + spectrum.imag**2
+        segment_power[:, start : start + block.shape[1]] = periodogram @ band_matrix
+
+    # Welch average over each frame's segments via a running sum along the segment axis.
+    cumulative = np.zeros((n_channels, n_segments + 1, len(bands)))
+    np.cumsum(segment_power, axis=1, out=cumulative[:, 1:])
+    first_segments = np.arange(0, n_segments - segments_per_frame + 1, frame_step)
+    frame_power = (
+        cumulative[:, first_segments + segments_per_frame] - cumulative[:, first_segments]
+    ) / segments_per_frame
+
+    powers = np.log10(np.maximum(frame_power, np.finfo(np.float64).tiny))
+    return powers.transpose(1, 2, 0), first_segments * segment_step
+
+
+def compute_band_power_frame(
+    raw_df: pd.DataFrame,
+    sampling_rate_hz: float = RAW_SAMPLING_RATE_HZ,
+    segment_seconds: float = SPECTRAL_SEGMENT_SECONDS,
+    welch_seconds: float = SPECTRAL_WELCH_SECONDS,
+    output_interval_seconds: float = SPECTRAL_OUTPUT_INTERVAL_SECONDS,
+) -> pd.DataFrame:
+    """Turn raw EEG (``raw_<channel>`` columns) into band-power rows like Mind Monitor's.
+
+    The result is indexed by frame start time and carries the lower-case
+    ``BAND_COLUMNS`` (``delta_tp9`` ... ``gamma_tp10``), so it can be handed to
+    ``generate_windows`` exactly like a cleaned Mind Monitor export.
+    """
+    channels = [ch for ch in CHANNELS if f"raw_{ch}" in raw_df.columns]
+    if not channels:
+        raise ValueError("No raw EEG columns detected in data frame.")
+
+    powers, frame_starts = welch_band_powers(
+        raw_df[[f"raw_{ch}" for ch in channels]].to_numpy(),
+        sampling_rate_hz=sampling_rate_hz,
+        segment_seconds=segment_seconds,
+        welch_seconds=welch_seconds,
+        output_interval_seconds=output_interval_seconds,
+    )
+
+    columns = [f"{band}_{ch}" for band in BAND_PREFIXES for ch in channels]
+    band_df = pd.DataFrame(
+        powers.reshape(len(frame_starts), -1).astype(np.float32),
+        index=raw_df.index[frame_starts],
+        columns=columns,
+    )
+    logger.info("Computed %s band-power frames from %s raw samples", len(band_df), len(raw_df))
+    return band_df
@@ -2,42 +2,31 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
-from typing import Dict, Iterable, List, Optional
+from typing import Optional
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
-from pipeline_scripts.utils import get_logger
+from pipeline_scripts.utils import get_logger, run_blocks
 from pipeline_scripts.muse.constants import (
     BAND_COLUMNS_LOWER,
     WINDOW_SIZE_SECONDS,
     WINDOW_STEP_SECONDS,
     MIN_WINDOW_COVERAGE,
-    EXPECTED_SAMPLE_INTERVAL_SECONDS,
+    FEATURE_BLOCK_WINDOWS,
 )
-from pipeline_scripts.muse.features import compute_window_features
+from pipeline_scripts.muse.features import window_feature_names, write_window_features
+from pipeline_scripts.muse.resample import infer_grid_interval, resample_to_grid
 
 logger = get_logger(__name__)
 
 
-def infer_sampling_interval(df: pd.DataFrame) -> float:
-    diffs = df.index.to_series().diff().dropna().dt.total_seconds()
-    if diffs.empty:
-        return EXPECTED_SAMPLE_INTERVAL_SECONDS
-    # Ignore zero/near-zero gaps (duplicate timestamps) and take a robust median
-    positive = diffs[diffs > 0]
-    if positive.empty:
-        return EXPECTED_SAMPLE_INTERVAL_SECONDS
-    median_interval = float(positive.median())
-    # Effective average interval over the whole recording (robust to local jitter)
-    total_dur = (df.index[-1] - df.index[0]).total_seconds()
-    avg_interval = float(total_dur / max(len(df), 1))
-    # Use the larger of median and average to avoid unrealistically small intervals
-    interval = max(median_interval, avg_interval)
-    # Clamp to a reasonable range to avoid pathological inferences
-    interval = float(np.clip(interval, 0.005, 2.0))  # 200 Hz .. 0.5 Hz
-    return interval
+def _prefix(per_slot: np.ndarray) -> np.ndarray:
+    """Prefix sums along slots: row k holds the total of slots ``[0, k)``."""
+    prefix = np.zeros((per_slot.shape[0] + 1,) + per_slot.shape[1:], dtype=per_slot.dtype)
+    np.cumsum(per_slot, axis=0, out=prefix[1:])
+    return prefix
 
 
 def generate_windows(
@@ -45,69 +34,99 @@ def generate_windows(
     window_size_seconds: int = WINDOW_SIZE_SECONDS,
     step_seconds: int = WINDOW_STEP_SECONDS,
     min_coverage: float = MIN_WINDOW_COVERAGE,
+    grid_interval_seconds: Optional[float] = None,
+    extended_features: bool = False,
+    threads: Optional[int] = 1,
+    block_windows: int = FEATURE_BLOCK_WINDOWS,
 ) -> pd.DataFrame:
+    """Fixed-stride windows over a uniform time grid anchored at the first sample.
+
+    Samples are binned into grid slots (``grid_interval_seconds``, inferred from
+    the sample spacing by default); a window is kept when at least
+    ``min_coverage`` of its slots hold data. Band means are exact sample means
+    regardless of duplicate timestamps or dropouts. ``extended_features`` adds
+    per-band variance, slope and asymmetry columns from the same prefix sums.
+
+    Grid columns are binned, and window totals and features computed in
+    blocks of ``block_windows`` windows, on ``threads`` threads (None/0 =
+    every core); each block writes into its slice of the preallocated outputs.
+    """
     if df.empty:
         raise ValueError("Cannot window empty dataframe.")
 
-    sampling_interval = infer_sampling_interval(df)
-    window_samples = max(int(round(window_size_seconds / sampling_interval)), 1)
-    step_samples = max(int(round(step_seconds / sampling_interval)), 1)
-    min_samples = int(window_samples * min_coverage)
-
     band_cols = [col for col in BAND_COLUMNS_LOWER if col in df.columns]
     if not band_cols:
         raise ValueError("No band power columns detected in data frame.")
+    hsi_cols = [col for col in df.columns if col.startswith("hsi_")]
+
+    if grid_interval_seconds is None:
+        grid_interval_seconds = infer_grid_interval(df.index, window_size_seconds, step_seconds)
+    window_slots = max(int(round(window_size_seconds / grid_interval_seconds)), 1)
+    step_slots = max(int(round(step_seconds / grid_interval_seconds)), 1)
 
-    rows: List[Dict] = []
-    total_rows = len(df)
-
-    # If sampling is very high or the dataset is short for a full window,
-    # use time-based slicing to avoid overproducing windows.
-    use_time_based = sampling_interval < 0.5 or window_samples > total_rows
-    if use_time_based:
-        session_start = df.index[0]
-        session_end = df.index[-1]
-        current = session_start
-        w_delta = pd.to_timedelta(window_size_seconds, unit="s")
-        s_delta = pd.to_timedelta(step_seconds, unit="s")
-        while current + w_delta <= session_end:
-            w_start = current
-            w_end = current + w_delta
-            window_df = df.loc[(df.index >= w_start) & (df.index <= w_end)]
-            if len(window_df) >= min_samples:
-                features = compute_window_features(window_df)
-                row = {
-                    "window_start": window_df.index[0],
-                    "window_end": window_df.index[-1],
-                    "num_samples": len(window_df),
-                }
-                row.update(features)
-                rows.append(row)
-            current = current + s_delta
-    else:
-        for start_idx in range(0, total_rows - min_samples + 1, step_samples):
-            end_idx = start_idx + window_samples
-            window_df = df.iloc[start_idx:end_idx]
-            if len(window_df) < min_samples:
-                continue
-
-            start_time = window_df.index[0]
-            end_time = window_df.index[-1]
-
-            features = compute_window_features(window_df)
-            row = {
-                "window_start": start_time,
-                "window_end": end_time,
-                "num_samples": len(window_df),
-            }
-            row.update(features)
-            rows.append(row)
-
-    if not rows:
+    grid = resample_to_grid(
+        df, grid_interval_seconds, columns=band_cols + hsi_cols, moments=extended_features, threads=threads
+    )
+    if grid.n_slots < window_slots:
         raise ValueError("No windows produced; check sampling interval and filters.")
 
-    windows_df = pd.DataFrame(rows)
-    windows_df = windows_df.sort_values("window_start").reset_index(drop=True)
+    # (n_windows, window_slots) strided view over the grid; nothing is copied.
+    coverage_view = sliding_window_view(grid.coverage, window_slots)[::step_slots]
+    starts = np.arange(coverage_view.shape[0]) * step_slots
+    coverage = coverage_view.sum(axis=1) / window_slots
+    keep = (coverage >= min_coverage) & (coverage > 0)
+    if not keep.any():
+        raise ValueError("No windows produced; check sampling interval and filters.")
+    starts = starts[keep]
+
+    # Shared read-only inputs for the block kernel: prefix sums over slots, and
+    # for each slot the nearest occupied slot at or after / at or before it, so
+    # a window's first and last timestamps are two gathers.
+    prefix = {"sums": _prefix(grid.sums), "counts": _prefix(grid.counts), "rows": _prefix(grid.rows)}
+    prefix.update({name: _prefix(values) for name, values in grid.moments.items()})
+    slot_index = np.arange(grid.n_slots)
+    next_occupied = np.minimum.accumulate(np.where(grid.coverage, slot_index, grid.n_slots)[::-1])[::-1]
+    prev_occupied = np.maximum.accumulate(np.where(grid.coverage, slot_index, -1))
+
+    n_windows = starts.size
+    out = {
+        "window_start": np.empty(n_windows, dtype=np.int64),
+        "window_end": np.empty(n_windows, dtype=np.int64),
+        "num_samples": np.empty(n_windows, dtype=np.int64),
+    }
+    out.update({name: np.empty(n_windows) for name in window_feature_names(grid.columns, extended_features)})
+
+    def _block(lo: int, hi: int) -> None:
+        block_starts = starts[lo:hi]
+        block_ends = block_starts + window_slots
+
+        def _totals(name: str) -> np.ndarray:
+            return prefix[name][block_ends] - prefix[name][block_starts]
+
+        out["window_start"][lo:hi] = grid.first_ns[next_occupied[block_starts]]
+        out["window_end"][lo:hi] = grid.last_ns[prev_occupied[block_ends - 1]]
+        out["num_samples"][lo:hi] = _totals("rows")
+
+        sums, counts = _totals("sums"), _totals("counts")
+        variance = slope = None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+            if extended_features:
+                # Sample variance (ddof=1) and least-squares slope against time in seconds.
+                sum_t = _totals("sum_t")
+                variance = np.maximum(_totals("sum_sq") - sums * sums / counts, 0.0) / (counts - 1)
+                time_spread = counts * _totals("sum_tt") - sum_t**2
+                slope = (counts * _totals("sum_tx") - sum_t * sums) / time_spread
+                variance = np.where(counts > 1, variance, np.nan)
+                slope = np.where((counts > 1) & (time_spread > 0), slope, np.nan)
+
+        block_out = {name: values[lo:hi] for name, values in out.items()}
+        write_window_features(grid.columns, means, block_out, variance, slope)
+
+    run_blocks(n_windows, block_windows, _block, threads=threads)
+
+    out["window_start"] = out["window_start"].view("datetime64[ns]")
+    out["window_end"] = out["window_end"].view("datetime64[ns]")
+    windows_df = pd.DataFrame(out, copy=False)
     logger.info("Generated %s windows", len(windows_df))
     return windows_df
-
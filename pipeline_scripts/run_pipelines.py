@@ -3,20 +3,37 @@
 from __future__ import annotations
 
 import json
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import typer
-import pandas as pd
+import pyarrow.parquet as pq
 
-from pipeline_scripts.muse.pipeline import process_muse_csv
+from pipeline_scripts.muse.pipeline import calibration_version, process_muse_csv
 from pipeline_scripts.apple_health.pipeline import process_apple_health_export
-from pipeline_scripts.utils import ensure_directory, load_config, get_logger
+from pipeline_scripts.utils import ensure_directory, file_fingerprint, file_sha256, load_config, get_logger
 
 logger = get_logger(__name__)
 
 app = typer.Typer(help="Execute Muse EEG and Apple Health data pipelines.")
 
+MUSE_REQUIRED_COLUMNS = ["window_start", "lri", "alertness", "focus"]
+APPLE_REQUIRED_COLUMNS = ["date", "sleep_score", "sleep_efficiency"]
+MUSE_OUTPUT_KEYS = ["windows", "session", "pyramid"]
+APPLE_OUTPUT_KEYS = ["parquet", "json", "workouts_parquet", "workouts_json"]
+
+
+class _InlineExecutor(Executor):
+    """Executor that runs jobs in the calling process (``--workers 1``)."""
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
 
 @app.command()
 def run_all(
@@ -38,45 +55,272 @@ def run_all(
         "-c",
         help="Optional pipeline config YAML.",
     ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        "-w",
+        min=1,
+        help="Number of worker processes for Muse CSVs and the Apple Health export.",
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental/--full",
+        help="Skip inputs whose content hash and config section are unchanged since the last manifest.",
+    ),
 ) -> None:
     """Run Muse EEG pipeline for all CSVs and Apple Health pipeline (if provided)."""
 
     config_path = config
-    manifest: Dict[str, List[Dict[str, str]]] = {"muse": [], "apple_health": []}
+    pipeline_config = load_config(config_path)
+    manifest: Dict[str, List[Dict[str, Any]]] = {"muse": [], "apple_health": []}
+    manifest_path = output_root / "manifest.json"
+    previous = _load_previous_entries(manifest_path) if incremental else {}
 
     muse_output_dir = ensure_directory(output_root / "muse")
     muse_csvs = sorted(Path(muse_dir).glob("*.csv")) if muse_dir.exists() else []
 
-    for csv_path in muse_csvs:
-        logger.info("Processing Muse CSV: %s", csv_path)
-        outputs = process_muse_csv(csv_path=csv_path, output_dir=muse_output_dir, config_path=config_path)
-        manifest["muse"].append({k: str(v) for k, v in outputs.items()})
-        _validate_parquet(outputs["windows"], required_columns=["window_start", "lri", "alertness", "focus"])
-
-    apple_outputs = None
-    if apple_export and apple_export.exists():
-        logger.info("Processing Apple Health export: %s", apple_export)
-        apple_output_dir = ensure_directory(output_root / "apple_health")
-        apple_outputs = process_apple_health_export(
-            export_xml=apple_export,
-            output_dir=apple_output_dir,
+    executor: Executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor()
+    with executor:
+        # Submit Apple Health first so it overlaps with the Muse jobs instead of trailing them.
+        apple_future: Optional[Future] = None
+        if apple_export and apple_export.exists():
+            apple_cfg = pipeline_config.apple_health
+            apple_future = _skip_if_up_to_date(previous, apple_export, apple_cfg, APPLE_OUTPUT_KEYS)
+            if apple_future is None:
+                logger.info("Processing Apple Health export: %s", apple_export)
+                apple_output_dir = ensure_directory(output_root / "apple_health")
+                apple_future = _submit(
+                    executor,
+                    apple_export,
+                    _run_apple_job,
+                    apple_export,
+                    apple_output_dir,
+                    config_path,
+                    apple_cfg,
+                    previous.get(str(apple_export)),
+                )
+
+        muse_futures = []
+        for csv_path in muse_csvs:
+            future = _skip_if_up_to_date(
+                previous,
+                csv_path,
+                pipeline_config.muse,
+                MUSE_OUTPUT_KEYS,
+                calibration=lambda sha, path=csv_path: calibration_version(
+                    path, muse_output_dir, pipeline_config.muse, sha
+                ),
+            )
+            if future is None:
+                logger.info("Processing Muse CSV: %s", csv_path)
+                future = _submit(
+                    executor,
+                    csv_path,
+                    _run_muse_job,
+                    csv_path,
+                    muse_output_dir,
+                    config_path,
+                    pipeline_config.muse,
+                    previous.get(str(csv_path)),
+                    # Files already run in parallel; don't nest a segment pool inside each worker.
+                    1 if workers > 1 else None,
+                )
+            muse_futures.append(future)
+
+        # Collect in submission (sorted input) order so the manifest is deterministic.
+        manifest["muse"] = [_collect(future, csv_path) for future, csv_path in zip(muse_futures, muse_csvs)]
+        if apple_future is not None:
+            manifest["apple_health"].append(_collect(apple_future, apple_export))
+
+    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    entries = [entry for group in manifest.values() for entry in group]
+    failed = [entry for entry in entries if entry["status"] == "failed"]
+    skipped = sum(entry["status"] == "skipped" for entry in entries)
+    typer.echo(
+        f"Pipeline run complete ({len(entries) - len(failed) - skipped} processed, {skipped} up to date, "
+        f"{len(failed)} failed). Manifest written to {manifest_path}"
+    )
+    if failed:
+        for entry in failed:
+            typer.echo(f"  FAILED {entry['input']}: {entry['error']}", err=True)
+        raise typer.Exit(code=1)
+
+
+def _load_previous_entries(manifest_path: Path) -> Dict[str, Dict[str, Any]]:
+    if not manifest_path.is_file():
+        return {}
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except ValueError:
+        logger.warning("Ignoring unreadable manifest %s", manifest_path)
+        return {}
+    return {
+        entry["input"]: entry
+        for group in manifest.values()
+        for entry in group
+        if isinstance(entry, dict) and "input" in entry
+    }
+
+
+def _skip_if_up_to_date(
+    previous: Dict[str, Dict[str, Any]],
+    input_path: Path,
+    config_section: Dict[str, Any],
+    output_keys: List[str],
+    calibration: Optional[Callable[[str], Optional[str]]] = None,
+) -> Optional[Future]:
+    """Return a completed future carrying a ``skipped`` entry, or None if the input must run.
+
+    ``calibration`` maps the input's digest to the calibration profile version
+    it would be scored against; a change from the recorded one forces a re-run.
+    """
+
+    prior = previous.get(str(input_path))
+    if not prior or prior.get("status") not in ("ok", "skipped") or prior.get("config") != config_section:
+        return None
+    if not all(prior.get(key) and Path(prior[key]).exists() for key in output_keys):
+        return None
+    if not _parquet_outputs_readable(prior, output_keys):
+        return None
+
+    fingerprint = file_fingerprint(input_path, prior.get("fingerprint"))
+    if fingerprint["sha256"] != prior.get("fingerprint", {}).get("sha256"):
+        return None
+    if calibration is not None and calibration(fingerprint["sha256"]) != prior.get("calibration"):
+        return None
+
+    logger.info("Up to date, skipping: %s", input_path)
+    future: Future = Future()
+    future.set_result({**prior, "status": "skipped", "fingerprint": fingerprint, "wall_time_seconds": 0.0})
+    return future
+
+
+def _parquet_outputs_readable(prior: Dict[str, Any], output_keys: List[str]) -> bool:
+    """Whether every Parquet output still has a readable footer (a truncated write does not)."""
+
+    for key in output_keys:
+        if not prior[key].endswith(".parquet"):
+            continue
+        try:
+            pq.read_metadata(prior[key])
+        except Exception as exc:  # noqa: BLE001 - any unreadable output means re-run
+            logger.warning("Output %s is unreadable (%s); re-running", prior[key], exc)
+            return False
+    return True
+
+
+def _crashed_entry(input_path: Path, exc: BaseException) -> Dict[str, Any]:
+    logger.error("Worker process died while processing %s: %s", input_path, exc)
+    return {
+        "input": str(input_path),
+        "status": "failed",
+        "error": f"{type(exc).__name__}: {exc}",
+        "rows": None,
+        "wall_time_seconds": None,
+    }
+
+
+def _submit(executor: Executor, input_path: Path, fn: Callable[..., Dict[str, Any]], *args: Any) -> Future:
+    """Submit a job, or return its failed entry if the pool already broke."""
+
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool as exc:
+        future: Future = Future()
+        future.set_result(_crashed_entry(input_path, exc))
+        return future
+
+
+def _collect(future: Future, input_path: Path) -> Dict[str, Any]:
+    """A job's manifest entry; a worker that died (OOM kill, segfault) fails only the jobs it took down."""
+
+    try:
+        return future.result()
+    except BrokenProcessPool as exc:
+        return _crashed_entry(input_path, exc)
+
+
+def _run_muse_job(
+    csv_path: Path,
+    output_dir: Path,
+    config_path: Optional[Path],
+    config_section: Dict[str, Any],
+    prior: Optional[Dict[str, Any]] = None,
+    segment_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    def _job() -> Dict[str, Any]:
+        # Recorded so --incremental re-runs the file when its calibration profile changes
+        calibration = None
+        if config_section.get("calibrate", False):
+            calibration = calibration_version(csv_path, output_dir, config_section, file_sha256(csv_path))
+        outputs = process_muse_csv(
+            csv_path=csv_path,
+            output_dir=output_dir,
             config_path=config_path,
+            segment_workers=segment_workers,
         )
-        manifest["apple_health"].append({k: str(v) for k, v in apple_outputs.items()})
-        _validate_parquet(apple_outputs["parquet"], required_columns=["date", "sleep_score", "sleep_efficiency"])
+        rows = _validate_parquet(outputs["windows"], required_columns=MUSE_REQUIRED_COLUMNS)
+        return {"outputs": outputs, "rows": rows, "calibration": calibration}
 
-    manifest_path = output_root / "manifest.json"
-    manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
-    typer.echo(f"Pipeline run complete. Manifest written to {manifest_path}")
+    return _timed_job(csv_path, _job, config_section, prior)
+
+
+def _run_apple_job(
+    export_xml: Path,
+    output_dir: Path,
+    config_path: Optional[Path],
+    config_section: Dict[str, Any],
+    prior: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    def _job() -> Dict[str, Any]:
+        outputs = process_apple_health_export(
+            export_xml=export_xml,
+            output_dir=output_dir,
+            config_path=config_path,
+        )
+        rows = _validate_parquet(outputs["parquet"], required_columns=APPLE_REQUIRED_COLUMNS)
+        return {"outputs": outputs, "rows": rows}
+
+    return _timed_job(export_xml, _job, config_section, prior)
 
 
-def _validate_parquet(path: Path, required_columns: List[str]) -> None:
-    df = pd.read_parquet(path)
-    missing = [col for col in required_columns if col not in df.columns]
+def _timed_job(
+    input_path: Path,
+    job: Callable[[], Dict[str, Any]],
+    config_section: Dict[str, Any],
+    prior: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run one pipeline job, isolating failures into a manifest entry."""
+
+    entry: Dict[str, Any] = {"input": str(input_path)}
+    start = time.perf_counter()
+    try:
+        # Fingerprint before running so an input edited mid-run is picked up next time.
+        entry["fingerprint"] = file_fingerprint(input_path, (prior or {}).get("fingerprint"))
+        entry["config"] = config_section
+        result = job()
+    except Exception as exc:  # noqa: BLE001 - one bad input must not abort the run
+        logger.exception("Pipeline job failed for %s", input_path)
+        entry.update({"status": "failed", "error": f"{type(exc).__name__}: {exc}", "rows": None})
+    else:
+        entry.update({k: str(v) for k, v in result["outputs"].items()})
+        entry.update({"status": "ok", "error": None, "rows": result["rows"]})
+        if result.get("calibration") is not None:
+            entry["calibration"] = result["calibration"]
+    entry["wall_time_seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def _validate_parquet(path: Path, required_columns: List[str]) -> int:
+    """Check required columns and return the row count using only the Parquet footer."""
+
+    metadata = pq.read_metadata(path)
+    missing = [col for col in required_columns if col not in metadata.schema.names]
     if missing:
         raise ValueError(f"Missing columns in {path}: {missing}")
+    return metadata.num_rows
 
 
 if __name__ == "__main__":
     app()
-
@@ -1,6 +1,10 @@
 """Shared utility helpers for data pipelines."""
 
+from .cache import StageCache, code_version, stage_key  # noqa: F401
 from .config import PipelineConfig, load_config  # noqa: F401
+from .hashing import file_fingerprint, file_sha256  # noqa: F401
 from .logging import get_logger  # noqa: F401
+from .parallel import block_ranges, run_blocks  # noqa: F401
 from .paths import ensure_directory, RAW_DATA_DIR, PROCESSED_DATA_DIR  # noqa: F401
+from .sketches import TDigest  # noqa: F401
 
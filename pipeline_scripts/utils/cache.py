@@ -0,0 +1,138 @@
+"""Content-addressed on-disk cache for pipeline stage outputs."""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def code_version(*modules: ModuleType) -> str:
+    """Digest of the given modules' source, so editing a stage invalidates its entries."""
+
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(inspect.getsource(module).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def stage_key(stage: str, upstream: str, params: Dict[str, Any], version: str) -> str:
+    """Cache key for ``stage`` given its upstream key/input hash, parameters and code version."""
+
+    payload = json.dumps(
+        {"stage": stage, "upstream": upstream, "params": params, "version": version},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+class StageCache:
+    """Stage outputs stored as ``<root>/<stage>/<key>.parquet`` (DataFrames) or ``.json``.
+
+    Entries are written atomically, so concurrent pipeline processes can share
+    one cache; an entry that cannot be read (truncated, corrupt) is deleted and
+    counted as a miss. A hit refreshes the entry's mtime; after each write the oldest
+    entries are evicted until the cache fits in ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = 2 * 1024**3):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, CacheStats] = {}
+
+    def _stage_stats(self, stage: str) -> CacheStats:
+        return self.stats.setdefault(stage, CacheStats())
+
+    def _path(self, stage: str, key: str, suffix: str) -> Path:
+        return self.root / stage / f"{key}{suffix}"
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        stats = self._stage_stats(stage)
+        for suffix in (".parquet", ".json"):
+            path = self._path(stage, key, suffix)
+            try:
+                value = pd.read_parquet(path) if suffix == ".parquet" else json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            except Exception as exc:  # noqa: BLE001 - a truncated or corrupt entry is a miss
+                logger.warning("Dropping unreadable cache entry %s: %s", path, exc)
+                path.unlink(missing_ok=True)
+                continue
+            stats.hits += 1
+            return value
+        stats.misses += 1
+        return None
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        is_frame = isinstance(value, pd.DataFrame)
+        path = self._path(stage, key, ".parquet" if is_frame else ".json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            if is_frame:
+                value.to_parquet(tmp_name)
+            else:
+                Path(tmp_name).write_text(json.dumps(value), encoding="utf-8")
+            os.replace(tmp_name, path)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+
+        self._stage_stats(stage).writes += 1
+        self._evict()
+
+    def get_or_compute(self, stage: str, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(stage, key)
+        if value is None:
+            value = compute()
+            self.put(stage, key, value)
+        return value
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.root.glob("*/*"):
+            if path.suffix not in (".parquet", ".json"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._stage_stats(path.parent.name).evictions += 1
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {stage: asdict(stats) for stage, stats in sorted(self.stats.items())}
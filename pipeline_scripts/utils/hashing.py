@@ -0,0 +1,36 @@
+"""Content fingerprints for pipeline inputs."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+BLOCK_SIZE = 1024**2
+
+
+def file_sha256(path: Path) -> str:
+    """Return the hex SHA-256 digest of a file, streamed in blocks."""
+
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for block in iter(lambda: fh.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: Path, previous: Optional[Dict[str, Union[str, int]]] = None) -> Dict[str, Union[str, int]]:
+    """Return ``{"sha256", "size", "mtime_ns"}`` for a file.
+
+    When ``previous`` carries the same size and mtime the recorded digest is
+    reused instead of re-reading the file (the same shortcut ``git status`` takes).
+    """
+
+    stat = os.stat(path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        digest = str(previous["sha256"])
+    else:
+        digest = file_sha256(path)
+    return {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
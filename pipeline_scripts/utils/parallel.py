@@ -0,0 +1,38 @@
+"""Block-parallel helpers for NumPy kernels."""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+
+def block_ranges(total: int, block_size: int) -> List[Tuple[int, int]]:
+    """``[lo, hi)`` ranges of at most ``block_size`` covering ``range(total)``."""
+    block_size = max(int(block_size), 1)
+    return [(lo, min(lo + block_size, total)) for lo in range(0, total, block_size)]
+
+
+def run_blocks(
+    total: int,
+    block_size: int,
+    kernel: Callable[[int, int], None],
+    threads: Optional[int] = None,
+) -> None:
+    """Call ``kernel(lo, hi)`` for every block of ``range(total)``, on ``threads`` threads.
+
+    Kernels write their results into slices of arrays allocated up front, so
+    blocks never need concatenating; threads only pay off when the kernel's
+    NumPy calls release the GIL (ufuncs, reductions and gathers on numeric
+    arrays do). ``threads`` of None/0 means every core. Exceptions raised by a
+    kernel propagate to the caller.
+    """
+    ranges = block_ranges(total, block_size)
+    threads = min(int(threads or os.cpu_count() or 1), len(ranges))
+    if threads <= 1:
+        for lo, hi in ranges:
+            kernel(lo, hi)
+        return
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for _ in executor.map(lambda bounds: kernel(*bounds), ranges):
+            pass
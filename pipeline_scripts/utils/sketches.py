@@ -0,0 +1,94 @@
+"""Mergeable streaming quantile sketches."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) with the arcsine (k1) scale function.
+
+    Values are absorbed in batches: the batch and the existing centroids are
+    sorted together and regrouped so that no centroid spans more than one unit
+    of ``k(q) = compression / (2*pi) * asin(2q - 1)``. That keeps roughly
+    ``compression / 2`` centroids, small ones near the tails, so extreme
+    quantiles stay accurate. Digests merge the same way, and the exact min and
+    max are tracked separately.
+    """
+
+    def __init__(
+        self,
+        compression: float = 100.0,
+        means: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+        minimum: float = np.inf,
+        maximum: float = -np.inf,
+    ):
+        self.compression = float(compression)
+        self.means = np.asarray(means if means is not None else [], dtype=float)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=float)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: Iterable[float]) -> None:
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size:
+            self._absorb(values, np.ones_like(values), values.min(), values.max())
+
+    def merge(self, other: "TDigest") -> None:
+        if other.weights.size:
+            self._absorb(other.means, other.weights, other.minimum, other.maximum)
+
+    def _absorb(self, means: np.ndarray, weights: np.ndarray, minimum: float, maximum: float) -> None:
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+        group = np.floor(k - k.min()).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        self.minimum = min(self.minimum, float(minimum))
+        self.maximum = max(self.maximum, float(maximum))
+
+    def quantile(self, q: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """Interpolated quantile(s); NaN while the digest is empty."""
+        if not self.weights.size:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+        total = self.weights.sum()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        ranks = np.concatenate(([0.0], centres, [total]))
+        values = np.concatenate(([self.minimum], self.means, [self.maximum]))
+        result = np.interp(np.asarray(q, dtype=float) * total, ranks, values)
+        return float(result) if np.ndim(result) == 0 else result
+
+    def to_dict(self) -> Dict:
+        return {
+            "compression": self.compression,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict) -> "TDigest":
+        return cls(
+            compression=payload["compression"],
+            means=np.asarray(payload["means"], dtype=float),
+            weights=np.asarray(payload["weights"], dtype=float),
+            minimum=payload["min"],
+            maximum=payload["max"],
+        )
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The backend is a flat module directory (run as ``cd backend && uvicorn server:app``)
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
@@ -0,0 +1,73 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from date_index import DateIndex
+
+
+def _index(*days):
+    return DateIndex(Path("unused.parquet"), "date", np.array(days, dtype="datetime64[D]"))
+
+
+def test_bounds_are_inclusive():
+    index = _index("2025-01-01", "2025-01-02", "2025-01-02", "2025-01-04")
+
+    assert index.bounds(date(2025, 1, 2), date(2025, 1, 2)) == slice(1, 3)
+    assert index.bounds(date(2025, 1, 1), date(2025, 1, 4)) == slice(0, 4)
+    assert index.bounds(date(2025, 1, 3), date(2025, 1, 4)) == slice(3, 4)
+
+
+def test_bounds_with_open_ends():
+    index = _index("2025-01-01", "2025-01-02", "2025-01-04")
+
+    assert index.bounds(None, None) == slice(0, 3)
+    assert index.bounds(date(2025, 1, 2), None) == slice(1, 3)
+    assert index.bounds(None, date(2025, 1, 2)) == slice(0, 2)
+
+
+def test_bounds_of_an_empty_range():
+    index = _index("2025-01-01", "2025-01-04")
+
+    for start, end in [
+        (date(2025, 1, 2), date(2025, 1, 3)),
+        (date(2025, 2, 1), None),
+        (None, date(2024, 12, 31)),
+        (date(2025, 1, 4), date(2025, 1, 1)),
+    ]:
+        bounds = index.bounds(start, end)
+        assert bounds.start == bounds.stop
+    assert _index().bounds(None, None) == slice(0, 0)
+
+
+def test_range_json_reads_matching_records_by_local_date(tmp_path):
+    workouts = pd.DataFrame(
+        {
+            "start_time": [
+                "2025-01-03T07:00:00-08:00",
+                "2025-01-01T23:30:00-08:00",
+                "not a date",
+                "2025-01-01T06:00:00-08:00",
+                "2025-01-02T18:00:00-08:00",
+            ],
+            "duration_minutes": [30.0, np.nan, 10.0, 45.0, 20.0],
+        }
+    )
+    path = tmp_path / "workouts.parquet"
+    workouts.to_parquet(path, index=False, row_group_size=2)
+    index = DateIndex.from_parquet(path, "start_time")
+
+    assert len(index.keys) == 4
+    body = json.loads(index.range_json("workouts", date(2025, 1, 1), date(2025, 1, 2)))
+    assert body["from"] == "2025-01-01" and body["to"] == "2025-01-02" and body["count"] == 3
+    assert [w["start_time"] for w in body["workouts"]] == [
+        "2025-01-01T06:00:00-08:00",
+        "2025-01-01T23:30:00-08:00",
+        "2025-01-02T18:00:00-08:00",
+    ]
+    assert body["workouts"][1]["duration_minutes"] is None
+
+    empty = json.loads(index.range_json("workouts", date(2025, 2, 1), None))
+    assert empty == {"from": "2025-02-01", "to": None, "count": 0, "workouts": []}
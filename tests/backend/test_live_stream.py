@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+from live_stream import CsvTail, LiveSession, LiveState
+
+
+HEADER = "window_start,window_end,lri,alertness,focus,arousal_balance\n"
+
+
+def _row(start, lri):
+    return {"window_start": start, "window_end": "", "lri": str(lri), "alertness": "", "focus": "", "arousal_balance": ""}
+
+
+def _kinds(events):
+    return [event.kind for event in events]
+
+
+def test_csv_tail_holds_partial_lines_until_complete(tmp_path):
+    source = tmp_path / "live.csv"
+    source.write_text(HEADER + "2025-01-01T09:00:00,2025-01-01T09:00:30,72.5,1,2,3\n2025-01-01T09:00:15,")
+    tail = CsvTail(source)
+
+    reset, rows = tail.read()
+    assert not reset
+    assert [row["lri"] for row in rows] == ["72.5"]
+
+    with source.open("a") as f:
+        f.write("2025-01-01T09:00:45,65.0,4,5")
+    assert tail.read() == (False, [])
+
+    with source.open("a") as f:
+        f.write(",6\n")
+    reset, rows = tail.read()
+    assert not reset
+    assert rows == [
+        {
+            "window_start": "2025-01-01T09:00:15",
+            "window_end": "2025-01-01T09:00:45",
+            "lri": "65.0",
+            "alertness": "4",
+            "focus": "5",
+            "arousal_balance": "6",
+        }
+    ]
+
+
+def test_csv_tail_restarts_after_truncation(tmp_path):
+    source = tmp_path / "live.csv"
+    source.write_text(HEADER + "2025-01-01T09:00:00,,50,,,\n2025-01-01T09:00:15,,55,,,\n")
+    tail = CsvTail(source)
+    assert len(tail.read()[1]) == 2
+
+    source.write_text(HEADER + "2025-01-02T09:00:00,,80,,,\n")
+    reset, rows = tail.read()
+    assert reset
+    assert [row["window_start"] for row in rows] == ["2025-01-02T09:00:00"]
+
+
+def test_live_state_reports_optimal_runs():
+    state = LiveState()
+
+    assert _kinds(state.consume(_row("2025-01-01T09:00:00", 50))) == ["window"]
+    assert _kinds(state.consume(_row("2025-01-01T09:00:15", 80))) == ["window", "optimal_start"]
+    assert _kinds(state.consume(_row("2025-01-01T09:00:30", 90))) == ["window"]
+    events = state.consume(_row("2025-01-01T09:00:45", "nan"))
+    assert _kinds(events) == ["window", "optimal_end"]
+
+    window, run_end = (json.loads(event.data) for event in events)
+    assert window["state"] == "unknown" and window["lri"] is None
+    assert run_end["start"] == "2025-01-01T09:00:15"
+    assert run_end["end"] == "2025-01-01T09:00:30"
+    assert run_end["duration_minutes"] == 0.25
+    assert run_end["avg_lri"] == 85.0
+
+    snapshot = json.loads(state.snapshot().data)
+    assert snapshot["windows_seen"] == 4
+    assert snapshot["in_optimal_window"] is False
+
+
+def test_sse_registers_its_subscriber_only_while_streaming(tmp_path):
+    source = tmp_path / "live.csv"
+    source.write_text(HEADER + "2025-01-01T09:00:00,,80,,,\n")
+
+    async def stream():
+        session = LiveSession(source, poll_seconds=0.01)
+        session.sse()  # never iterated, as when the client leaves before the body starts
+        assert not session._subscribers
+
+        frames = session.sse()
+        first = await frames.__anext__()
+        assert first.startswith(b"event: snapshot\n")
+        assert len(session._subscribers) == 1
+
+        await frames.aclose()
+        assert not session._subscribers
+
+    asyncio.run(stream())
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import shutil
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from benchmarks.api_benchmark import generate_dataset
+from concurrency import limited
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("processed")
+    generate_dataset(data_dir, participants=1, windows=2000, sleep_years=1, workouts_per_week=4)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(server, "MUSE_DIR", data_dir / "muse")
+        patch.setattr(server, "APPLE_HEALTH_DIR", data_dir / "apple_health")
+        with TestClient(server.app) as test_client:
+            yield test_client
+
+
+def test_dashboard_and_context(client):
+    dashboard = client.get("/api/dashboard")
+    assert dashboard.status_code == 200
+    assert set(server.DASHBOARD_SECTIONS) <= set(dashboard.json())
+
+    context = client.get("/api/session/context")
+    assert context.status_code == 200
+
+
+def test_context_compares_workout_and_session_by_wall_clock(client):
+    session = json.loads((server.MUSE_DIR / "participant_museData0_session.json").read_text())
+    workouts = json.loads((server.APPLE_HEALTH_DIR / "workouts_last_20_days.json").read_text())
+    # Workouts carry a UTC offset (-08:00), the Muse session is naive local time
+    workout_end = datetime.fromisoformat(workouts[-1]["end_time"]).replace(tzinfo=None)
+    hours = (datetime.fromisoformat(session["session_start"]) - workout_end).total_seconds() / 3600
+
+    context = client.get("/api/session/context").json()["context"]
+    assert context["post_exercise_hours"] == (round(hours, 1) or None)
+
+
+def test_dashboard_without_sleep_records(client, tmp_path, monkeypatch):
+    shutil.copytree(server.APPLE_HEALTH_DIR, tmp_path / "apple_health")
+    (tmp_path / "apple_health" / "sleep_last_20_days.json").write_text("[]")
+    monkeypatch.setattr(server, "APPLE_HEALTH_DIR", tmp_path / "apple_health")
+
+    dashboard = client.get("/api/dashboard")
+    assert dashboard.status_code == 200
+    body = dashboard.json()
+    assert "errors" not in body
+    assert body["daily_timeline"]["measured_session"]["lri_values"]
+
+
+def test_timeline_accepts_timezone_aware_bounds(client):
+    full = client.get("/api/session/timeline", params={"max_points": 5000}).json()
+    first = full["points"][0]["bucket_start"]
+    start = first + "+00:00"
+
+    zoomed = client.get("/api/session/timeline", params={"start": start, "max_points": 5000})
+    assert zoomed.status_code == 200
+    assert zoomed.json()["points"][0]["bucket_start"] == first
+
+
+def test_timeline_revalidates_with_etag(client):
+    response = client.get("/api/session/timeline")
+    assert response.status_code == 200
+
+    cached = client.get("/api/session/timeline", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_history_ranges(client):
+    today = date.today()
+    week = {"from": (today - timedelta(days=7)).isoformat(), "to": today.isoformat()}
+
+    sleep = client.get("/api/sleep", params=week).json()["sleep_records"]
+    assert sleep and all(week["from"] <= night["date"] <= week["to"] for night in sleep)
+
+    workouts = client.get("/api/workouts", params=week).json()["workouts"]
+    assert all(week["from"] <= workout["start_time"][:10] <= week["to"] for workout in workouts)
+
+    backwards = client.get("/api/sleep", params={"from": week["to"], "to": week["from"]})
+    assert backwards.status_code == 400
+
+
+def test_missing_live_session_is_404(client):
+    assert client.get("/api/session/live", params={"participant_id": 99}).status_code == 404
+
+
+def test_metrics_expose_request_and_cache_counters(client):
+    client.get("/api/health")
+    body = client.get("/metrics").text
+    assert "artifact_cache_hits_total" in body
+    assert "query_payload_cache_entries" in body
+
+
+def test_limited_endpoints_work_across_event_loops():
+    @limited(concurrency=1, max_wait=5)
+    def slow():
+        return "done"
+
+    async def burst():
+        return await asyncio.gather(*(slow() for _ in range(3)))
+
+    # Each run has its own loop; a semaphore bound to the first would fail in the second
+    assert asyncio.run(burst()) == ["done"] * 3
+    assert asyncio.run(burst()) == ["done"] * 3
@@ -0,0 +1,16 @@
+import numpy as np
+
+import session_analytics
+from pipeline_scripts.muse import session
+
+
+def test_optimal_runs_and_union_match_the_pipeline():
+    rng = np.random.default_rng(0)
+    mask = rng.random(500) < 0.4
+    for expected, actual in zip(session._run_bounds(mask), session_analytics._run_bounds(mask)):
+        np.testing.assert_array_equal(actual, expected)
+
+    starts = np.sort(rng.integers(0, 10**12, 300))
+    ends = starts + rng.integers(0, 5 * 10**10, 300)
+    minutes = session._sum_union_nanoseconds(starts, ends) / 1e9 / 60.0
+    assert session_analytics._union_minutes(starts, ends) == minutes
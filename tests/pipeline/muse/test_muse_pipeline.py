@@ -1,14 +1,35 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import json
+import numpy as np
 import pandas as pd
+import yaml
 
-from pipeline_scripts.muse.pipeline import process_muse_csv
+from pipeline_scripts.muse.calibration import add_session, calibrated_calculator, load_profile
+from pipeline_scripts.muse.constants import BAND_COLUMNS_LOWER
+from pipeline_scripts.muse.dataset import read_sessions, read_windows
+from pipeline_scripts.muse.loader import load_clean_data
+from pipeline_scripts.muse.lri import LRICalculator
+from pipeline_scripts.muse.pipeline import _score_windows, calibration_version, process_muse_csv
+from pipeline_scripts.muse.pyramid import build_window_pyramid, select_pyramid_level
+from pipeline_scripts.muse.session import SessionAnalyzer
+from pipeline_scripts.muse.windowing import generate_windows
+from pipeline_scripts.utils import StageCache, TDigest, file_sha256
+from pipeline_scripts.utils.config import DEFAULT_CONFIG_PATH
 
 
 FIXTURE_CSV = Path("tests/fixtures/muse/sample_muse.csv")
 
 
+def _muse_config(tmp_path, **overrides):
+    config = yaml.safe_load(DEFAULT_CONFIG_PATH.read_text())
+    config["muse"].update(overrides)
+    config_path = tmp_path / "pipeline.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+    return config_path, config["muse"]
+
+
 def test_process_muse_csv(tmp_path):
     outputs = process_muse_csv(
         csv_path=FIXTURE_CSV,
@@ -29,3 +50,400 @@ def test_process_muse_csv(tmp_path):
     assert "session_score" in session
     assert session["peak_lri"] >= session["avg_lri"]
 
+
+def test_arrow_loader_matches_pandas():
+    pandas_df = load_clean_data(FIXTURE_CSV, engine="pandas")
+    arrow_df = load_clean_data(FIXTURE_CSV, engine="arrow")
+
+    assert list(arrow_df.index) == list(pandas_df.index)
+    assert set(arrow_df.dtypes) == {np.dtype("float32")}
+    for column in arrow_df.columns:
+        assert np.allclose(arrow_df[column], pandas_df[column], atol=1e-6)
+
+
+def test_process_raw_only_muse_csv(tmp_path):
+    sampling_rate = 256
+    t = np.arange(sampling_rate * 90) / sampling_rate
+    raw = pd.DataFrame(
+        {
+            "TimeStamp": pd.Timestamp("2025-01-01 09:00:00") + pd.to_timedelta(t, unit="s"),
+            "RAW_TP9": 800 + 20 * np.sin(2 * np.pi * 10 * t),
+            "RAW_AF7": 800 + 20 * np.sin(2 * np.pi * 20 * t),
+            "RAW_AF8": 800 + 10 * np.sin(2 * np.pi * 6 * t),
+            "RAW_TP10": 800 + 20 * np.sin(2 * np.pi * 10 * t),
+        }
+    )
+    csv_path = tmp_path / "raw_only.csv"
+    raw.to_csv(csv_path, index=False)
+
+    outputs = process_muse_csv(csv_path=csv_path, output_dir=tmp_path)
+
+    windows_df = pd.read_parquet(outputs["windows"])
+    assert len(windows_df) > 0
+    # A 20 µV sine carries 200 µV² of power, all inside its band.
+    assert np.allclose(windows_df["alpha_tp9"], np.log10(200), atol=0.05)
+    assert np.allclose(windows_df["beta_af7"], np.log10(200), atol=0.05)
+    assert (windows_df["alpha_af7"] < 0).all()
+    assert "lri" in windows_df.columns
+
+
+def test_session_analyzer_runs_and_overlap_union():
+    starts = pd.date_range("2025-01-01 09:00:00", periods=6, freq="15s")
+    lri = [80.0, 90.0, 50.0, 72.0, 10.0, 75.0]
+    windows_df = pd.DataFrame(
+        {
+            "window_start": starts,
+            "window_end": starts + pd.Timedelta(seconds=30),
+            "lri": lri,
+            "alertness": lri,
+            "focus": lri,
+            "arousal_balance": lri,
+        }
+    )
+
+    summary = SessionAnalyzer(LRICalculator()).analyse(windows_df)
+
+    assert [(w["start"], w["avg_lri"]) for w in summary["optimal_windows"]] == [
+        ("2025-01-01T09:00:00", 85.0),
+        ("2025-01-01T09:00:45", 72.0),
+        ("2025-01-01T09:01:15", 75.0),
+    ]
+    assert summary["optimal_windows"][0]["duration_minutes"] == 0.75
+    # Optimal intervals 0-45s, 45-75s and 75-105s overlap into one 105s block.
+    assert summary["time_in_state"] == {"optimal_minutes": 1.75, "moderate_minutes": 0.5, "low_minutes": 0.5}
+
+
+def test_process_muse_csv_appends_partitioned_dataset(tmp_path):
+    outputs = process_muse_csv(csv_path=FIXTURE_CSV, output_dir=tmp_path)
+
+    assert (outputs["windows_dataset"] / "participant_id=muse" / "date=2025-01-01").is_dir()
+    windows_df = read_windows(tmp_path / "dataset", participant_ids=["muse"], start="2025-01-01 09:00:00")
+    assert len(windows_df) == len(pd.read_parquet(outputs["windows"]))
+    assert read_windows(tmp_path / "dataset", participant_ids=["other"]).empty
+
+    sessions_df = read_sessions(tmp_path / "dataset")
+    assert list(sessions_df["participant_id"]) == ["muse"]
+    assert sessions_df.loc[0, "num_windows"] == len(windows_df)
+
+    # A second night for the same participant is appended, not swapped in
+    second_night = pd.read_csv(FIXTURE_CSV)
+    second_night["timestamp"] = pd.to_datetime(second_night["timestamp"]) + pd.Timedelta(days=1)
+    (tmp_path / "night2").mkdir()
+    second_night.to_csv(tmp_path / "night2" / FIXTURE_CSV.name, index=False)
+    process_muse_csv(csv_path=tmp_path / "night2" / FIXTURE_CSV.name, output_dir=tmp_path)
+
+    windows_df = read_windows(tmp_path / "dataset", participant_ids=["muse"])
+    assert sorted(windows_df["date"].unique()) == ["2025-01-01", "2025-01-02"]
+    sessions_df = read_sessions(tmp_path / "dataset", participant_ids=["muse"])
+    assert sessions_df["session_start"].dt.strftime("%Y-%m-%d").tolist() == ["2025-01-01", "2025-01-02"]
+    assert sessions_df["num_windows"].sum() == len(windows_df)
+
+
+def test_dataset_keeps_recordings_that_share_a_date(tmp_path):
+    first = process_muse_csv(csv_path=FIXTURE_CSV, output_dir=tmp_path)
+    first_windows = len(pd.read_parquet(first["windows"]))
+
+    # The same participant records again that afternoon
+    afternoon = pd.read_csv(FIXTURE_CSV)
+    afternoon["timestamp"] = pd.to_datetime(afternoon["timestamp"]) + pd.Timedelta(hours=5)
+    (tmp_path / "afternoon").mkdir()
+    afternoon.to_csv(tmp_path / "afternoon" / FIXTURE_CSV.name, index=False)
+    second = process_muse_csv(csv_path=tmp_path / "afternoon" / FIXTURE_CSV.name, output_dir=tmp_path)
+    second_windows = len(pd.read_parquet(second["windows"]))
+
+    # Re-processing the morning replaces its own rows only
+    process_muse_csv(csv_path=FIXTURE_CSV, output_dir=tmp_path)
+
+    windows_df = read_windows(tmp_path / "dataset", participant_ids=["muse"])
+    assert windows_df["date"].unique().tolist() == ["2025-01-01"]
+    assert len(windows_df) == first_windows + second_windows
+    sessions_df = read_sessions(tmp_path / "dataset", participant_ids=["muse"])
+    assert sessions_df["session_start"].dt.hour.tolist() == [9, 14]
+    assert len(list((tmp_path / "dataset" / "sessions").rglob("*.parquet"))) == 2
+
+
+def _write_two_sessions(tmp_path):
+    fixture = pd.read_csv(FIXTURE_CSV)
+    recordings = []
+    for hour in range(2):
+        recording = pd.concat([fixture] * 4, ignore_index=True)
+        recording["timestamp"] = pd.Timestamp("2025-01-01 09:00:00") + pd.Timedelta(hours=hour)
+        recording["timestamp"] += pd.to_timedelta(np.arange(len(recording)), unit="s")
+        recordings.append(recording)
+    csv_path = tmp_path / "two_sessions.csv"
+    pd.concat(recordings).to_csv(csv_path, index=False)
+    return csv_path
+
+
+def test_process_muse_csv_splits_sessions_at_gaps(tmp_path):
+    csv_path = _write_two_sessions(tmp_path)
+
+    outputs = process_muse_csv(csv_path=csv_path, output_dir=tmp_path, segment_workers=1)
+
+    windows_df = pd.read_parquet(outputs["windows"])
+    assert sorted(windows_df["segment"].unique()) == [0, 1]
+    second = json.loads(outputs["session_1"].read_text())
+    assert second["session_start"] == "2025-01-01T10:00:00"
+    assert second["session_duration_minutes"] < 5
+
+
+def test_process_muse_csv_windows_segments_in_worker_processes(tmp_path):
+    csv_path = _write_two_sessions(tmp_path)
+
+    serial = process_muse_csv(csv_path=csv_path, output_dir=tmp_path / "serial", segment_workers=1)
+    parallel = process_muse_csv(csv_path=csv_path, output_dir=tmp_path / "parallel", segment_workers=2)
+
+    pd.testing.assert_frame_equal(pd.read_parquet(parallel["windows"]), pd.read_parquet(serial["windows"]))
+    for name in ("session", "session_0", "session_1"):
+        assert json.loads(parallel[name].read_text()) == json.loads(serial[name].read_text())
+
+
+def test_window_pyramid_levels_roll_up():
+    starts = pd.date_range("2025-01-01 09:00:00", periods=480, freq="15s")
+    lri = np.linspace(0, 100, len(starts))
+    windows_df = pd.DataFrame(
+        {"window_start": starts, "lri": lri, "alertness": lri, "focus": lri, "arousal_balance": lri}
+    )
+
+    pyramid = build_window_pyramid(windows_df)
+
+    assert pyramid.groupby("level", sort=False).size().to_dict() == {"30s": 240, "2.5min": 48, "10min": 12, "1h": 2}
+    hourly = pyramid[pyramid["level"] == "1h"]
+    assert hourly["window_count"].tolist() == [240, 240]
+    assert np.allclose(hourly["lri_mean"], [lri[:240].mean(), lri[240:].mean()])
+    assert hourly["lri_min"].iloc[1] == lri[240] and hourly["lri_max"].iloc[1] == 100
+    assert select_pyramid_level(pyramid, max_points=20)["level"].iloc[0] == "10min"
+
+    # NaN windows are skipped, not spread to every level above them
+    nan_lri = lri.copy()
+    nan_lri[::3] = np.nan
+    nan_lri[:40] = np.nan
+    pyramid = build_window_pyramid(windows_df.assign(lri=nan_lri))
+    assert pyramid.loc[pyramid["level"] == "30s", "lri_mean"].isna().sum() == 20
+    assert pyramid.loc[pyramid["level"] == "2.5min", "lri_mean"].isna().tolist() == [True] * 4 + [False] * 44
+    hourly = pyramid[pyramid["level"] == "1h"]
+    assert hourly["window_count"].tolist() == [240, 240]
+    assert np.allclose(hourly["lri_mean"], [np.nanmean(nan_lri[:240]), np.nanmean(nan_lri[240:])])
+    assert hourly["lri_min"].iloc[0] == np.nanmin(nan_lri[:240]) and hourly["lri_max"].iloc[1] == np.nanmax(nan_lri)
+
+
+def test_stage_cache_skips_unchanged_stages(tmp_path):
+    first = StageCache(tmp_path / "cache")
+    process_muse_csv(csv_path=FIXTURE_CSV, output_dir=tmp_path / "a", cache=first)
+    assert {stage: stats["misses"] for stage, stats in first.summary().items()} == {
+        "load": 1,
+        "windows": 1,
+        "lri": 1,
+        "session": 1,
+    }
+
+    second = StageCache(tmp_path / "cache")
+    outputs = process_muse_csv(csv_path=FIXTURE_CSV, output_dir=tmp_path / "b", cache=second)
+    assert {stage: stats["hits"] for stage, stats in second.summary().items()} == {"lri": 1, "session": 1}
+    assert pd.read_parquet(outputs["windows"]).equals(pd.read_parquet(tmp_path / "a" / outputs["windows"].name))
+
+    # A truncated entry is recomputed rather than failing the run
+    (entry,) = (tmp_path / "cache" / "lri").glob("*.parquet")
+    entry.write_bytes(entry.read_bytes()[:100])
+    third = StageCache(tmp_path / "cache")
+    outputs = process_muse_csv(csv_path=FIXTURE_CSV, output_dir=tmp_path / "c", cache=third)
+    assert third.summary()["lri"]["misses"] == 1
+    assert pd.read_parquet(outputs["windows"]).equals(pd.read_parquet(tmp_path / "a" / outputs["windows"].name))
+    assert len(pd.read_parquet(entry)) == len(pd.read_parquet(outputs["windows"]))
+
+
+def test_generate_windows_on_uneven_sampling():
+    # 4 Hz with duplicated timestamps and a 20s dropout.
+    offsets = np.arange(0, 120, 0.25)
+    offsets = np.sort(np.concatenate([offsets, offsets[::7]]))
+    offsets = offsets[(offsets < 40) | (offsets >= 60)]
+    index = pd.Timestamp("2025-01-01 09:00:00") + pd.to_timedelta(offsets, unit="s")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {"alpha_af7": np.arange(len(index), dtype=float), "alpha_af8": rng.normal(1, 0.2, len(index)), "hsi_af7": 1.0},
+        index=index,
+    )
+
+    windows = generate_windows(df, window_size_seconds=30, step_seconds=15, min_coverage=0.8, extended_features=True)
+
+    # Windows starting at 30s and 45s spend more than 20% of their span in the dropout.
+    assert windows["window_start"].tolist() == list(index[0] + pd.to_timedelta([0, 15, 60, 75, 90], unit="s"))
+    for _, window in windows.iterrows():
+        span_end = window["window_start"] + pd.Timedelta(30, "s")
+        in_window = df[(df.index >= window["window_start"]) & (df.index < span_end)]
+        assert window["num_samples"] == len(in_window)
+        assert window["alpha_af7"] == in_window["alpha_af7"].mean()
+        assert np.isclose(window["alpha_af8_var"], in_window["alpha_af8"].var())
+        seconds = (in_window.index - in_window.index[0]).total_seconds()
+        assert np.isclose(window["alpha_af8_slope"], np.polyfit(seconds, in_window["alpha_af8"], 1)[0])
+        assert np.isclose(window["alpha_asymmetry_frontal"], in_window["alpha_af8"].mean() - window["alpha_af7"])
+
+
+def test_block_parallel_windows_match_serial():
+    index = pd.date_range("2025-01-01 09:00:00", periods=7200, freq="1s")
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({col: rng.normal(0.8, 0.3, len(index)) for col in BAND_COLUMNS_LOWER}, index=index)
+    df["hsi_af7"] = 1.0
+    df.loc[df.index[1000:1400], ["alpha_af8", "beta_af8"]] = np.nan
+
+    serial = generate_windows(df, extended_features=True)
+    threaded = generate_windows(df, extended_features=True, threads=4, block_windows=50)
+    pd.testing.assert_frame_equal(threaded, serial)
+
+    scored = _score_windows(threaded, LRICalculator(), threads=4)
+    expected = serial.apply(lambda row: LRICalculator().calculate(row.to_dict()), axis=1, result_type="expand")
+    for column in expected.columns:
+        assert np.allclose(scored[column], expected[column]), column
+
+
+def test_load_clean_data_masks_channels_individually(tmp_path):
+    index = pd.date_range("2025-01-01 09:00:00", periods=120, freq="1s")
+    rng = np.random.default_rng(1)
+    columns = {"TimeStamp": index.strftime("%Y-%m-%d %H:%M:%S.%f").str[:-3]}
+    for band in ["Delta", "Theta", "Alpha", "Beta", "Gamma"]:
+        for ch in ["TP9", "AF7", "AF8", "TP10"]:
+            columns[f"{band}_{ch}"] = rng.normal(0.5, 0.02, len(index))
+    for ch in ["TP9", "AF7", "AF8", "TP10"]:
+        columns[f"HSI_{ch}"] = 1.0
+    columns["HSI_AF8"] = np.where(np.arange(len(index)) < 60, 4.0, 1.0)
+    columns["Elements"] = ""
+    frame = pd.DataFrame(columns)
+    for band in ["Delta", "Theta", "Alpha", "Beta", "Gamma"]:
+        frame.loc[100, f"{band}_TP9"] += 5.0
+    marker = pd.DataFrame({"TimeStamp": ["2025-01-01 09:01:30.000"], "Elements": ["/muse/elements/blink"]})
+    csv_path = tmp_path / "muse_masked.csv"
+    pd.concat([frame, marker], ignore_index=True).to_csv(csv_path, index=False)
+
+    for engine in ("arrow", "pandas"):
+        df = load_clean_data(csv_path, engine=engine, jump_z_threshold=6.0)
+
+        assert len(df) == 120  # only the marker row is dropped
+        assert df["alpha_af8"].iloc[:60].isna().all() and df["alpha_af8"].iloc[60:90].notna().all()
+        assert df["alpha_tp9"].iloc[:60].notna().all()
+        blinked = df.index == pd.Timestamp("2025-01-01 09:01:30")
+        assert df.loc[blinked, ["alpha_af7", "alpha_af8"]].isna().all().all()
+        assert df.loc[blinked, ["alpha_tp9", "alpha_tp10"]].notna().all().all()
+        assert df["beta_tp9"].isna().sum() == 1 and np.isnan(df["beta_tp9"].iloc[100])
+    # Jump detection is opt-in
+    assert load_clean_data(csv_path)["beta_tp9"].notna().all()
+
+    windows = generate_windows(df)
+    assert np.isnan(windows["alpha_af8"].iloc[0]) and windows["alpha_tp9"].notna().all()
+    assert windows["beta_tp9"].max() < 1.0
+    assert windows.apply(lambda row: LRICalculator().calculate(row.to_dict())["lri"], axis=1).notna().all()
+
+
+def test_tdigest_quantiles_merge_across_batches():
+    values = np.random.default_rng(2).lognormal(0, 0.7, 50_000)
+    left, right = TDigest(), TDigest()
+    for batch in np.array_split(values[:25_000], 50):
+        left.update(batch)
+    right.update(values[25_000:])
+    left.merge(TDigest.from_dict(json.loads(json.dumps(right.to_dict()))))
+
+    qs = np.array([0.01, 0.05, 0.5, 0.95, 0.99])
+    ranks = np.searchsorted(np.sort(values), left.quantile(qs)) / len(values)
+    assert np.abs(ranks - qs).max() < 0.005
+    assert left.count == len(values) and left.maximum == values.max()
+
+
+def test_calibration_profile_accumulates_sessions(tmp_path):
+    config_path, muse_cfg = _muse_config(tmp_path, calibrate=True, calibration_min_windows=1)
+    recording = pd.concat([pd.read_csv(FIXTURE_CSV)] * 4, ignore_index=True)
+    recording["timestamp"] = pd.Timestamp("2025-01-01 09:00:00") + pd.to_timedelta(np.arange(len(recording)), unit="s")
+    csv_path = tmp_path / "night1" / "long_muse.csv"
+    csv_path.parent.mkdir()
+    recording.to_csv(csv_path, index=False)
+
+    outputs = process_muse_csv(csv_path=csv_path, output_dir=tmp_path, config_path=config_path)
+    first = pd.read_parquet(outputs["windows"])
+    version = calibration_version(csv_path, tmp_path, muse_cfg, file_sha256(csv_path))
+    process_muse_csv(csv_path=csv_path, output_dir=tmp_path, config_path=config_path)
+
+    profile = load_profile(outputs["calibration"].parent, "muse")
+    assert len(profile.sources) == 1  # re-processing the same file is not counted twice
+    assert profile.num_windows == len(first)
+    # ... nor scored against its own windows: the re-run is identical
+    pd.testing.assert_frame_equal(pd.read_parquet(outputs["windows"]), first)
+    assert calibration_version(csv_path, tmp_path, muse_cfg, file_sha256(csv_path)) == version
+
+    # Another recording of the participant changes the profile the first one is scored against
+    recording["timestamp"] += pd.Timedelta(days=1)
+    other_path = tmp_path / "night2" / "long_muse.csv"
+    other_path.parent.mkdir()
+    recording.to_csv(other_path, index=False)
+    process_muse_csv(csv_path=other_path, output_dir=tmp_path, config_path=config_path)
+    assert calibration_version(csv_path, tmp_path, muse_cfg, file_sha256(csv_path)) != version
+    profile = load_profile(outputs["calibration"].parent, "muse")
+    assert profile.without(file_sha256(csv_path)).num_windows == len(first)
+
+    # A participant whose beta sits well above the population range saturates it.
+    rng = np.random.default_rng(3)
+    windows_df = pd.DataFrame({col: rng.normal(3.0, 0.3, 400) for col in BAND_COLUMNS_LOWER})
+    profile.update(windows_df, source="synthetic")
+
+    population = LRICalculator()
+    assert calibrated_calculator(population, profile, min_windows=1000) is population
+    calibrated = calibrated_calculator(population, profile)
+    beta_low, beta_high = calibrated.ranges["beta"]
+    assert 2.5 < beta_low < 3.0 < beta_high < 3.5
+
+    features = windows_df.iloc[0].to_dict()
+    assert population._calculate_alertness(features) != calibrated._calculate_alertness(features)
+    assert population._scaled("beta", 3.2) == 100 and 0 < calibrated._scaled("beta", 3.2) < 100
+
+
+def _add_synthetic_session(calibration_dir, seed):
+    rng = np.random.default_rng(seed)
+    windows_df = pd.DataFrame({col: rng.normal(1.0, 0.3, 200) for col in BAND_COLUMNS_LOWER})
+    return add_session(calibration_dir, "muse", windows_df, source=f"recording-{seed}")
+
+
+def test_calibration_sessions_added_in_parallel_are_all_kept(tmp_path):
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        added = list(executor.map(_add_synthetic_session, [tmp_path] * 8, range(8)))
+
+    assert added == [True] * 8
+    profile = load_profile(tmp_path, "muse")
+    assert sorted(profile.sources) == sorted(f"recording-{seed}" for seed in range(8))
+    assert profile.num_windows == 8 * 200
+    assert not _add_synthetic_session(tmp_path, 0)
+
+
+def test_streaming_session_summary_matches_batch():
+    rng = np.random.default_rng(4)
+    starts = pd.date_range("2025-01-01 09:00:00", periods=2001, freq="15s")
+    lri = np.clip(rng.normal(60, 15, len(starts)), 0, 100)
+    # Unscorable windows count towards the optimal share's denominator in both paths
+    lri[rng.random(len(starts)) < 0.1] = np.nan
+    windows_df = pd.DataFrame(
+        {
+            "window_start": starts,
+            "window_end": starts + pd.Timedelta(seconds=29),
+            "lri": lri,
+            "alertness": rng.uniform(0, 100, len(starts)),
+            "focus": rng.uniform(0, 100, len(starts)),
+            "arousal_balance": rng.uniform(0, 100, len(starts)),
+        }
+    )
+    analyzer = SessionAnalyzer(LRICalculator())
+
+    # Two "segments" accumulated chunk by chunk, then merged out of order.
+    first, second = analyzer.accumulator(), analyzer.accumulator()
+    for rows in np.array_split(np.arange(900), 7):
+        first.update(windows_df.iloc[rows])
+    for rows in np.array_split(np.arange(900, len(windows_df)), 5):
+        second.update(windows_df.iloc[rows])
+    second.merge(first)
+    streamed = analyzer.summarise(second)
+
+    batch = analyzer._compute_summary(windows_df)
+    batch["component_scores"] = analyzer._component_scores(windows_df)
+    assert abs(streamed.pop("median_lri") - batch.pop("median_lri")) <= 0.005
+    for key, value in batch.items():
+        if isinstance(value, float):
+            assert np.isclose(streamed[key], value), key
+        elif isinstance(value, dict):
+            assert all(np.isclose(streamed[key][name], value[name]) for name in value), key
+        else:
+            assert streamed[key] == value, key
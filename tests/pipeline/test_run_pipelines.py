@@ -0,0 +1,147 @@
+from pathlib import Path
+import json
+import os
+import shutil
+
+import pandas as pd
+import yaml
+from typer.testing import CliRunner
+
+from pipeline_scripts import run_pipelines
+from pipeline_scripts.utils.config import DEFAULT_CONFIG_PATH
+
+
+FIXTURE_CSV = Path("tests/fixtures/muse/sample_muse.csv")
+
+
+def _muse_dir(tmp_path, names, bad=()):
+    muse_dir = tmp_path / "raw"
+    muse_dir.mkdir()
+    for name in names:
+        shutil.copy(FIXTURE_CSV, muse_dir / f"{name}.csv")
+    for name in bad:
+        (muse_dir / f"{name}.csv").write_text("not,a,muse,export\n1,2,3,4\n")
+    return muse_dir
+
+
+def _run(muse_dir, output_root, *args):
+    result = CliRunner().invoke(
+        run_pipelines.app, ["--muse-dir", str(muse_dir), "--output-root", str(output_root), *args]
+    )
+    manifest = json.loads((output_root / "manifest.json").read_text())
+    return result, {Path(entry["input"]).stem: entry for entry in manifest["muse"]}
+
+
+def test_run_all_isolates_failing_files_in_worker_processes(tmp_path):
+    muse_dir = _muse_dir(tmp_path, ["p_a", "p_b", "p_c"], bad=["p_bad"])
+
+    result, entries = _run(muse_dir, tmp_path / "processed", "--workers", "2")
+
+    assert result.exit_code == 1
+    assert list(entries) == ["p_a", "p_b", "p_bad", "p_c"]
+    assert entries["p_bad"]["status"] == "failed"
+    assert entries["p_bad"]["error"] and entries["p_bad"]["rows"] is None
+    for name in ("p_a", "p_b", "p_c"):
+        entry = entries[name]
+        assert entry["status"] == "ok" and entry["error"] is None
+        assert entry["rows"] == len(pd.read_parquet(entry["windows"])) > 0
+        assert entry["wall_time_seconds"] >= 0
+        assert entry["fingerprint"]["size"] == FIXTURE_CSV.stat().st_size
+
+
+def test_run_all_records_a_crashed_worker_as_failed(tmp_path, monkeypatch):
+    muse_dir = _muse_dir(tmp_path, ["p_a", "p_crash"])
+    process_muse_csv = run_pipelines.process_muse_csv
+
+    def crash_on(csv_path, **kwargs):
+        if Path(csv_path).stem == "p_crash":
+            os._exit(1)  # a worker killed outright, as by the OOM killer
+        return process_muse_csv(csv_path=csv_path, **kwargs)
+
+    # Worker processes are forked, so they inherit the patch
+    monkeypatch.setattr(run_pipelines, "process_muse_csv", crash_on)
+    result, entries = _run(muse_dir, tmp_path / "processed", "--workers", "2")
+
+    assert result.exit_code == 1
+    assert entries["p_crash"]["status"] == "failed"
+    assert entries["p_crash"]["error"].startswith("BrokenProcessPool")
+    assert entries["p_a"]["status"] in ("ok", "failed")
+
+
+def _statuses(entries):
+    return {name: entry["status"] for name, entry in entries.items()}
+
+
+def test_incremental_run_skips_unchanged_inputs(tmp_path):
+    muse_dir = _muse_dir(tmp_path, ["p_a", "p_b"])
+    output_root = tmp_path / "processed"
+    _run(muse_dir, output_root, "--incremental")
+
+    result, entries = _run(muse_dir, output_root, "--incremental")
+    assert result.exit_code == 0
+    assert _statuses(entries) == {"p_a": "skipped", "p_b": "skipped"}
+    assert entries["p_a"]["rows"] > 0 and entries["p_a"]["wall_time_seconds"] == 0.0
+
+    # Same bytes with a new mtime: the recorded digest still matches
+    os.utime(muse_dir / "p_a.csv", ns=(0, 0))
+    assert _statuses(_run(muse_dir, output_root, "--incremental")[1])["p_a"] == "skipped"
+
+
+def test_incremental_run_reruns_changed_csv(tmp_path):
+    muse_dir = _muse_dir(tmp_path, ["p_a", "p_b"])
+    output_root = tmp_path / "processed"
+    _run(muse_dir, output_root, "--incremental")
+
+    with (muse_dir / "p_a.csv").open("a") as f:
+        f.write(FIXTURE_CSV.read_text().splitlines()[-1].replace("2025-01-01 09:00:3", "2025-01-01 09:00:4") + "\n")
+    _, entries = _run(muse_dir, output_root, "--incremental")
+    assert _statuses(entries) == {"p_a": "ok", "p_b": "skipped"}
+
+
+def test_incremental_run_reruns_on_config_change(tmp_path):
+    muse_dir = _muse_dir(tmp_path, ["p_a"])
+    output_root = tmp_path / "processed"
+    _run(muse_dir, output_root, "--incremental")
+
+    config = yaml.safe_load(DEFAULT_CONFIG_PATH.read_text())
+    config["muse"]["optimal_threshold"] = 75
+    config_path = tmp_path / "pipeline.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+    _, entries = _run(muse_dir, output_root, "--incremental", "--config", str(config_path))
+    assert _statuses(entries) == {"p_a": "ok"}
+    assert entries["p_a"]["config"]["optimal_threshold"] == 75
+
+    _, entries = _run(muse_dir, output_root, "--incremental", "--config", str(config_path))
+    assert _statuses(entries) == {"p_a": "skipped"}
+
+
+def test_skip_check_follows_calibration_version(tmp_path):
+    muse_dir = _muse_dir(tmp_path, ["p_a"])
+    output_root = tmp_path / "processed"
+    _run(muse_dir, output_root)
+    previous = run_pipelines._load_previous_entries(output_root / "manifest.json")
+    csv_path = muse_dir / "p_a.csv"
+    prior = previous[str(csv_path)]
+    prior["calibration"] = "v1"
+
+    def skip(version):
+        return run_pipelines._skip_if_up_to_date(
+            previous, csv_path, prior["config"], run_pipelines.MUSE_OUTPUT_KEYS, calibration=lambda sha: version
+        )
+
+    assert skip("v1").result()["status"] == "skipped"
+    assert skip("v2") is None
+
+
+def test_incremental_run_reruns_when_an_output_is_truncated(tmp_path):
+    muse_dir = _muse_dir(tmp_path, ["p_a", "p_b"])
+    output_root = tmp_path / "processed"
+    _, entries = _run(muse_dir, output_root, "--incremental")
+
+    windows = Path(entries["p_a"]["windows"])
+    windows.write_bytes(windows.read_bytes()[: windows.stat().st_size // 2])
+    Path(entries["p_b"]["pyramid"]).write_bytes(b"not parquet")
+
+    _, entries = _run(muse_dir, output_root, "--incremental")
+    assert _statuses(entries) == {"p_a": "ok", "p_b": "ok"}
+    assert entries["p_a"]["rows"] == len(pd.read_parquet(windows))